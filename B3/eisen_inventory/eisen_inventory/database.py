@@ -0,0 +1,23 @@
+"""Per-connection database tuning.
+
+SQLite's defaults (rollback journal, ``synchronous=FULL``, no busy timeout) make every
+write block all readers and fail other writers immediately with "database is locked".
+``configure_sqlite_connection`` runs on ``connection_created`` and switches each new
+SQLite connection to WAL with the pragmas from ``EISEN_SQLITE_PRAGMAS``, so readers keep
+working while an import writes and concurrent writers wait instead of erroring.
+"""
+from django.conf import settings
+
+
+def sqlite_pragmas():
+    """The pragmas from settings.EISEN_SQLITE_PRAGMAS (their only definition); none when unset."""
+    return getattr(settings, 'EISEN_SQLITE_PRAGMAS', {})
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying the SQLite pragmas; other vendors are left alone."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -19,6 +19,7 @@ from django.urls import path, include, re_path
 from django.views.generic import TemplateView
 from django.conf import settings
 from django.conf.urls.static import static
+from inventory.metrics import metrics_view
 import os
 
 class ReactAppView(TemplateView):
@@ -34,6 +35,7 @@ class ReactAppView(TemplateView):
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/_metrics/', metrics_view, name='metrics'),
     path('api/', include('inventory.urls')),
 ]
 
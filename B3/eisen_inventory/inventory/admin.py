@@ -4,8 +4,8 @@ from django.contrib.auth.models import User, Group
 from django.urls import path, reverse
 from django.shortcuts import render, redirect
 from django.db.models import Count
-from .models import Product, InventoryBatch, Supplier, SupplierProduct, StockAlert, ProductStockSnapshot
-from .utils import import_inventory_csv, convert_excel_to_csv
+from .models import Product, InventoryBatch, Supplier, SupplierProduct, StockAlert, ProductStockSnapshot, ImportJob, StockMovement
+from .utils import import_inventory_file
 import os
 import tempfile
 
@@ -103,14 +103,9 @@ class ProductAdmin(admin.ModelAdmin):
 				for chunk in file.chunks():
 					tmp.write(chunk)
 				tmp_path = tmp.name
-			csv_generated_path = None
 			try:
-				if suffix == '.xlsx':
-					csv_generated_path = convert_excel_to_csv(tmp_path)
-					csv_path = csv_generated_path
-				else:
-					csv_path = tmp_path
-				result = import_inventory_csv(csv_path, mode=mode)
+				# Excel is streamed directly; no intermediate CSV is written
+				result = import_inventory_file(tmp_path, mode=mode)
 				messages.success(request, f"Import complete: created={result['created']} updated={result['updated']}")
 			except Exception as e:
 				messages.error(request, f"Import failed: {e}")
@@ -119,19 +114,17 @@ class ProductAdmin(admin.ModelAdmin):
 					os.remove(tmp_path)
 				except Exception:
 					pass
-				# If we generated a CSV for Excel uploads, clean it up too
-				if csv_generated_path and os.path.exists(csv_generated_path):
-					try:
-						os.remove(csv_generated_path)
-					except Exception:
-						pass
 			return redirect(reverse('admin:inventory_product_changelist'))
 
 		return render(request, 'admin/inventory/product/upload.html', context)
 
+	def get_queryset(self, request):
+		return super().get_queryset(request).with_active_alerts_count()
+
 	def active_alerts(self, obj):
 		return obj.active_alerts_count
 	active_alerts.short_description = "Active Alerts"
+	active_alerts.admin_order_field = "num_active_alerts"
 
 
 class SupplierProductInline(admin.TabularInline):
@@ -183,11 +176,11 @@ class InventoryBatchAdmin(admin.ModelAdmin):
 
 @admin.register(StockAlert)
 class StockAlertAdmin(admin.ModelAdmin):
-	list_display = ("product", "status", "active", "created_at", "resolved_at", "current_stock_at_trigger", "minimum_stock_level")
+	list_display = ("product", "status", "active", "created_at", "resolved_at", "current_stock_at_trigger", "minimum_stock_level", "threshold_at_trigger")
 	list_filter = ("status", "active")
 	search_fields = ("product__name", "product__sku")
 	autocomplete_fields = ("product",)
-	readonly_fields = ("status", "created_at", "resolved_at", "current_stock_at_trigger", "minimum_stock_level", "message")
+	readonly_fields = ("status", "created_at", "resolved_at", "current_stock_at_trigger", "minimum_stock_level", "threshold_at_trigger", "message")
 
 
 @admin.register(ProductStockSnapshot)
@@ -196,3 +189,27 @@ class ProductStockSnapshotAdmin(admin.ModelAdmin):
 	search_fields = ("product__name", "product__sku")
 	list_filter = ("date",)
 	autocomplete_fields = ("product",)
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+	list_display = ("id", "original_name", "mode", "status", "rows_processed", "total_rows", "rows_per_sec", "created_at", "finished_at")
+	list_filter = ("status", "mode")
+	search_fields = ("original_name",)
+	readonly_fields = ("created_at", "started_at", "finished_at", "updated_at")
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+	list_display = ("product", "kind", "quantity", "batch", "created_at")
+	list_filter = ("kind",)
+	search_fields = ("product__name", "product__sku")
+	list_select_related = ("product", "batch")
+	raw_id_fields = ("product", "batch")
+
+	# The ledger is append-only
+	def has_change_permission(self, request, obj=None):
+		return False
+
+	def has_delete_permission(self, request, obj=None):
+		return False
@@ -1,12 +1,25 @@
 from rest_framework import viewsets, filters, decorators, response, status
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.renderers import BaseRenderer
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.db.models import Prefetch
-from django.http import JsonResponse
+from django.db.models import Prefetch, Count, Max, Q
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import quote_etag
 from django.contrib.auth.models import User
-import tempfile, os
-from .models import Product, InventoryBatch, Supplier, SupplierProduct, ProductDailySales, StockAlert, ProductStockSnapshot
+from django.conf import settings
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from itertools import islice
+import csv, hashlib, json, logging, tempfile, os
+from .models import (
+    Product, InventoryBatch, Supplier, SupplierProduct, ProductDailySales, StockAlert, ProductStockSnapshot, ImportJob,
+    ProductStockMonthlyRollup, ProductStockYearlyRollup,
+)
 from .serializers import (
     ProductSerializer,
     InventoryBatchSerializer,
@@ -15,16 +28,204 @@ from .serializers import (
     ProductDailySalesSerializer,
     StockAlertSerializer,
     ProductStockSnapshotSerializer,
+    ImportJobSerializer,
 )
-from .utils import evaluate_product_alert, evaluate_all_alerts
-from .utils import convert_excel_to_csv, import_inventory_csv
+from .pagination import ProductCursorPagination, InventoryBatchCursorPagination, StockSnapshotCursorPagination
+from .utils import evaluate_product_alert, evaluate_all_alerts, upsert_daily_sales, stock_as_of
+from .timeseries import sales_series, stock_series
+from .cache import cached_payload
+from .forecasting import forecast_for_product, HISTORY_DAYS, HORIZON_DAYS
+from .utils import check_inventory_headers, import_inventory_file
+
+logger = logging.getLogger('inventory.api')
+
+
+class ConditionalListMixin:
+    """ETag on list responses, derived from a cheap aggregate of the filtered queryset
+    (row count + newest ``last_modified_field``) rather than the payload. Unchanged lists
+    answer If-None-Match with 304 before anything is serialized.
+    ``related_modified_fields`` lists the ``updated_at`` of related rows whose fields the
+    serializer embeds (e.g. ``product__updated_at`` for ``product_name``).
+
+    No Last-Modified is sent: deleting rows leaves the newest timestamp where it was, so
+    If-Modified-Since would answer 304 for a list that lost rows. Only the ETag sees the count.
+    """
+    last_modified_field = 'updated_at'
+    related_modified_fields = ()
+
+    def list_fingerprint(self, queryset):
+        fields = (self.last_modified_field, *self.related_modified_fields)
+        agg = queryset.order_by().aggregate(count=Count('pk'), **{f'last{i}': Max(f) for i, f in enumerate(fields)})
+        stamps = [agg[f'last{i}'] for i in range(len(fields)) if agg[f'last{i}'] is not None]
+        return [agg['count']], max(stamps) if stamps else None
+
+    def list(self, request, *args, **kwargs):
+        parts, last_modified = self.list_fingerprint(self.filter_queryset(self.get_queryset()))
+        key = ':'.join(str(p) for p in parts + [last_modified, request.get_full_path(), request.accepted_media_type])
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        self.list_etag = etag
+        resp = super().list(request, *args, **kwargs)
+        resp['ETag'] = etag
+        return resp
+
+
+class CachedListMixin:
+    """Serve list payloads from the versioned inventory cache (see inventory.cache).
+
+    ``cache_depends_on`` names every model the payload is built from; a write to any of them
+    invalidates it. The key is the full URL, so filters, pagination and ``fields`` each get
+    their own entry. Behind ConditionalListMixin the key also holds the ETag computed from the
+    live rows, so a body is never served under an ETag it wasn't built for, even when a write
+    from another process hasn't bumped this process's versions.
+    """
+    cache_depends_on = ()
+
+    def list(self, request, *args, **kwargs):
+        key = f"{request.build_absolute_uri()}|{request.accepted_media_type}|{getattr(self, 'list_etag', '')}"
+        data = cached_payload(
+            self.basename, key, self.cache_depends_on,
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data,
+        )
+        return response.Response(data)
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class CSVExportRenderer(BaseRenderer):
+    """Lets ``Accept: text/csv`` through content negotiation; export views stream their own body."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class _Echo:
+    """File-like object whose write() returns the value, so csv.writer rows can be yielded."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class ExportMixin:
+    """Streaming CSV / NDJSON exports of the filtered list queryset.
+
+    ``export.csv`` and ``export.ndjson`` honour the list's filter params (``?search=``),
+    read ``export_fields`` with values_list().iterator() ordered by primary key and write
+    EXPORT_CHUNK_SIZE rows per chunk, so memory stays flat however many rows there are.
+    """
+    export_fields = ()  # (column name, ORM lookup) pairs
 
+    def export_rows(self):
+        queryset = self.filter_queryset(self.get_queryset()).order_by('pk')
+        rows = queryset.values_list(*[lookup for _, lookup in self.export_fields]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return iter(lambda: list(islice(rows, EXPORT_CHUNK_SIZE)), [])
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all().order_by('name')
+    def _export_response(self, stream, content_type, extension):
+        resp = StreamingHttpResponse(stream, content_type=content_type)
+        resp['Content-Disposition'] = f'attachment; filename="{self.basename}.{extension}"'
+        return resp
+
+    @decorators.action(detail=False, methods=['get'], url_path='export.csv', renderer_classes=[CSVExportRenderer])
+    def export_csv(self, request):
+        header = [name for name, _ in self.export_fields]
+        writer = csv.writer(_Echo())
+
+        def stream():
+            yield writer.writerow(header)
+            for chunk in self.export_rows():
+                yield ''.join(writer.writerow([_csv_value(v) for v in row]) for row in chunk)
+
+        return self._export_response(stream(), 'text/csv; charset=utf-8', 'csv')
+
+    @decorators.action(detail=False, methods=['get'], url_path='export.ndjson', renderer_classes=[NDJSONExportRenderer])
+    def export_ndjson(self, request):
+        header = [name for name, _ in self.export_fields]
+        encoder = DjangoJSONEncoder()
+
+        def stream():
+            for chunk in self.export_rows():
+                yield ''.join(encoder.encode(dict(zip(header, row))) + '\n' for row in chunk)
+
+        return self._export_response(stream(), 'application/x-ndjson', 'ndjson')
+
+
+class ProductViewSet(ConditionalListMixin, CachedListMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.with_active_alerts_count().order_by('name')
     serializer_class = ProductSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'sku']
+    pagination_class = ProductCursorPagination
+    cache_depends_on = (Product, StockAlert)
+
+    def list_fingerprint(self, queryset):
+        # active_alerts_count changes without touching the product row
+        parts, last = super().list_fingerprint(queryset)
+        alerts = StockAlert.objects.filter(product__in=queryset.values('pk')).order_by().aggregate(
+            active=Count('pk', filter=Q(active=True)), created=Max('created_at'), resolved=Max('resolved_at'),
+        )
+        stamps = [t for t in (last, alerts['created'], alerts['resolved']) if t is not None]
+        return parts + [alerts['active']], max(stamps) if stamps else None
+
+    @decorators.action(detail=False, methods=['get'])
+    def reorder(self, request):
+        """Products below their persisted reorder point (current_stock < reorder_point)."""
+        queryset = self.filter_queryset(self.get_queryset().needs_reorder())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return response.Response(self.get_serializer(queryset, many=True).data)
+
+    @decorators.action(detail=True, methods=['get'])
+    def forecast(self, request, pk=None):
+        """Demand forecast, σ-based safety stock and reorder point (see inventory.forecasting)."""
+        product = self.get_object()
+        params = request.query_params
+        try:
+            horizon = int(params.get('horizon', HORIZON_DAYS))
+            if not 1 <= horizon <= 365:
+                raise ValueError('horizon must be between 1 and 365 days')
+            options = {
+                'horizon': horizon,
+                'history_days': min(max(int(params.get('history', HISTORY_DAYS)), 7), 3660),
+            }
+            if params.get('service_level'):
+                options['service_level'] = float(params['service_level'])
+            if params.get('alpha'):
+                options['alpha'] = float(params['alpha'])
+            return response.Response(forecast_for_product(product, **options))
+        except ValueError as exc:
+            return response.Response({'detail': str(exc)}, status=400)
+
+    @decorators.action(detail=True, methods=['get'])
+    def stock_as_of(self, request, pk=None):
+        """Stock level from the movement ledger at ``at`` (YYYY-MM-DD for end of day, or ISO datetime)."""
+        product = self.get_object()
+        raw = request.query_params.get('at', '')
+        try:
+            # A bare date means the end of that day
+            when = parse_date(raw) or parse_datetime(raw)
+        except ValueError:
+            when = None
+        if when is None:
+            return response.Response({'detail': 'at must be YYYY-MM-DD or an ISO datetime'}, status=400)
+        if isinstance(when, datetime) and timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        return response.Response({'product_id': product.pk, 'at': raw, 'stock': stock_as_of(product, when)})
 
     @decorators.action(detail=True, methods=['post'])
     def evaluate_alert(self, request, pk=None):
@@ -65,25 +266,46 @@ class SupplierProductViewSet(viewsets.ModelViewSet):
     search_fields = ['supplier__name', 'product__name', 'product__sku']
 
 
-class InventoryBatchViewSet(viewsets.ModelViewSet):
+class InventoryBatchViewSet(ConditionalListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = InventoryBatch.objects.select_related('product', 'supplier').all().order_by('-received_at')
     serializer_class = InventoryBatchSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['product__name', 'product__sku', 'supplier__name']
+    pagination_class = InventoryBatchCursorPagination
+    related_modified_fields = ('product__updated_at', 'supplier__updated_at')
+    export_fields = (
+        ('id', 'pk'), ('product', 'product_id'), ('sku', 'product__sku'), ('product_name', 'product__name'),
+        ('supplier', 'supplier_id'), ('supplier_name', 'supplier__name'), ('quantity', 'quantity'),
+        ('unit_cost', 'unit_cost'), ('received_at', 'received_at'), ('version', 'version'), ('updated_at', 'updated_at'),
+    )
 
 
-class ProductDailySalesViewSet(viewsets.ModelViewSet):
+class ProductDailySalesViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = ProductDailySales.objects.select_related('product').all()
     serializer_class = ProductDailySalesSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['product__name', 'product__sku']
+    export_fields = (
+        ('id', 'pk'), ('product', 'product_id'), ('sku', 'product__sku'), ('date', 'date'),
+        ('quantity', 'quantity'), ('updated_at', 'updated_at'),
+    )
+
+    @decorators.action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Upsert many sales rows: a list (or {"rows": [...]}) of {"sku", "date", "quantity"}."""
+        rows = request.data.get('rows') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            return response.Response({'detail': 'expected a list of rows'}, status=400)
+        result = upsert_daily_sales(rows)
+        return response.Response(result, status=400 if result['errors'] else 200)
 
 
-class StockAlertViewSet(viewsets.ReadOnlyModelViewSet):
+class StockAlertViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = StockAlert.objects.select_related('product').all()
     serializer_class = StockAlertSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['product__name', 'product__sku', 'status']
+    cache_depends_on = (StockAlert, Product)
 
     @decorators.action(detail=False, methods=['post'])
     def evaluate(self, request):
@@ -97,53 +319,117 @@ class StockAlertViewSet(viewsets.ReadOnlyModelViewSet):
         return response.Response({'id': alert.id, 'resolved': True})
 
 
-class ProductStockSnapshotViewSet(viewsets.ModelViewSet):
+class ProductStockSnapshotViewSet(ConditionalListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = ProductStockSnapshot.objects.select_related('product').all()
     serializer_class = ProductStockSnapshotSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['product__name', 'product__sku']
+    pagination_class = StockSnapshotCursorPagination
+    related_modified_fields = ('product__updated_at',)
+    export_fields = (
+        ('id', 'pk'), ('product', 'product_id'), ('sku', 'product__sku'), ('date', 'date'),
+        ('stock_level', 'stock_level'), ('updated_at', 'updated_at'),
+    )
 
     @decorators.action(detail=False, methods=['get'])
     def product_daily(self, request):
+        """The product's 90 most recent snapshots, newest first.
+
+        One indexed (product, date) query with the product joined in, so product_name doesn't
+        cost a query per row.
+        """
         product_id = request.query_params.get('product')
-        if not product_id:
+        if not product_id or not product_id.isdigit():
             return response.Response({'detail': 'product query param required'}, status=400)
-        qs = ProductStockSnapshot.objects.filter(product_id=product_id).order_by('-date')[:90]
-        return response.Response(ProductStockSnapshotSerializer(qs, many=True).data)
+        qs = self.get_queryset().filter(product_id=product_id).order_by('-date')[:90]
+        return response.Response(self.get_serializer(qs, many=True).data)
 
     @decorators.action(detail=False, methods=['get'])
-    def monthly(self, request):
-        """Return monthly average, min, max stock for each product or a single product."""
-        from django.db.models import Avg, Min, Max
+    def series(self, request):
+        """Chart series for one product from the in-memory cache.
+
+        ``kind`` is ``stock`` (snapshots, missing days omitted) or ``sales`` (zero-filled);
+        ``rolling=N`` adds a trailing N-day mean for sales.
+        """
+        product_id = request.query_params.get('product')
+        if not product_id or not product_id.isdigit():
+            return response.Response({'detail': 'product query param required'}, status=400)
+        try:
+            days = min(max(int(request.query_params.get('days', 90)), 1), 3660)
+            rolling = int(request.query_params.get('rolling', 0))
+        except ValueError:
+            return response.Response({'detail': 'days/rolling must be integers'}, status=400)
+        kind = request.query_params.get('kind', 'stock')
+        product_id = int(product_id)
+        if kind == 'stock':
+            dates, values = stock_series.observed(product_id, days)
+            return response.Response({'product': product_id, 'kind': kind, 'dates': dates, 'values': values.tolist()})
+        if kind != 'sales':
+            return response.Response({'detail': 'kind must be stock or sales'}, status=400)
+        end = date.today()
+        data = {
+            'product': product_id,
+            'kind': kind,
+            'start': end - timedelta(days=days - 1),
+            'values': sales_series.window(product_id, days, end).tolist(),
+        }
+        if rolling > 0:
+            data['rolling_mean'] = sales_series.rolling_mean(product_id, rolling, days, end).round(3).tolist()
+        return response.Response(data)
+
+    def _rollup_response(self, request, model, label):
+        """Serve pre-aggregated rollup rows, optionally filtered by product and a date range.
+
+        ``start``/``end`` (YYYY-MM-DD) select every period overlapping the range.
+        """
+        qs = model.objects.all()
         product_id = request.query_params.get('product')
-        qs = ProductStockSnapshot.objects.all()
         if product_id:
             qs = qs.filter(product_id=product_id)
-        # Annotate by product+month
-        from django.db.models.functions import TruncMonth
-        agg = (
-            qs.annotate(month=TruncMonth('date'))
-              .values('product_id', 'product__name', 'month')
-              .annotate(avg_stock=Avg('stock_level'), min_stock=Min('stock_level'), max_stock=Max('stock_level'))
-              .order_by('product__name', 'month')
+        bounds = {}
+        for key in ('start', 'end'):
+            raw = request.query_params.get(key)
+            if not raw:
+                bounds[key] = None
+                continue
+            try:
+                bounds[key] = parse_date(raw)
+            except ValueError:
+                bounds[key] = None
+            if bounds[key] is None:
+                return response.Response({'detail': f'{key} must be YYYY-MM-DD'}, status=400)
+        start, end = bounds['start'], bounds['end']
+        if start:
+            start = start.replace(day=1) if model is ProductStockMonthlyRollup else start.replace(month=1, day=1)
+            qs = qs.filter(period_start__gte=start)
+        if end:
+            qs = qs.filter(period_start__lte=end)
+        rows = qs.order_by('product__name', 'period_start').values_list(
+            'product_id', 'product__name', 'period_start', 'total_stock', 'snapshot_count', 'min_stock', 'max_stock'
         )
-        return response.Response(list(agg))
+        return response.Response(cached_payload(
+            f'stock-snapshot-{label}', request.get_full_path(), (model, ProductStockSnapshot, Product),
+            lambda: [
+                {
+                    'product_id': product_id,
+                    'product__name': name,
+                    label: period_start,
+                    'avg_stock': total / count if count else None,
+                    'min_stock': low,
+                    'max_stock': high,
+                }
+                for product_id, name, period_start, total, count, low, high in rows
+            ],
+        ))
+
+    @decorators.action(detail=False, methods=['get'])
+    def monthly(self, request):
+        """Return monthly average, min, max stock for each product or a single product."""
+        return self._rollup_response(request, ProductStockMonthlyRollup, 'month')
 
     @decorators.action(detail=False, methods=['get'])
     def yearly(self, request):
-        from django.db.models import Avg, Min, Max
-        from django.db.models.functions import TruncYear
-        product_id = request.query_params.get('product')
-        qs = ProductStockSnapshot.objects.all()
-        if product_id:
-            qs = qs.filter(product_id=product_id)
-        agg = (
-            qs.annotate(year=TruncYear('date'))
-              .values('product_id', 'product__name', 'year')
-              .annotate(avg_stock=Avg('stock_level'), min_stock=Min('stock_level'), max_stock=Max('stock_level'))
-              .order_by('product__name', 'year')
-        )
-        return response.Response(list(agg))
+        return self._rollup_response(request, ProductStockYearlyRollup, 'year')
 
 
 class UploadViewSet(viewsets.ViewSet):
@@ -151,11 +437,7 @@ class UploadViewSet(viewsets.ViewSet):
     parser_classes = (MultiPartParser, FormParser)
 
 
-# Add explicit function-based endpoints that are CSRF-exempt and easier to call from the
-# frontend. These will be mapped in `inventory/urls.py` to override or supplement the
-# ViewSet action endpoints and avoid CSRF/dispatch issues during development.
-@csrf_exempt
-def upload_excel_view(request):
+def _handle_upload(request, suffix, label):
     if request.method != 'POST':
         return JsonResponse({'detail': 'Method not allowed'}, status=405)
     file = request.FILES.get('file')
@@ -164,18 +446,34 @@ def upload_excel_view(request):
     mode = request.POST.get('mode', 'append')
     if mode not in ('append', 'replace_all'):
         mode = 'append'
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
+
+    if getattr(settings, 'INVENTORY_IMPORTS_ASYNC', False):
+        # Queue the file for the run_import_worker command and return straight away
+        jobs_dir = Path(settings.IMPORT_JOBS_DIR)
+        jobs_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=jobs_dir) as tmp:
+            for chunk in file.chunks():
+                tmp.write(chunk)
+        try:
+            # Reject files with the wrong headers now rather than in the worker
+            check_inventory_headers(tmp.name)
+        except Exception as e:
+            os.remove(tmp.name)
+            return JsonResponse({'detail': str(e), 'message': str(e)}, status=400)
+        job = ImportJob.objects.create(file_path=tmp.name, original_name=file.name, mode=mode)
+        data = ImportJobSerializer(job).data
+        data['status_url'] = f"/api/uploads/jobs/{job.pk}/"
+        return JsonResponse({'job_id': job.pk, 'job': data}, status=202)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
         for chunk in file.chunks():
             tmp.write(chunk)
         tmp_path = tmp.name
     try:
-        csv_path = convert_excel_to_csv(tmp_path)
-        result = import_inventory_csv(csv_path, mode=mode)
+        result = import_inventory_file(tmp_path, mode=mode)
         return JsonResponse({'import_result': result})
     except Exception as e:
-        import traceback
-        print(f"Upload Excel Error: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception('%s upload failed', label)
         return JsonResponse({'detail': str(e), 'message': str(e)}, status=400)
     finally:
         try:
@@ -184,33 +482,27 @@ def upload_excel_view(request):
             pass
 
 
+# Add explicit function-based endpoints that are CSRF-exempt and easier to call from the
+# frontend. These will be mapped in `inventory/urls.py` to override or supplement the
+# ViewSet action endpoints and avoid CSRF/dispatch issues during development.
+@csrf_exempt
+def upload_excel_view(request):
+    return _handle_upload(request, '.xlsx', 'Excel')
+
+
 @csrf_exempt
 def upload_csv_view(request):
-    if request.method != 'POST':
-        return JsonResponse({'detail': 'Method not allowed'}, status=405)
-    file = request.FILES.get('file')
-    if not file:
-        return JsonResponse({'detail': 'file is required'}, status=400)
-    mode = request.POST.get('mode', 'append')
-    if mode not in ('append', 'replace_all'):
-        mode = 'append'
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.csv', mode='wb') as tmp:
-        for chunk in file.chunks():
-            tmp.write(chunk)
-        tmp_path = tmp.name
+    return _handle_upload(request, '.csv', 'CSV')
+
+
+@decorators.api_view(['GET'])
+def import_job_view(request, job_id):
+    """Progress of a queued import: rows processed, rows/sec, errors and ETA."""
     try:
-        result = import_inventory_csv(tmp_path, mode=mode)
-        return JsonResponse({'import_result': result})
-    except Exception as e:
-        import traceback
-        print(f"Upload CSV Error: {str(e)}")
-        print(traceback.format_exc())
-        return JsonResponse({'detail': str(e), 'message': str(e)}, status=400)
-    finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+        job = ImportJob.objects.get(pk=job_id)
+    except ImportJob.DoesNotExist:
+        return response.Response({'detail': 'Not found.'}, status=404)
+    return response.Response(ImportJobSerializer(job).data)
 
 
 @decorators.api_view(['GET'])
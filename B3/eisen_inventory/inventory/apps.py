@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from eisen_inventory.database import configure_sqlite_connection
+
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='eisen_sqlite_pragmas')
@@ -0,0 +1,374 @@
+"""Synthetic catalog generator and timing harness for the inventory hot paths.
+
+``generate_synthetic_catalog`` fills the database with a reproducible catalog (suppliers,
+products, batches, daily sales and stock snapshots) using bulk inserts only, bypassing the
+per-row model hooks. ``run_benchmarks``
+then times the hot paths a number of times each and returns a JSON-ready dict, which the
+``benchmark_inventory`` command writes out for comparison between runs.
+
+Both write to the configured database: point it at a scratch database before running.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import csv
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from .cache import bump_model_versions, get_cache
+from .models import (
+    InventoryBatch,
+    Product,
+    ProductDailySales,
+    ProductStockSnapshot,
+    StockMovement,
+    Supplier,
+    SupplierProduct,
+)
+from .timeseries import sales_series, stock_series
+from .utils import (
+    REQUIRED_HEADERS,
+    all_reorder_recommendations,
+    evaluate_all_alerts,
+    import_inventory_csv,
+    invalidate_demand_stats,
+    rebuild_stock_rollups,
+    refresh_reorder_points,
+    refresh_stock_rollups,
+    remove_stock_fifo_bulk,
+)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    np = None
+    NUMPY_AVAILABLE = False
+
+BENCHMARK_SKU_PREFIX = 'BENCH'
+GENERATOR_BATCH_SIZE = 5000
+LIST_ENDPOINTS = (
+    ('products', '/api/products/'),
+    ('inventory_batches', '/api/inventory-batches/'),
+    ('stock_alerts', '/api/stock-alerts/'),
+    ('stock_snapshots_monthly', '/api/stock-snapshots/monthly/'),
+    ('stock_snapshots_yearly', '/api/stock-snapshots/yearly/'),
+)
+HISTORY_COLUMNS = {
+    'sales': ('product', 'date', 'quantity', 'created_at', 'updated_at'),
+    'snapshots': ('product', 'date', 'stock_level', 'created_at', 'updated_at'),
+}
+BENCHMARK_CASES = (
+    'fifo_removal', 'csv_import', 'evaluate_all_alerts', 'all_reorder_recommendations',
+    'snapshot_rollups', 'list_endpoints',
+)
+
+
+def _bulk_insert(model, objs, batch_size):
+    """bulk_create an iterable in slices so the generator never holds every row at once."""
+    total = 0
+    chunk = []
+    for obj in objs:
+        chunk.append(obj)
+        if len(chunk) >= batch_size:
+            model.objects.bulk_create(chunk, batch_size=batch_size)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        model.objects.bulk_create(chunk, batch_size=batch_size)
+        total += len(chunk)
+    return total
+
+
+def _insert_rows(model, columns, rows):
+    """executemany plain tuples into ``model``'s table; returns the number of rows."""
+    if not rows:
+        return 0
+    quote = connection.ops.quote_name
+    names = ', '.join(quote(model._meta.get_field(name).column) for name in columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {quote(model._meta.db_table)} ({names}) VALUES ({placeholders})', rows)
+    return len(rows)
+
+
+def _daily_demand(rng, base, days):
+    """Per-day unit sales for one product: weekday-shaped Poisson noise around ``base``."""
+    weekday = np.array([1.1, 1.0, 1.0, 1.05, 1.25, 0.8, 0.6])
+    start = date.today() - timedelta(days=days - 1)
+    shape = weekday[(start.weekday() + np.arange(days)) % 7]
+    return rng.poisson(base * shape)
+
+
+def generate_synthetic_catalog(products: int = 1000, suppliers: int = 20, years: int = 1, days: int = None,
+                               batches_per_product: int = 3, seed: int = 0,
+                               batch_size: int = GENERATOR_BATCH_SIZE):
+    """Bulk-insert a reproducible catalog and its history ending today.
+
+    Creates ``suppliers`` suppliers, ``products`` products (SKUs ``BENCH-000001``...) each
+    supplied by one or two suppliers with a lead time, ``batches_per_product`` batches whose
+    quantities sum to the product's stock, an opening ledger movement, and ``days`` (default
+    ``years`` * 365) of daily sales and stock snapshots. Rollups and the persisted reorder
+    fields are rebuilt at the end so the catalog looks like one built by the normal hooks.
+
+    Returns the number of rows written per model plus the elapsed seconds.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError('numpy is required to generate a synthetic catalog')
+    days = days or years * 365
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    today = date.today()
+    first_day = today - timedelta(days=days - 1)
+
+    Supplier.objects.bulk_create(
+        [Supplier(name=f'{BENCHMARK_SKU_PREFIX} Supplier {i:04d}') for i in range(1, suppliers + 1)],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    supplier_ids = list(
+        Supplier.objects.filter(name__startswith=f'{BENCHMARK_SKU_PREFIX} Supplier ')
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+    base_demand = rng.gamma(2.0, 2.5, size=products)
+    minimums = rng.integers(5, 60, size=products)
+    # Roughly a tenth of the catalog starts below its minimum so alerts have work to do
+    stock = np.where(rng.random(products) < 0.1, minimums // 2, rng.integers(20, 800, size=products))
+    _bulk_insert(Product, (
+        Product(
+            sku=f'{BENCHMARK_SKU_PREFIX}-{i + 1:06d}',
+            name=f'Synthetic product {i + 1}',
+            minimum_stock_level=int(minimums[i]),
+            current_stock=int(stock[i]),
+        )
+        for i in range(products)
+    ), batch_size)
+    product_ids = list(
+        Product.objects.filter(sku__startswith=f'{BENCHMARK_SKU_PREFIX}-').order_by('sku').values_list('pk', flat=True)
+    )
+
+    def supplier_links():
+        for pid in product_ids:
+            count = min(len(supplier_ids), 1 + int(rng.random() < 0.4))
+            for n, supplier_id in enumerate(rng.choice(supplier_ids, size=count, replace=False)):
+                yield SupplierProduct(
+                    supplier_id=int(supplier_id), product_id=pid, is_preferred=n == 0,
+                    lead_time_days=int(rng.integers(2, 22)),
+                    cost_price=Decimal(str(round(float(rng.uniform(1, 200)), 2))),
+                )
+
+    def batches():
+        for i, pid in enumerate(product_ids):
+            remaining = int(stock[i])
+            for n in range(batches_per_product):
+                quantity = remaining if n == batches_per_product - 1 else int(rng.integers(0, remaining + 1))
+                remaining -= quantity
+                if quantity:
+                    yield InventoryBatch(
+                        product_id=pid, quantity=quantity,
+                        supplier_id=int(rng.choice(supplier_ids)) if supplier_ids else None,
+                    )
+
+    opened_at = datetime.combine(first_day, datetime.min.time(), tzinfo=dt_timezone.utc)
+
+    def sales_and_snapshots():
+        for i, pid in enumerate(product_ids):
+            sold = _daily_demand(rng, base_demand[i], days)
+            received = np.where(rng.random(days) < 0.05, rng.integers(50, 400, size=days), 0)
+            # Walk back from today's level: each day's stock is today's plus everything sold
+            # (minus received) on the days after it
+            later = np.concatenate((np.cumsum((sold - received)[::-1])[::-1][1:], [0]))
+            yield sold, np.maximum(int(stock[i]) + later, 0), pid
+
+    written = {
+        'suppliers': len(supplier_ids),
+        'products': len(product_ids),
+        'supplier_products': _bulk_insert(SupplierProduct, supplier_links(), batch_size),
+        'inventory_batches': _bulk_insert(InventoryBatch, batches(), batch_size),
+        'stock_movements': _bulk_insert(StockMovement, (
+            StockMovement(product_id=pid, kind=StockMovement.KIND_OPENING, quantity=int(stock[i]), created_at=opened_at)
+            for i, pid in enumerate(product_ids)
+        ), batch_size),
+        'daily_sales': 0,
+        'stock_snapshots': 0,
+    }
+    # History is most of the rows: insert plain tuples so Django's per-field preparation of
+    # model instances doesn't dominate generation time
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    dates = [connection.ops.adapt_datefield_value(first_day + timedelta(days=d)) for d in range(days)]
+    sales, snapshots = [], []
+    with transaction.atomic():
+        for sold, levels, pid in sales_and_snapshots():
+            sales.extend((pid, dates[d], int(sold[d]), now, now) for d in np.flatnonzero(sold))
+            snapshots.extend((pid, dates[d], int(levels[d]), now, now) for d in range(days))
+            if len(snapshots) >= batch_size:
+                written['daily_sales'] += _insert_rows(ProductDailySales, HISTORY_COLUMNS['sales'], sales)
+                written['stock_snapshots'] += _insert_rows(ProductStockSnapshot, HISTORY_COLUMNS['snapshots'], snapshots)
+                sales, snapshots = [], []
+        written['daily_sales'] += _insert_rows(ProductDailySales, HISTORY_COLUMNS['sales'], sales)
+        written['stock_snapshots'] += _insert_rows(ProductStockSnapshot, HISTORY_COLUMNS['snapshots'], snapshots)
+    bump_model_versions(ProductDailySales, ProductStockSnapshot)
+
+    # Bulk inserts skip the model hooks, so drop anything cached for these ids
+    sales_series.invalidate()
+    stock_series.invalidate()
+    for pid in product_ids:
+        invalidate_demand_stats(pid)
+    rollups = rebuild_stock_rollups(batch_size)
+    refresh_reorder_points(product_ids)
+
+    written['monthly_rollups'] = rollups['monthly']
+    written['yearly_rollups'] = rollups['yearly']
+    written['days'] = days
+    written['seconds'] = round(time.perf_counter() - started, 3)
+    return written
+
+
+def _summarize(timings, queries):
+    return {
+        'runs': len(timings),
+        'min': round(min(timings), 6),
+        'median': round(statistics.median(timings), 6),
+        'mean': round(statistics.fmean(timings), 6),
+        'max': round(max(timings), 6),
+        'queries': queries,
+    }
+
+
+def time_case(func, repeat: int = 3, setup=None):
+    """Run ``func`` ``repeat`` times and return min/median/mean/max seconds and its query count.
+
+    ``setup`` runs untimed before every call; its return value is passed to ``func``.
+    """
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func(arg) if setup is not None else func()
+            timings.append(time.perf_counter() - started)
+        queries = len(ctx.captured_queries)
+    return _summarize(timings, queries)
+
+
+def _write_import_csv(skus, rng):
+    handle, path = tempfile.mkstemp(suffix='.csv', prefix='inventory-bench-')
+    with os.fdopen(handle, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(REQUIRED_HEADERS)
+        for n, sku in enumerate(skus, start=1):
+            writer.writerow([n, f'Imported {sku}', sku, 0, 0, rng.randint(0, 500), 'NEEDS RESTOCK' if n % 7 == 0 else ''])
+    return path
+
+
+def _benchmark_products(limit):
+    return list(
+        Product.objects.filter(sku__startswith=f'{BENCHMARK_SKU_PREFIX}-', current_stock__gt=0)
+        .order_by('pk').values_list('pk', flat=True)[:limit]
+    )
+
+
+def run_benchmarks(repeat: int = 3, cases=None, orders: int = 50, import_rows: int = 1000, seed: int = 0):
+    """Time the inventory hot paths against whatever catalog is in the database.
+
+    - fifo_removal: ``orders`` single-line orders through remove_stock_fifo_bulk.
+    - csv_import: an ``import_rows`` CSV (half existing SKUs, half new) in append mode.
+    - evaluate_all_alerts / all_reorder_recommendations: one full-catalog pass.
+    - snapshot_rollups: rebuild of every rollup plus an incremental refresh of this month.
+    - list_endpoints: one GET per list endpoint through the test client, timed ``cold`` (the
+      inventory response cache cleared before every run) and ``warm`` (served from it).
+
+    Every case is run ``repeat`` times. Returns a JSON-ready dict of per-case summaries.
+    """
+    rng = random.Random(seed)
+    selected = list(cases or BENCHMARK_CASES)
+    unknown = set(selected) - set(BENCHMARK_CASES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark case(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    if 'fifo_removal' in selected:
+        def pick_orders():
+            return [(pid, 1) for pid in rng.choices(_benchmark_products(1000) or [0], k=orders)]
+
+        def consume(lines):
+            for line in lines:
+                remove_stock_fifo_bulk([line])
+
+        results['fifo_removal'] = dict(time_case(consume, repeat, setup=pick_orders), operations=orders)
+
+    if 'csv_import' in selected:
+        existing = list(Product.objects.order_by('pk').values_list('sku', flat=True)[:import_rows // 2])
+        paths = []
+
+        def make_file():
+            suffix = len(paths)
+            new = [f'{BENCHMARK_SKU_PREFIX}-IMPORT-{suffix}-{i:06d}' for i in range(import_rows - len(existing))]
+            paths.append(_write_import_csv(existing + new, rng))
+            return paths[-1]
+
+        try:
+            results['csv_import'] = dict(time_case(import_inventory_csv, repeat, setup=make_file), operations=import_rows)
+        finally:
+            for path in paths:
+                os.remove(path)
+
+    if 'evaluate_all_alerts' in selected:
+        results['evaluate_all_alerts'] = time_case(evaluate_all_alerts, repeat)
+
+    if 'all_reorder_recommendations' in selected:
+        results['all_reorder_recommendations'] = time_case(all_reorder_recommendations, repeat)
+
+    if 'snapshot_rollups' in selected:
+        results['snapshot_rollups'] = {
+            'rebuild': time_case(rebuild_stock_rollups, repeat),
+            'refresh_month': time_case(lambda: refresh_stock_rollups([date.today()]), repeat),
+        }
+
+    if 'list_endpoints' in selected:
+        client = Client()
+        endpoints = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, url in LIST_ENDPOINTS:
+                sizes = []
+
+                def fetch(_=None, url=url, sizes=sizes):
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise RuntimeError(f'GET {url} returned {response.status_code}')
+                    sizes.append(len(response.content))
+
+                cold = time_case(fetch, repeat, setup=get_cache().clear)
+                # The last cold run left the payload cached
+                warm = time_case(fetch, repeat)
+                endpoints[name] = {'url': url, 'bytes': sizes[-1], 'cold': cold, 'warm': warm}
+        results['list_endpoints'] = endpoints
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'platform': platform.platform(),
+        },
+        'catalog': {
+            'products': Product.objects.count(),
+            'inventory_batches': InventoryBatch.objects.count(),
+            'daily_sales': ProductDailySales.objects.count(),
+            'stock_snapshots': ProductStockSnapshot.objects.count(),
+        },
+        'repeat': repeat,
+        'results': results,
+    }
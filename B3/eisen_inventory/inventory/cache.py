@@ -0,0 +1,88 @@
+"""Versioned response cache for the read-heavy inventory endpoints.
+
+Each cached payload is stored under a key that embeds the current version of every model it
+was built from. Writes bump those versions: instance saves/deletes through
+``models.VersionedModel`` and queryset ``update``/``delete``/``bulk_create``/``bulk_update``
+through ``models.VersionedQuerySet``; raw SQL writers call ``bump_model_versions``
+themselves. The next read then misses and rebuilds; superseded entries are never read
+again and expire after INVENTORY_CACHE_TIMEOUT.
+
+Versions live in the same backend as the payloads (the ``inventory`` cache alias). With the
+file backend every worker on the host sees a bump; with local memory only the process that
+wrote does, and other workers may serve a stale payload until it times out.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+_MISSING = object()
+
+
+def get_cache():
+    return caches[getattr(settings, 'INVENTORY_CACHE_ALIAS', 'inventory')]
+
+
+def cache_enabled():
+    return getattr(settings, 'INVENTORY_CACHE_ENABLED', True)
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def _version_key(label):
+    return f'inventory:version:{label}'
+
+
+def model_versions(models):
+    """Current version per model label; unseen labels start at the current time in ns so a
+    cleared or evicted version never comes back as one an old payload was keyed under."""
+    cache = get_cache()
+    labels = sorted({_label(m) for m in models})
+    versions = cache.get_many([_version_key(label) for label in labels])
+    for label in labels:
+        key = _version_key(label)
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [(label, versions[_version_key(label)]) for label in labels]
+
+
+def _bump(labels):
+    cache = get_cache()
+    for label in labels:
+        key = _version_key(label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_model_versions(*models):
+    """Invalidate every cached payload built from ``models``.
+
+    Bumped straight away and again after the surrounding transaction commits, so a reader
+    that cached pre-commit data under the first bump is superseded too.
+    """
+    labels = {_label(m) for m in models}
+    _bump(labels)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(labels))
+
+
+def cached_payload(name, key, depends_on, build):
+    """Return the cached result of ``build()`` for (name, key) at the current model versions."""
+    if not cache_enabled():
+        return build()
+    cache = get_cache()
+    versions = model_versions(depends_on)
+    digest = hashlib.md5(f'{versions}|{key}'.encode()).hexdigest()
+    cache_key = f'inventory:payload:{name}:{digest}'
+    data = cache.get(cache_key, _MISSING)
+    if data is _MISSING:
+        data = build()
+        cache.set(cache_key, data, timeout=getattr(settings, 'INVENTORY_CACHE_TIMEOUT', 300))
+    return data
@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from inventory.benchmarks import (
+    BENCHMARK_CASES,
+    BENCHMARK_SKU_PREFIX,
+    generate_synthetic_catalog,
+    run_benchmarks,
+)
+from inventory.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic catalog and time the inventory hot paths, printing JSON results. "
+        "Writes to the configured database: run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help='Products to generate')
+        parser.add_argument('--suppliers', type=int, default=20, help='Suppliers to generate')
+        parser.add_argument('--years', type=int, choices=[1, 2, 3], default=1, help='Years of daily sales and snapshots')
+        parser.add_argument('--days', type=int, default=None, help='Days of history (overrides --years)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the catalog and the benchmark inputs')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark case')
+        parser.add_argument(
+            '--case', action='append', dest='cases', choices=BENCHMARK_CASES,
+            help='Benchmark case to run (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--skip-generate', action='store_true',
+            help='Benchmark the catalog already in the database instead of generating one',
+        )
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        catalog = None
+        if not options['skip_generate']:
+            if Product.objects.filter(sku__startswith=f'{BENCHMARK_SKU_PREFIX}-').exists():
+                raise CommandError(
+                    'A synthetic catalog already exists; use --skip-generate or start from an empty database'
+                )
+            self.stderr.write(f"Generating {options['products']} products...")
+            catalog = generate_synthetic_catalog(
+                products=options['products'],
+                suppliers=options['suppliers'],
+                years=options['years'],
+                days=options['days'],
+                seed=options['seed'],
+            )
+            self.stderr.write(f"Catalog generated in {catalog['seconds']}s")
+
+        report = run_benchmarks(repeat=options['repeat'], cases=options['cases'], seed=options['seed'])
+        report['generated'] = catalog
+        payload = json.dumps(report, indent=2, default=str)
+        if options['output']:
+            Path(options['output']).write_text(payload + '\n', encoding='utf-8')
+            self.stderr.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(payload)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from inventory.utils import checkpoint_stock_ledger, CHECKPOINT_LAG_SECONDS
+
+
+class Command(BaseCommand):
+    help = "Fold recent stock movements into per-product balance checkpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=int, default=CHECKPOINT_LAG_SECONDS,
+                            help='Ignore movements newer than this many seconds (still in flight)')
+
+    def handle(self, *args, **options):
+        result = checkpoint_stock_ledger(lag_seconds=options['lag'])
+        self.stdout.write(self.style.SUCCESS(f"Checkpoint: {result}"))
@@ -72,6 +72,7 @@ class Command(BaseCommand):
                     'message': f'Stock level ({product.current_stock}) is below minimum ({product.minimum_stock_level})',
                     'current_stock_at_trigger': product.current_stock,
                     'minimum_stock_level': product.minimum_stock_level,
+                    'threshold_at_trigger': max(product.minimum_stock_level, product.reorder_point),
                 }
             )
             if created:
@@ -1,17 +1,17 @@
 from django.core.management.base import BaseCommand
-from inventory.models import Product
+from inventory.utils import evaluate_reorder_statuses
 
 
 class Command(BaseCommand):
-    help = "Evaluate and update reorder_status for all products"
+    help = "Evaluate and update reorder_status for all products against their reorder point"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products classified and written per batch')
 
     def handle(self, *args, **options):
-        updated = 0
-        total = 0
-        for product in Product.objects.all():
-            total += 1
-            old = product.reorder_status
-            product.evaluate_reorder_status(save=True)
-            if product.reorder_status != old:
-                updated += 1
-        self.stdout.write(self.style.SUCCESS(f"Evaluated {total} products. {updated} status changes."))
\ No newline at end of file
+        result = evaluate_reorder_statuses(batch_size=options['batch_size'])
+        breakdown = ' '.join(f"{status}:{count}" for status, count in result['statuses'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Evaluated {result['evaluated']} products in {result['seconds']}s. "
+            f"{result['changed']} status changes -> {breakdown}"
+        ))
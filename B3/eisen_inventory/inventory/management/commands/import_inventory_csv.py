@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand, CommandError
-from inventory.utils import import_inventory_csv, convert_excel_to_csv
+from inventory.utils import import_inventory_csv, import_inventory_excel, IMPORT_CHUNK_SIZE
 from pathlib import Path
 
 
@@ -14,7 +14,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--excel',
             action='store_true',
-            help='Treat input as Excel and convert to CSV first',
+            help='Treat input as Excel and stream rows from the workbook',
         )
         parser.add_argument(
             '--mode',
@@ -22,18 +22,20 @@ class Command(BaseCommand):
             default='append',
             help='Append to existing data or replace everything',
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Rows per bulk write/transaction',
+        )
 
     def handle(self, *args, **options):
         path = Path(options['path'])
         if not path.exists():
             raise CommandError(f"File not found: {path}")
 
-        if options['excel']:
-            self.stdout.write("Converting Excel to CSV...")
-            csv_path = convert_excel_to_csv(path)
-        else:
-            csv_path = str(path)
-
-        self.stdout.write(f"Importing: {csv_path} (mode={options['mode']})")
-        result = import_inventory_csv(csv_path, mode=options['mode'])
-        self.stdout.write(self.style.SUCCESS(f"Import complete: {result}"))
\ No newline at end of file
+        importer = import_inventory_excel if options['excel'] else import_inventory_csv
+        self.stdout.write(f"Importing: {path} (mode={options['mode']})")
+        result = importer(path, mode=options['mode'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Import complete: {result}"))
+        self.stdout.write(f"{result['rows']} rows in {result['seconds']}s ({result['rows_per_sec']} rows/sec)")
\ No newline at end of file
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from inventory.utils import rebuild_stock_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild monthly and yearly stock rollups from daily snapshots"
+
+    def handle(self, *args, **options):
+        result = rebuild_stock_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rollups: {result}"))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from inventory.utils import refresh_reorder_points
+
+
+class Command(BaseCommand):
+    help = "Recompute persisted reorder_point, safety_stock, avg_daily_usage and max_daily_usage for all products"
+
+    def handle(self, *args, **options):
+        result = refresh_reorder_points()
+        self.stdout.write(self.style.SUCCESS(f"Reorder points: {result}"))
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from inventory.models import ImportJob
+from inventory.utils import claim_next_import_job, requeue_stale_import_jobs, run_import_job, IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Process queued inventory import jobs on a local thread pool (no external broker needed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Jobs processed concurrently')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between queue checks')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows per committed chunk')
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help='Requeue RUNNING jobs with no progress for this many seconds')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        requeued = requeue_stale_import_jobs(options['stale_after'])
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} interrupted job(s); they will resume."))
+        self.stdout.write(f"Import worker started with {workers} worker(s).")
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                running = {f for f in running if not f.done()}
+                claimed = False
+                while len(running) < workers:
+                    job = claim_next_import_job()
+                    if job is None:
+                        break
+                    claimed = True
+                    self.stdout.write(f"Job {job.pk}: {job.original_name or job.file_path} (resume at row {job.rows_processed})")
+                    running.add(pool.submit(self._run, job, options['chunk_size']))
+                if options['once'] and not running and not claimed:
+                    break
+                time.sleep(options['poll'])
+
+    def _run(self, job, chunk_size):
+        try:
+            job = run_import_job(job, chunk_size=chunk_size)
+            style = self.style.SUCCESS if job.status == ImportJob.STATUS_DONE else self.style.ERROR
+            self.stdout.write(style(
+                f"Job {job.pk} {job.status}: {job.rows_processed} rows, {job.rows_per_sec} rows/sec"
+            ))
+        finally:
+            # Each pool thread has its own DB connection
+            connection.close()
@@ -0,0 +1,63 @@
+import json
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from inventory.scheduler import JOB_FUNCTIONS, Scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the periodic inventory jobs (snapshots, alerts, reorder points, ledger checkpoints) "
+        "from one long-running process on a thread pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs run concurrently')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between checks for due jobs')
+        parser.add_argument('--job', action='append', dest='jobs', choices=sorted(JOB_FUNCTIONS),
+                            help='Only run this job (repeatable; default: all)')
+        parser.add_argument('--interval', action='append', default=[], metavar='JOB=SECONDS',
+                            help='Run a job on this interval instead of its configured schedule (repeatable)')
+        parser.add_argument('--report-every', type=float, default=600,
+                            help='Seconds between job timing reports (0 disables)')
+        parser.add_argument('--once', action='store_true', help='Run every job once, concurrently, then exit')
+
+    def _parse_intervals(self, values):
+        intervals = {}
+        for value in values:
+            name, sep, seconds = value.partition('=')
+            if not sep or name not in JOB_FUNCTIONS:
+                raise CommandError(f"--interval expects JOB=SECONDS with JOB one of {', '.join(sorted(JOB_FUNCTIONS))}")
+            try:
+                intervals[name] = float(seconds)
+            except ValueError:
+                raise CommandError(f'Invalid interval for {name}: {seconds}')
+        return intervals
+
+    def _report(self, stats):
+        self.stdout.write(json.dumps(stats, indent=2, default=str))
+
+    def handle(self, *args, **options):
+        try:
+            scheduler = Scheduler.from_settings(
+                only=options['jobs'],
+                intervals=self._parse_intervals(options['interval']),
+                workers=options['workers'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['once']:
+            scheduler.run_once()
+            self._report(scheduler.stats())
+            return
+
+        for job in scheduler.jobs.values():
+            self.stdout.write(f"{job.name}: {job.schedule}")
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        try:
+            scheduler.run_forever(options['poll'], report=self._report, report_every=options['report_every'] or None)
+        except KeyboardInterrupt:
+            scheduler.stop()
+        self.stdout.write(self.style.SUCCESS('Scheduler stopped; final job stats:'))
+        self._report(scheduler.stats())
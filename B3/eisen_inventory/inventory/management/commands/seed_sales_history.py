@@ -4,6 +4,7 @@ from datetime import timedelta
 import random
 
 from inventory.models import Product, ProductDailySales, SupplierProduct
+from inventory.utils import upsert_daily_sales
 
 class Command(BaseCommand):
     help = "Seed synthetic daily sales/usage history for products to test reorder calculations"
@@ -19,7 +20,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR('No products present. Add products first.'))
             return
 
-        created = 0
+        rows = []
         for product in products:
             base = random.randint(2, 8)  # base daily demand
             for i in range(days):
@@ -28,11 +29,11 @@ class Command(BaseCommand):
                 qty = max(0, int(random.gauss(base, base * 0.3)))
                 if random.random() < 0.05:
                     qty += base * 3  # spike day
-                obj, was_created = ProductDailySales.objects.get_or_create(product=product, date=d, defaults={'quantity': qty})
-                if not was_created:
-                    # Don't overwrite existing curated data
-                    continue
-                created += 1
+                rows.append((product.sku, d, qty))
+        before = ProductDailySales.objects.count()
+        # Don't overwrite existing curated data
+        upsert_daily_sales(rows, overwrite=False)
+        created = ProductDailySales.objects.count() - before
         self.stdout.write(self.style.SUCCESS(f'Created {created} daily sales records.'))
 
         # Derive some lead times if missing
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from inventory.utils import create_daily_stock_snapshots
+from inventory.utils import create_daily_stock_snapshots, backfill_stock_snapshots
 
 
 class Command(BaseCommand):
@@ -7,18 +7,46 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--date', help='YYYY-MM-DD (defaults to today)', default=None)
+        parser.add_argument('--backfill-from', help='YYYY-MM-DD; fill missing snapshots from this date', default=None)
+        parser.add_argument('--backfill-to', help='YYYY-MM-DD; last date to backfill (defaults to today)', default=None)
+        parser.add_argument(
+            '--reconstruct', action='store_true',
+            help=(
+                'Allow backfilling days before the stock movement ledger starts by rebuilding levels backwards '
+                'from current stock, daily sales and batch receipts. Batches only keep their remaining quantity, '
+                'so levels before a consumed batch arrived come out too low; treat them as estimates.'
+            ),
+        )
+
+    def _parse_date(self, value, option):
+        from datetime import date as date_cls
+        try:
+            parts = [int(p) for p in value.split('-')]
+            return date_cls(parts[0], parts[1], parts[2])
+        except Exception:
+            self.stderr.write(f'Invalid {option} format, expected YYYY-MM-DD')
+            return None
 
     def handle(self, *args, **options):
+        if options.get('backfill_from'):
+            start = self._parse_date(options['backfill_from'], '--backfill-from')
+            end = self._parse_date(options['backfill_to'], '--backfill-to') if options.get('backfill_to') else None
+            if start is None or (options.get('backfill_to') and end is None):
+                return
+            try:
+                result = backfill_stock_snapshots(start, end, reconstruct=options['reconstruct'])
+            except ValueError as exc:
+                self.stderr.write(f'{exc} (pass --reconstruct)')
+                return
+            self.stdout.write(self.style.SUCCESS(f"Backfill: {result}"))
+            return
+
         date = options.get('date')
         if date:
-            from datetime import date as date_cls
-            try:
-                parts = [int(p) for p in date.split('-')]
-                date_val = date_cls(parts[0], parts[1], parts[2])
-            except Exception:
-                self.stderr.write('Invalid --date format, expected YYYY-MM-DD')
+            date_val = self._parse_date(date, '--date')
+            if date_val is None:
                 return
         else:
             date_val = None
         result = create_daily_stock_snapshots(date=date_val)
-        self.stdout.write(self.style.SUCCESS(f"Snapshots: {result}"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"Snapshots: {result}"))
@@ -0,0 +1,258 @@
+"""Per-view request instrumentation exposed in Prometheus text format.
+
+MetricsMiddleware records, for every request under EISEN_METRICS_PATH_PREFIX, the number of
+SQL queries, time spent in the database, time spent serializing (DRF serializers plus
+response rendering), response size and total latency. Values go into in-process
+histograms labelled by view name and method, served by ``metrics_view`` at /api/_metrics/.
+
+With EISEN_SLOW_QUERY_MS set, queries slower than that are logged to the
+``inventory.slow_queries`` logger together with the first frame from one of
+EISEN_SLOW_QUERY_MODULES (by default ``inventory.utils``) that issued them.
+"""
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+import bisect
+import logging
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger('inventory.slow_queries')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, documentation, buckets, labels=('view', 'method')):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self, label_values):
+        """(per-bucket counts, sum, count) for one label set, or None."""
+        with self._lock:
+            series = self._series.get(label_values)
+            return None if series is None else (list(series[0]), series[1], series[2])
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for label_values, (counts, total, count) in items:
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total!r}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f'{self.name}{{{labels}}} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram('eisen_request_duration_seconds', 'Total request latency.', LATENCY_BUCKETS)
+DB_QUERIES = Histogram('eisen_db_queries', 'SQL queries executed per request.', QUERY_COUNT_BUCKETS)
+DB_SECONDS = Histogram('eisen_db_duration_seconds', 'Time spent executing SQL per request.', LATENCY_BUCKETS)
+SERIALIZATION_SECONDS = Histogram(
+    'eisen_serialization_duration_seconds', 'Time spent in serializers and response rendering per request.',
+    LATENCY_BUCKETS,
+)
+RESPONSE_BYTES = Histogram('eisen_response_size_bytes', 'Response body size.', SIZE_BUCKETS)
+SLOW_QUERIES = Counter('eisen_slow_queries_total', 'Queries slower than EISEN_SLOW_QUERY_MS.', ('view', 'origin'))
+
+REGISTRY = (REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, SERIALIZATION_SECONDS, RESPONSE_BYTES, SLOW_QUERIES)
+
+
+def reset_metrics():
+    for metric in REGISTRY:
+        metric.reset()
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    __slots__ = ('view', 'queries', 'db_seconds', 'serialization_seconds', 'render_started')
+
+    def __init__(self):
+        self.view = 'unresolved'
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.render_started = None
+
+
+_current = ContextVar('eisen_request_stats', default=None)
+_serializing = ContextVar('eisen_serializing', default=False)
+
+
+@contextmanager
+def track_serialization():
+    """Add the time spent inside the block to the current request's serialization total.
+
+    Nested blocks (serializers within serializers) are only counted once.
+    """
+    stats = _current.get()
+    if stats is None or _serializing.get():
+        yield
+        return
+    token = _serializing.set(True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialization_seconds += time.perf_counter() - started
+        _serializing.reset(token)
+
+
+def _query_origin(modules):
+    """``module.function:line`` of the innermost caller frame from one of ``modules``."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module in modules:
+            return f'{module}.{frame.f_code.co_name}:{frame.f_lineno}'
+        frame = frame.f_back
+    return 'other'
+
+
+class MetricsMiddleware:
+    """Collect per-view query, DB-time, serialization-time and size histograms."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = getattr(settings, 'EISEN_METRICS_PATH_PREFIX', '/api/')
+        self.slow_ms = getattr(settings, 'EISEN_SLOW_QUERY_MS', None)
+        self.slow_modules = frozenset(getattr(settings, 'EISEN_SLOW_QUERY_MODULES', ('inventory.utils',)))
+
+    def __call__(self, request):
+        if not getattr(settings, 'EISEN_METRICS_ENABLED', True) or not request.path.startswith(self.prefix):
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self._make_wrapper(stats)))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+
+        labels = (stats.view, request.method)
+        REQUEST_SECONDS.observe(labels, elapsed)
+        DB_QUERIES.observe(labels, stats.queries)
+        DB_SECONDS.observe(labels, stats.db_seconds)
+        SERIALIZATION_SECONDS.observe(labels, stats.serialization_seconds)
+        if not response.streaming:
+            RESPONSE_BYTES.observe(labels, len(response.content))
+        elif response.has_header('Content-Length'):
+            RESPONSE_BYTES.observe(labels, int(response['Content-Length']))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = _current.get()
+        match = request.resolver_match
+        if stats is not None and match is not None:
+            stats.view = match.view_name or match.route or 'unnamed'
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook; time the render as serialization
+        stats = _current.get()
+        if stats is not None:
+            stats.render_started = time.perf_counter()
+            response.add_post_render_callback(lambda r: self._render_done(stats))
+        return response
+
+    @staticmethod
+    def _render_done(stats):
+        if stats.render_started is not None:
+            stats.serialization_seconds += time.perf_counter() - stats.render_started
+            stats.render_started = None
+
+    def _make_wrapper(self, stats):
+        slow_seconds = self.slow_ms / 1000 if self.slow_ms is not None else None
+
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - started
+                stats.queries += 1
+                stats.db_seconds += duration
+                if slow_seconds is not None and duration >= slow_seconds:
+                    origin = _query_origin(self.slow_modules)
+                    SLOW_QUERIES.inc((stats.view, origin))
+                    logger.warning('slow query %.1f ms from %s: %s', duration * 1000, origin, sql[:500])
+        return wrapper
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; staff users only."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_active or not user.is_staff:
+        return HttpResponseForbidden('Admin access required')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_productstocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=500)),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('mode', models.CharField(choices=[('append', 'Append'), ('replace_all', 'Replace all')], default='append', max_length=16)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=16)),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True)),
+                ('rows_processed', models.PositiveIntegerField(default=0, help_text='Rows committed so far; a resumed job continues from here')),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('updated_count', models.PositiveIntegerField(default=0)),
+                ('rows_per_sec', models.FloatField(blank=True, null=True)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
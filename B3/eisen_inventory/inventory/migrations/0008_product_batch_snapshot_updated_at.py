@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorybatch',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='productstocksnapshot',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_product_batch_snapshot_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStockMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('total_stock', models.BigIntegerField(default=0, help_text='Sum of snapshot stock levels in the period')),
+                ('snapshot_count', models.PositiveIntegerField(default=0)),
+                ('min_stock', models.PositiveIntegerField(default=0)),
+                ('max_stock', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stock_rollups', to='inventory.product')),
+            ],
+            options={
+                'ordering': ['product__name', 'period_start'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['period_start'], name='inventory_p_period__9a7d24_idx')],
+                'unique_together': {('product', 'period_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductStockYearlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('total_stock', models.BigIntegerField(default=0, help_text='Sum of snapshot stock levels in the period')),
+                ('snapshot_count', models.PositiveIntegerField(default=0)),
+                ('min_stock', models.PositiveIntegerField(default=0)),
+                ('max_stock', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='yearly_stock_rollups', to='inventory.product')),
+            ],
+            options={
+                'ordering': ['product__name', 'period_start'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['period_start'], name='inventory_p_period__fe7bf1_idx')],
+                'unique_together': {('product', 'period_start')},
+            },
+        ),
+    ]
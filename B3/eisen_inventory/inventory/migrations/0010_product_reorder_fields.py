@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:54
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_stock_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='avg_daily_usage',
+            field=models.FloatField(default=0, help_text='Average units sold per day over the last 30 days'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_point',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='safety_stock',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.expressions.CombinedExpression(models.F('current_stock'), '-', models.F('reorder_point')), name='product_reorder_gap_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_product_reorder_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorybatch',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
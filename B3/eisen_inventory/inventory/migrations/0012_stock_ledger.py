@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    """Start every existing product's ledger with its current stock."""
+    Product = apps.get_model('inventory', 'Product')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(product_id=pk, kind='OPENING', quantity=stock)
+            for pk, stock in Product.objects.filter(current_stock__gt=0).values_list('pk', 'current_stock').iterator()
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_inventorybatch_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_id', models.BigIntegerField(help_text='Highest StockMovement id folded into the balance')),
+                ('as_of', models.DateTimeField()),
+                ('balance', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_checkpoints', to='inventory.product')),
+            ],
+            options={
+                'ordering': ['-as_of'],
+                'indexes': [models.Index(fields=['product', 'as_of'], name='inventory_s_product_b28e5a_idx')],
+                'unique_together': {('product', 'movement_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('OPENING', 'Opening balance'), ('RECEIPT', 'Batch received'), ('CONSUMPTION', 'Consumed (FIFO)'), ('ADJUSTMENT', 'Manual adjustment'), ('IMPORT', 'Inventory import')], max_length=16)),
+                ('quantity', models.IntegerField(help_text='Signed change in units (negative for stock leaving)')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movements', to='inventory.inventorybatch')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='inventory.product')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['product', 'created_at'], name='inventory_s_product_5919a9_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorybatch',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['product', 'received_at', 'id'], name='batch_fifo_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(condition=models.Q(('active', True)), fields=['product', 'status'], name='alert_active_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplierproduct',
+            index=models.Index(condition=models.Q(('is_preferred', True)), fields=['product', 'cost_price'], name='supplierproduct_preferred_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplierproduct',
+            index=models.Index(condition=models.Q(('is_preferred', True)), fields=['cost_price', 'id'], name='supplierproduct_pref_cost_idx'),
+        ),
+    ]
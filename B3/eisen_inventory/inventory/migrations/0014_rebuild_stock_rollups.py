@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+
+
+def rebuild_rollups(apps, schema_editor):
+    """Build the monthly and yearly rollups from the snapshots that predate them (as rebuild_stock_rollups)."""
+    Snapshot = apps.get_model('inventory', 'ProductStockSnapshot')
+    Monthly = apps.get_model('inventory', 'ProductStockMonthlyRollup')
+    Yearly = apps.get_model('inventory', 'ProductStockYearlyRollup')
+    Monthly.objects.all().delete()
+    Yearly.objects.all().delete()
+    monthly = (
+        Snapshot.objects.annotate(month=TruncMonth('date'))
+        .order_by().values('product_id', 'month')
+        .annotate(total=Sum('stock_level'), count=Count('pk'), low=Min('stock_level'), high=Max('stock_level'))
+        .values_list('product_id', 'month', 'total', 'count', 'low', 'high')
+    )
+    Monthly.objects.bulk_create(
+        [
+            Monthly(product_id=product_id, period_start=month, total_stock=total, snapshot_count=count,
+                    min_stock=low, max_stock=high)
+            for product_id, month, total, count, low, high in monthly.iterator()
+        ],
+        batch_size=5000,
+    )
+    yearly = (
+        Monthly.objects.annotate(year=TruncYear('period_start'))
+        .order_by().values('product_id', 'year')
+        .annotate(total=Sum('total_stock'), count=Sum('snapshot_count'), low=Min('min_stock'), high=Max('max_stock'))
+        .values_list('product_id', 'year', 'total', 'count', 'low', 'high')
+    )
+    Yearly.objects.bulk_create(
+        [
+            Yearly(product_id=product_id, period_start=year, total_stock=total, snapshot_count=count,
+                   min_stock=low, max_stock=high)
+            for product_id, year, total, count, low, high in yearly.iterator()
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+from django.db import migrations
+from django.db.models import Avg, Max, Q, Sum
+
+
+def backfill_reorder_fields(apps, schema_editor):
+    """Compute avg_daily_usage, safety_stock and reorder_point for products that predate them.
+
+    Same formula as utils.demand_reorder_fields (30-day average usage, 90-day maximum, average
+    and maximum lead time), written against the historical models so later model changes
+    can't alter what this migration does. Sites using INVENTORY_REORDER_POINT_METHOD =
+    'forecast' get forecast-based figures on the next refresh_reorder_points run.
+    """
+    Product = apps.get_model('inventory', 'Product')
+    ProductDailySales = apps.get_model('inventory', 'ProductDailySales')
+    SupplierProduct = apps.get_model('inventory', 'SupplierProduct')
+    today = date.today()
+    sales = {
+        product_id: (recent or 0, peak or 0)
+        for product_id, recent, peak in (
+            ProductDailySales.objects.filter(date__range=(today - timedelta(days=89), today))
+            .order_by().values('product_id')
+            .annotate(recent=Sum('quantity', filter=Q(date__gt=today - timedelta(days=30))), peak=Max('quantity'))
+            .values_list('product_id', 'recent', 'peak')
+        )
+    }
+    lead_times = {
+        product_id: (avg_lt, max_lt)
+        for product_id, avg_lt, max_lt in (
+            SupplierProduct.objects.filter(lead_time_days__isnull=False)
+            .order_by().values('product_id')
+            .annotate(avg_lt=Avg('lead_time_days'), max_lt=Max('lead_time_days'))
+            .values_list('product_id', 'avg_lt', 'max_lt')
+        )
+    }
+    changed = []
+    for product in Product.objects.order_by('pk').only('pk').iterator(chunk_size=1000):
+        recent, peak = sales.get(product.pk, (0, 0))
+        avg_lt, max_lt = lead_times.get(product.pk, (0, 0))
+        avg_usage = recent / 30
+        safety = max(0, (peak * max_lt) - (avg_usage * avg_lt))
+        product.avg_daily_usage = avg_usage
+        product.safety_stock = int(round(safety))
+        product.reorder_point = int(round((avg_usage * avg_lt) + safety))
+        changed.append(product)
+    Product.objects.bulk_update(changed, ['avg_daily_usage', 'safety_stock', 'reorder_point'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_rebuild_stock_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_reorder_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:41
+
+from django.db import migrations, models
+
+
+def copy_minimum_to_threshold(apps, schema_editor):
+    """Existing alerts were raised against the minimum stock level, so that is their threshold."""
+    StockAlert = apps.get_model('inventory', 'StockAlert')
+    StockAlert.objects.update(threshold_at_trigger=models.F('minimum_stock_level'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_backfill_reorder_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockalert',
+            name='threshold_at_trigger',
+            field=models.PositiveIntegerField(default=0, help_text='Reorder threshold (max of minimum stock and reorder point) when triggered'),
+        ),
+        migrations.RunPython(copy_minimum_to_threshold, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='reorder_status',
+            field=models.CharField(choices=[('OK', 'OK'), ('APPROACHING', 'Approaching Reorder Threshold'), ('LOW', 'At or Below Reorder Threshold')], default='OK', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='reorder_warning_buffer_pct',
+            field=models.PositiveIntegerField(default=20, help_text='Percent above the reorder threshold to start warning'),
+        ),
+        migrations.AlterField(
+            model_name='stockalert',
+            name='status',
+            field=models.CharField(choices=[('APPROACHING', 'Approaching Reorder Threshold'), ('LOW', 'At or Below Reorder Threshold')], max_length=16),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:52
+
+from datetime import date, timedelta
+
+from django.db import migrations, models
+
+
+def backfill_max_daily_usage(apps, schema_editor):
+    """Seed the running 90-day peak the sales hooks maintain from here on."""
+    Product = apps.get_model('inventory', 'Product')
+    ProductDailySales = apps.get_model('inventory', 'ProductDailySales')
+    today = date.today()
+    peaks = (
+        ProductDailySales.objects.filter(date__range=(today - timedelta(days=89), today))
+        .order_by().values('product_id').annotate(peak=models.Max('quantity'))
+        .values_list('product_id', 'peak')
+    )
+    Product.objects.bulk_update(
+        [Product(pk=product_id, max_daily_usage=peak) for product_id, peak in peaks],
+        ['max_daily_usage'], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_reorder_threshold_alerts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='max_daily_usage',
+            field=models.PositiveIntegerField(default=0, help_text='Most units sold on one day in the last 90 days'),
+        ),
+        migrations.RunPython(backfill_max_daily_usage, migrations.RunPython.noop),
+    ]
@@ -1,24 +1,97 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from .cache import bump_model_versions
 
-class Product(models.Model):
+
+class VersionedQuerySet(models.QuerySet):
+    """QuerySet whose bulk writes invalidate cached payloads built from its model (see inventory.cache)."""
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            bump_model_versions(self.model)
+        return rows
+
+    def delete(self):
+        deleted = super().delete()
+        if deleted[0]:
+            bump_model_versions(self.model)
+        return deleted
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            bump_model_versions(self.model)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if rows:
+            bump_model_versions(self.model)
+        return rows
+
+
+class VersionedModel(models.Model):
+    """Abstract base whose saves and deletes invalidate cached payloads built from the model."""
+
+    objects = VersionedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_model_versions(type(self))
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_model_versions(type(self))
+        return result
+
+
+class ProductQuerySet(VersionedQuerySet):
+    def with_active_alerts_count(self):
+        return self.annotate(
+            num_active_alerts=models.Count('stock_alerts', filter=models.Q(stock_alerts__active=True))
+        )
+
+    def needs_reorder(self):
+        """Products whose stock has dropped below their persisted reorder point."""
+        return self.alias(reorder_gap=models.F('current_stock') - models.F('reorder_point')).filter(reorder_gap__lt=0)
+
+
+class Product(VersionedModel):
     sku = models.CharField(max_length=64, unique=True)
     name = models.CharField(max_length=255, db_index=True)
     minimum_stock_level = models.PositiveIntegerField(default=0)
     current_stock = models.PositiveIntegerField(default=0)
     # Alert fields
-    reorder_warning_buffer_pct = models.PositiveIntegerField(default=20, help_text="Percent above minimum to start warning")
+    reorder_warning_buffer_pct = models.PositiveIntegerField(default=20, help_text="Percent above the reorder threshold to start warning")
     STATUS_OK = 'OK'
     STATUS_APPROACHING = 'APPROACHING'
     STATUS_LOW = 'LOW'
     REORDER_STATUS_CHOICES = [
         (STATUS_OK, 'OK'),
-        (STATUS_APPROACHING, 'Approaching Minimum'),
-        (STATUS_LOW, 'Below Minimum'),
+        (STATUS_APPROACHING, 'Approaching Reorder Threshold'),
+        (STATUS_LOW, 'At or Below Reorder Threshold'),
     ]
     reorder_status = models.CharField(max_length=16, choices=REORDER_STATUS_CHOICES, default=STATUS_OK)
     reorder_status_changed_at = models.DateTimeField(null=True, blank=True)
+    # Demand-driven reorder figures, maintained from ProductDailySales (see utils.apply_daily_sales_change)
+    avg_daily_usage = models.FloatField(default=0, help_text="Average units sold per day over the last 30 days")
+    max_daily_usage = models.PositiveIntegerField(default=0, help_text="Most units sold on one day in the last 90 days")
+    safety_stock = models.PositiveIntegerField(default=0)
+    reorder_point = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Matches the expression used by ProductQuerySet.needs_reorder
+            models.Index(models.F('current_stock') - models.F('reorder_point'), name='product_reorder_gap_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.sku})"
@@ -26,10 +99,37 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         if not self.reorder_status_changed_at:
             self.reorder_status_changed_at = timezone.now()
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            # Direct edits of current_stock (admin, API, scripts) go into the ledger as adjustments
+            previous = None
+            if update_fields is None or 'current_stock' in update_fields:
+                if not adding:
+                    previous = (
+                        Product.objects.select_for_update().filter(pk=self.pk)
+                        .values_list('current_stock', flat=True).first()
+                    )
+                super().save(*args, **kwargs)
+                delta = self.current_stock - (previous or 0)
+                if delta:
+                    StockMovement.objects.create(
+                        product=self, quantity=delta,
+                        kind=StockMovement.KIND_ADJUSTMENT if previous is not None else StockMovement.KIND_OPENING,
+                    )
+            else:
+                super().save(*args, **kwargs)
+        if adding:
+            # SQLite can hand out a deleted product's id again; drop anything cached under it
+            from .utils import forget_product_caches
+            forget_product_caches(self.pk)
 
     @property
     def active_alerts_count(self):
+        # List views annotate num_active_alerts (ProductQuerySet.with_active_alerts_count) to avoid a COUNT per row
+        annotated = getattr(self, 'num_active_alerts', None)
+        if annotated is not None:
+            return annotated
         return self.stock_alerts.filter(active=True).count()
 
 
@@ -76,12 +176,36 @@ class SupplierProduct(models.Model):
     class Meta:
         unique_together = ("supplier", "product")
         ordering = ["supplier__name", "product__name"]
+        indexes = [
+            # Cheapest preferred supplier of one product (reorder_recommendation)
+            models.Index(
+                fields=["product", "cost_price"], condition=models.Q(is_preferred=True), name="supplierproduct_preferred_idx",
+            ),
+            # Every preferred supplier by price (bulk_reorder_recommendations)
+            models.Index(
+                fields=["cost_price", "id"], condition=models.Q(is_preferred=True), name="supplierproduct_pref_cost_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.supplier.name} -> {self.product.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .utils import invalidate_demand_stats, refresh_reorder_fields
+        invalidate_demand_stats(self.product_id)
+        refresh_reorder_fields(self.product_id)
 
-class InventoryBatch(models.Model):
+    def delete(self, *args, **kwargs):
+        from .utils import invalidate_demand_stats, refresh_reorder_fields
+        product_id = self.product_id
+        result = super().delete(*args, **kwargs)
+        invalidate_demand_stats(product_id)
+        refresh_reorder_fields(product_id)
+        return result
+
+
+class InventoryBatch(VersionedModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField()
     received_at = models.DateTimeField(auto_now_add=True)
@@ -94,6 +218,17 @@ class InventoryBatch(models.Model):
         help_text="Which supplier provided this batch (optional)"
     )
     unit_cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Cost per unit for this batch")
+    # Bumped on every write; stock consumption only updates a batch whose version it read
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # FIFO consumption: open batches of a product, oldest first (utils._consume_stock_once)
+            models.Index(
+                fields=['product', 'received_at', 'id'], condition=models.Q(quantity__gt=0), name='batch_fifo_open_idx',
+            ),
+        ]
 
     def __str__(self):
         supplier_part = f" from {self.supplier.name}" if self.supplier else ""
@@ -101,6 +236,10 @@ class InventoryBatch(models.Model):
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        if not is_new:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
         super().save(*args, **kwargs)
         # After saving, update SupplierProduct linkage info (cost, last supply date)
         if self.supplier:
@@ -128,15 +267,44 @@ class InventoryBatch(models.Model):
             except Exception:
                 # Fail silently so inventory save isn't blocked; in production you may log this.
                 pass
-        # Evaluate alert status after stock change
+        # Evaluate alert status after stock change, against the stored stock level
         try:
             from .utils import evaluate_product_alert
+            self.product.refresh_from_db(fields=['current_stock'])
             evaluate_product_alert(self.product, save=True)
         except Exception:
             pass
 
 
-class ProductDailySales(models.Model):
+class ProductDailySalesQuerySet(VersionedQuerySet):
+    """Queryset writes skip the per-row hooks, so they recompute the touched products' reorder fields in one pass."""
+
+    def _refresh(self, product_ids):
+        from .utils import invalidate_demand_stats, refresh_reorder_points
+        for product_id in product_ids:
+            invalidate_demand_stats(product_id)
+        if product_ids:
+            refresh_reorder_points(product_ids)
+
+    def update(self, **kwargs):
+        with transaction.atomic():
+            product_ids = set(self.values_list('product_id', flat=True))
+            moved_to = kwargs.get('product_id', getattr(kwargs.get('product'), 'pk', None))
+            rows = super().update(**kwargs)
+            if rows:
+                self._refresh(product_ids | ({moved_to} - {None}))
+        return rows
+
+    def delete(self):
+        with transaction.atomic():
+            product_ids = set(self.values_list('product_id', flat=True))
+            deleted = super().delete()
+            if deleted[0]:
+                self._refresh(product_ids)
+        return deleted
+
+
+class ProductDailySales(VersionedModel):
     """Aggregate of outbound usage/sales per product per day to drive forecasting and reorder calculations."""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
     date = models.DateField()
@@ -144,6 +312,8 @@ class ProductDailySales(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductDailySalesQuerySet.as_manager()
+
     class Meta:
         unique_together = ("product", "date")
         ordering = ["-date"]
@@ -151,12 +321,53 @@ class ProductDailySales(models.Model):
     def __str__(self):
         return f"{self.product.name} sales {self.date}: {self.quantity}"
 
+    def _locked_stored(self):
+        """(product_id, date, quantity) as stored, locked until the transaction ends; None if not saved yet."""
+        if self.pk is None:
+            return None
+        return type(self).objects.select_for_update().filter(pk=self.pk).values_list('product_id', 'date', 'quantity').first()
 
-class StockAlert(models.Model):
-    """Historical and active alerts when product stock goes below or near minimum."""
+    def save(self, *args, **kwargs):
+        from .utils import apply_daily_sales_change, invalidate_demand_stats
+        from .timeseries import sales_series
+        with transaction.atomic():
+            # Read under lock so concurrent saves of this row each apply their own difference
+            stored = self._locked_stored()
+            super().save(*args, **kwargs)
+            if stored is not None and stored[:2] == (self.product_id, self.date):
+                changes = [(self.product_id, self.date, stored[2], self.quantity)]
+            else:
+                changes = [(self.product_id, self.date, 0, self.quantity)]
+                if stored is not None:
+                    changes.append((stored[0], stored[1], stored[2], 0))
+            for change in sorted(changes, key=lambda c: c[0]):
+                apply_daily_sales_change(*change)
+        for product_id in {product_id for product_id, _, _, _ in changes}:
+            invalidate_demand_stats(product_id)
+            sales_series.invalidate(product_id)
+
+    def delete(self, *args, **kwargs):
+        from .utils import apply_daily_sales_change, invalidate_demand_stats
+        from .timeseries import sales_series
+        with transaction.atomic():
+            stored = self._locked_stored()
+            result = super().delete(*args, **kwargs)
+            if stored is not None:
+                apply_daily_sales_change(*stored, 0)
+        if stored is not None:
+            invalidate_demand_stats(stored[0])
+            sales_series.invalidate(stored[0])
+        return result
+
+
+class StockAlert(VersionedModel):
+    """Historical and active alerts when product stock reaches or nears its reorder threshold.
+
+    The threshold is the higher of minimum_stock_level and reorder_point (utils.reorder_threshold).
+    """
     STATUS_CHOICES = [
-        (Product.STATUS_APPROACHING, 'Approaching Minimum'),
-        (Product.STATUS_LOW, 'Below Minimum'),
+        (Product.STATUS_APPROACHING, 'Approaching Reorder Threshold'),
+        (Product.STATUS_LOW, 'At or Below Reorder Threshold'),
     ]
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_alerts')
     status = models.CharField(max_length=16, choices=STATUS_CHOICES)
@@ -165,6 +376,9 @@ class StockAlert(models.Model):
     active = models.BooleanField(default=True, db_index=True)
     current_stock_at_trigger = models.PositiveIntegerField()
     minimum_stock_level = models.PositiveIntegerField()
+    threshold_at_trigger = models.PositiveIntegerField(
+        default=0, help_text="Reorder threshold (max of minimum stock and reorder point) when triggered",
+    )
     message = models.CharField(max_length=255, blank=True)
 
     class Meta:
@@ -172,6 +386,8 @@ class StockAlert(models.Model):
         indexes = [
             models.Index(fields=['active']),
             models.Index(fields=['status']),
+            # Active alert of a product in a given status (evaluate_product_alert / evaluate_alerts_bulk)
+            models.Index(fields=['product', 'status'], condition=models.Q(active=True), name='alert_active_product_idx'),
         ]
 
     def resolve(self, save=True):
@@ -186,12 +402,13 @@ class StockAlert(models.Model):
         return f"Alert {self.product.sku} {self.status} ({'active' if self.active else 'resolved'})"
 
 
-class ProductStockSnapshot(models.Model):
+class ProductStockSnapshot(VersionedModel):
     """End-of-day (or point-in-time) stock level snapshot for reporting & charting."""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
     date = models.DateField()
     stock_level = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("product", "date")
@@ -201,4 +418,172 @@ class ProductStockSnapshot(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.product.sku} {self.date} -> {self.stock_level}"
\ No newline at end of file
+        return f"{self.product.sku} {self.date} -> {self.stock_level}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored (product, date) so save() also refreshes the rollup it moved out of
+        instance._stored = (instance.__dict__.get('product_id'), instance.__dict__.get('date'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .timeseries import stock_series
+        from .utils import refresh_stock_rollups
+        previous = getattr(self, '_stored', None) or (self.product_id, self.date)
+        for product_id, day in {previous, (self.product_id, self.date)}:
+            stock_series.invalidate(product_id)
+            refresh_stock_rollups([day], product_ids=[product_id])
+        self._stored = (self.product_id, self.date)
+
+    def delete(self, *args, **kwargs):
+        from .timeseries import stock_series
+        from .utils import refresh_stock_rollups
+        product_id, day = self.product_id, self.date
+        result = super().delete(*args, **kwargs)
+        stock_series.invalidate(product_id)
+        refresh_stock_rollups([day], product_ids=[product_id])
+        return result
+
+
+class StockRollup(VersionedModel):
+    """Pre-aggregated ProductStockSnapshot statistics for one product over one period."""
+    period_start = models.DateField()
+    total_stock = models.BigIntegerField(default=0, help_text="Sum of snapshot stock levels in the period")
+    snapshot_count = models.PositiveIntegerField(default=0)
+    min_stock = models.PositiveIntegerField(default=0)
+    max_stock = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        ordering = ["product__name", "period_start"]
+
+    @property
+    def avg_stock(self):
+        return self.total_stock / self.snapshot_count if self.snapshot_count else None
+
+
+class ProductStockMonthlyRollup(StockRollup):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='monthly_stock_rollups')
+
+    class Meta(StockRollup.Meta):
+        unique_together = ("product", "period_start")
+        indexes = [
+            models.Index(fields=["period_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.period_start:%Y-%m} avg={self.avg_stock}"
+
+
+class ProductStockYearlyRollup(StockRollup):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='yearly_stock_rollups')
+
+    class Meta(StockRollup.Meta):
+        unique_together = ("product", "period_start")
+        indexes = [
+            models.Index(fields=["period_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.period_start:%Y} avg={self.avg_stock}"
+
+
+class ImportJob(models.Model):
+    """An uploaded inventory file waiting for, or processed by, the run_import_worker command."""
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    MODE_CHOICES = [
+        ('append', 'Append'),
+        ('replace_all', 'Replace all'),
+    ]
+    file_path = models.CharField(max_length=500)
+    original_name = models.CharField(max_length=255, blank=True)
+    mode = models.CharField(max_length=16, choices=MODE_CHOICES, default='append')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    rows_processed = models.PositiveIntegerField(default=0, help_text="Rows committed so far; a resumed job continues from here")
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    rows_per_sec = models.FloatField(null=True, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import {self.pk} {self.original_name or self.file_path} ({self.status})"
+
+    @property
+    def eta_seconds(self):
+        if self.status != self.STATUS_RUNNING or not self.rows_per_sec or self.total_rows is None:
+            return None
+        return max(self.total_rows - self.rows_processed, 0) / self.rows_per_sec
+
+
+class StockMovement(models.Model):
+    """Append-only ledger of stock changes; the sum of a product's movements is its stock level."""
+    KIND_OPENING = 'OPENING'
+    KIND_RECEIPT = 'RECEIPT'
+    KIND_CONSUMPTION = 'CONSUMPTION'
+    KIND_ADJUSTMENT = 'ADJUSTMENT'
+    KIND_IMPORT = 'IMPORT'
+    KIND_CHOICES = [
+        (KIND_OPENING, 'Opening balance'),
+        (KIND_RECEIPT, 'Batch received'),
+        (KIND_CONSUMPTION, 'Consumed (FIFO)'),
+        (KIND_ADJUSTMENT, 'Manual adjustment'),
+        (KIND_IMPORT, 'Inventory import'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    batch = models.ForeignKey(InventoryBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='movements')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    quantity = models.IntegerField(help_text="Signed change in units (negative for stock leaving)")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["product", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.kind} {self.quantity:+d} @ {self.created_at}"
+
+
+class StockCheckpoint(models.Model):
+    """Balance of one product after every ledger movement up to ``movement_id``.
+
+    ``as_of`` is a cut-off no included movement is newer than; stock at time T is the latest
+    checkpoint with as_of <= T plus the product's movements after it up to T.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_checkpoints')
+    movement_id = models.BigIntegerField(help_text="Highest StockMovement id folded into the balance")
+    as_of = models.DateTimeField()
+    balance = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("product", "movement_id")
+        ordering = ["-as_of"]
+        indexes = [
+            models.Index(fields=["product", "as_of"]),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} = {self.balance} @ {self.as_of}"
@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+
+class InventoryCursorPagination(CursorPagination):
+    """Cursor pagination for large inventory tables; ``?page_size=`` up to max_page_size."""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class ProductCursorPagination(InventoryCursorPagination):
+    ordering = ('name', 'id')
+
+
+class InventoryBatchCursorPagination(InventoryCursorPagination):
+    ordering = ('-received_at', '-id')
+
+
+class StockSnapshotCursorPagination(InventoryCursorPagination):
+    ordering = ('-date', '-id')
@@ -0,0 +1,277 @@
+"""In-process interval scheduler for the periodic inventory jobs.
+
+One warm Django process runs every job on its own interval (or daily at a local time of
+day) instead of cron starting a fresh process per command. Due jobs are submitted to a
+thread pool so independent jobs run concurrently; a job that is still running when it comes
+due again is skipped rather than started twice. Jobs in the same lock group (JOB_LOCK_GROUPS)
+write the same rows and take turns instead. Every run is timed and counted in the job's
+JobStats.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .utils import (
+    backfill_stock_snapshots, checkpoint_stock_ledger, create_daily_stock_snapshots, evaluate_all_alerts,
+    evaluate_reorder_statuses, refresh_reorder_points,
+)
+
+logger = logging.getLogger('inventory.scheduler')
+
+DEFAULT_INTERVALS = {
+    'stock_alerts': 300,
+    'reorder_points': 3600,
+    'ledger_checkpoint': 300,
+}
+# Jobs run once a day at a local HH:MM instead of on an interval
+DEFAULT_DAILY_AT = {
+    'stock_snapshots': '00:05',
+}
+# Jobs that bulk-write the same rows (Product.reorder_status) never run at the same time
+JOB_LOCK_GROUPS = {
+    'stock_alerts': 'reorder_status',
+    'reorder_points': 'reorder_status',
+}
+
+
+def _stock_snapshots():
+    """Snapshot yesterday's end-of-day levels from the movement ledger.
+
+    Running after midnight for the previous date keeps the nightly end-of-day semantics
+    whenever the job happens to run. Until the ledger reaches back past yesterday, the
+    current levels are used, as the nightly command did.
+    """
+    yesterday = date.today() - timedelta(days=1)
+    try:
+        return backfill_stock_snapshots(yesterday, yesterday)
+    except ValueError:
+        return create_daily_stock_snapshots(yesterday)
+
+
+def _stock_alerts():
+    return {'evaluated': len(evaluate_all_alerts())}
+
+
+def _reorder_points():
+    # New reorder points can move products across the LOW/APPROACHING threshold
+    return {'points': refresh_reorder_points(), 'statuses': evaluate_reorder_statuses()}
+
+
+JOB_FUNCTIONS = {
+    'stock_snapshots': _stock_snapshots,
+    'stock_alerts': _stock_alerts,
+    'reorder_points': _reorder_points,
+    'ledger_checkpoint': checkpoint_stock_ledger,
+}
+
+
+def configured_intervals():
+    """DEFAULT_INTERVALS overridden by settings.INVENTORY_SCHEDULER_INTERVALS (seconds)."""
+    return {**DEFAULT_INTERVALS, **getattr(settings, 'INVENTORY_SCHEDULER_INTERVALS', {})}
+
+
+def configured_daily_at():
+    """DEFAULT_DAILY_AT overridden by settings.INVENTORY_SCHEDULER_DAILY_AT (local HH:MM)."""
+    return {**DEFAULT_DAILY_AT, **getattr(settings, 'INVENTORY_SCHEDULER_DAILY_AT', {})}
+
+
+class JobStats:
+    """Run counts and timings for one job."""
+
+    __slots__ = ('runs', 'failures', 'skipped', 'total_seconds', 'max_seconds', 'last_seconds',
+                 'last_started', 'last_result', 'last_error')
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = None
+        self.last_started = None
+        self.last_result = None
+        self.last_error = None
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['mean_seconds'] = self.total_seconds / self.runs if self.runs else None
+        return data
+
+
+class ScheduledJob:
+    """A job run every ``interval`` seconds, or daily at ``at`` (local "HH:MM").
+
+    Either way the first run is due straight away. ``lock`` is shared with the other jobs
+    of its lock group and held while the job runs.
+    """
+
+    def __init__(self, name, func, interval: float = None, at: str = None, lock=None):
+        if (interval is None) == (at is None):
+            raise ValueError(f'{name}: give either an interval or a daily time')
+        if interval is not None and interval <= 0:
+            raise ValueError(f'{name}: interval must be positive')
+        if at is not None:
+            try:
+                at = datetime.strptime(at, '%H:%M').time()
+            except ValueError:
+                raise ValueError(f'{name}: daily time must be HH:MM')
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.at = at
+        self.lock = lock
+        self.next_run = 0.0
+        self.stats = JobStats()
+        self._running = threading.Lock()
+
+    def following(self, now: float):
+        """When the run after one due at ``now`` (monotonic seconds) comes due."""
+        if self.at is None:
+            return now + self.interval
+        current = timezone.localtime()
+        target = current.replace(hour=self.at.hour, minute=self.at.minute, second=0, microsecond=0)
+        if target <= current:
+            target += timedelta(days=1)
+        return now + (target - current).total_seconds()
+
+    @property
+    def schedule(self):
+        return f'every {self.interval:g}s' if self.at is None else f"daily at {self.at.strftime('%H:%M')}"
+
+    def claim(self):
+        """Mark the job as running; False (and counted as skipped) if a run is in progress."""
+        if self._running.acquire(blocking=False):
+            return True
+        self.stats.skipped += 1
+        logger.warning('%s still running, skipped', self.name)
+        return False
+
+    def run(self):
+        """Run once in the calling thread; returns False if a previous run is still going."""
+        if not self.claim():
+            return False
+        self.run_claimed()
+        return True
+
+    def run_claimed(self):
+        """Run after a successful claim() (possibly from another thread) and release it.
+
+        Waits for the lock group first; the wait is not counted in the run's timings.
+        """
+        try:
+            with self.lock or nullcontext():
+                self._timed_run()
+        finally:
+            self._running.release()
+
+    def _timed_run(self):
+        started = time.perf_counter()
+        self.stats.last_started = time.time()
+        try:
+            self.stats.last_result = self.func()
+            self.stats.last_error = None
+        except Exception as exc:
+            self.stats.failures += 1
+            self.stats.last_error = repr(exc)
+            logger.exception('%s failed', self.name)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats.runs += 1
+            self.stats.total_seconds += elapsed
+            self.stats.max_seconds = max(self.stats.max_seconds, elapsed)
+            self.stats.last_seconds = elapsed
+            logger.info('%s finished in %.3fs', self.name, elapsed)
+
+    @property
+    def running(self):
+        return self._running.locked()
+
+
+class Scheduler:
+    """Submit due jobs to a thread pool; each job runs at most once at a time."""
+
+    def __init__(self, jobs, workers: int = 4):
+        self.jobs = {job.name: job for job in jobs}
+        self.workers = max(workers, 1)
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_settings(cls, only=None, intervals=None, workers: int = 4):
+        """Jobs from JOB_FUNCTIONS on their configured schedules; ``intervals`` overrides both
+        the configured intervals and daily times."""
+        daily = {name: at for name, at in configured_daily_at().items() if name not in (intervals or {})}
+        intervals = {**configured_intervals(), **(intervals or {})}
+        names = only or list(JOB_FUNCTIONS)
+        unknown = set(names) - set(JOB_FUNCTIONS)
+        if unknown:
+            raise ValueError(f"Unknown job(s): {', '.join(sorted(unknown))}")
+        locks = {group: threading.Lock() for group in set(JOB_LOCK_GROUPS.values())}
+        jobs = [
+            ScheduledJob(
+                name, JOB_FUNCTIONS[name], interval=None if name in daily else intervals[name], at=daily.get(name),
+                lock=locks.get(JOB_LOCK_GROUPS.get(name)),
+            )
+            for name in names
+        ]
+        return cls(jobs, workers=workers)
+
+    def due(self, now: float):
+        return [job for job in self.jobs.values() if job.next_run <= now]
+
+    def submit_due(self, pool, now: float = None):
+        """Submit every due job that isn't already running or queued; returns the futures."""
+        now = time.monotonic() if now is None else now
+        futures = []
+        for job in self.due(now):
+            job.next_run = job.following(now)
+            # Claimed here rather than in the worker so a job waiting for a free thread
+            # can't be queued a second time
+            if job.claim():
+                futures.append(pool.submit(self._run_in_thread, job))
+        return futures
+
+    @staticmethod
+    def _run_in_thread(job):
+        try:
+            job.run_claimed()
+        finally:
+            # Each pool thread has its own DB connection; don't hold it between runs
+            connection.close()
+
+    def run_once(self):
+        """Run every job once, concurrently, and wait for all of them."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='inventory-job') as pool:
+            futures = self.submit_due(pool, now=float('inf'))
+            for future in futures:
+                future.result()
+
+    def run_forever(self, poll: float = 1.0, report=None, report_every: float = None):
+        """Submit due jobs every ``poll`` seconds until stop(); waits for running jobs on exit.
+
+        ``report(stats)`` is called every ``report_every`` seconds, if given.
+        """
+        next_report = time.monotonic() + report_every if report and report_every else None
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='inventory-job') as pool:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                self.submit_due(pool, now)
+                if next_report is not None and now >= next_report:
+                    report(self.stats())
+                    next_report = now + report_every
+                self._stop.wait(poll)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            name: dict(job.stats.as_dict(), interval=job.interval, schedule=job.schedule)
+            for name, job in self.jobs.items()
+        }
@@ -1,15 +1,38 @@
 from rest_framework import serializers
-from .models import Product, InventoryBatch, Supplier, SupplierProduct, ProductDailySales, StockAlert, ProductStockSnapshot
+from .metrics import track_serialization
+from .models import Product, InventoryBatch, Supplier, SupplierProduct, ProductDailySales, StockAlert, ProductStockSnapshot, ImportJob
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Limit GET output to the comma-separated ``?fields=`` query parameter, if given."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        fields = request.query_params.get('fields')
+        if not fields:
+            return
+        wanted = {f.strip() for f in fields.split(',') if f.strip()}
+        for name in list(self.fields):
+            if name not in wanted:
+                self.fields.pop(name)
+
+    def to_representation(self, instance):
+        with track_serialization():
+            return super().to_representation(instance)
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     active_alerts_count = serializers.IntegerField(read_only=True)
     class Meta:
         model = Product
         fields = '__all__'
+        read_only_fields = ('avg_daily_usage', 'max_daily_usage', 'safety_stock', 'reorder_point')
 
 
-class SupplierSerializer(serializers.ModelSerializer):
+class SupplierSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_count = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -21,7 +44,7 @@ class SupplierSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at', 'product_count')
 
 
-class SupplierProductSerializer(serializers.ModelSerializer):
+class SupplierProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     supplier_name = serializers.CharField(source='supplier.name', read_only=True)
     product_name = serializers.CharField(source='product.name', read_only=True)
 
@@ -35,16 +58,17 @@ class SupplierProductSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at')
 
 
-class InventoryBatchSerializer(serializers.ModelSerializer):
+class InventoryBatchSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     supplier_name = serializers.CharField(source='supplier.name', read_only=True)
     product_name = serializers.CharField(source='product.name', read_only=True)
 
     class Meta:
         model = InventoryBatch
         fields = '__all__'
+        read_only_fields = ('version',)
 
 
-class ProductDailySalesSerializer(serializers.ModelSerializer):
+class ProductDailySalesSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
 
     class Meta:
@@ -53,24 +77,37 @@ class ProductDailySalesSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at')
 
 
-class StockAlertSerializer(serializers.ModelSerializer):
+class StockAlertSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
 
     class Meta:
         model = StockAlert
         fields = [
             'id', 'product', 'product_name', 'status', 'active', 'created_at', 'resolved_at',
-            'current_stock_at_trigger', 'minimum_stock_level', 'message'
+            'current_stock_at_trigger', 'minimum_stock_level', 'threshold_at_trigger', 'message'
         ]
         read_only_fields = (
-            'created_at', 'resolved_at', 'current_stock_at_trigger', 'minimum_stock_level', 'message'
+            'created_at', 'resolved_at', 'current_stock_at_trigger', 'minimum_stock_level', 'threshold_at_trigger', 'message'
         )
 
 
-class ProductStockSnapshotSerializer(serializers.ModelSerializer):
+class ProductStockSnapshotSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
 
     class Meta:
         model = ProductStockSnapshot
         fields = ['id', 'product', 'product_name', 'date', 'stock_level', 'created_at']
-        read_only_fields = ('created_at',)
\ No newline at end of file
+        read_only_fields = ('created_at',)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    eta_seconds = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'original_name', 'mode', 'status', 'total_rows', 'rows_processed',
+            'created_count', 'updated_count', 'rows_per_sec', 'eta_seconds', 'errors',
+            'created_at', 'started_at', 'finished_at', 'updated_at'
+        ]
+        read_only_fields = fields
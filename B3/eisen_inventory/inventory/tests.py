@@ -1,3 +1,1383 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta
+from io import StringIO
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+import openpyxl
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import utils
+from .models import ImportJob, InventoryBatch, Product, ProductDailySales, StockMovement, Supplier, SupplierProduct, ProductStockMonthlyRollup, ProductStockSnapshot, ProductStockYearlyRollup, StockAlert
+from .timeseries import TimeSeriesStore, sales_series
+from . import metrics
+
+from .benchmarks import BENCHMARK_CASES, generate_synthetic_catalog, run_benchmarks
+from .cache import get_cache, model_versions
+from .scheduler import ScheduledJob, Scheduler
+from .forecasting import forecast_for_product
+from .utils import (
+    REQUIRED_HEADERS, backfill_stock_snapshots, bulk_reorder_recommendations, checkpoint_stock_ledger,
+    claim_next_import_job, create_daily_stock_snapshots, demand_stats_for, evaluate_all_alerts,
+    evaluate_product_alert, evaluate_reorder_statuses, get_daily_sales_window, import_inventory_csv,
+    import_inventory_excel, import_inventory_rows, iter_excel_rows, lead_time_stats, maximum_daily_sales,
+    rebuild_stock_rollups, receive_stock, refresh_reorder_points, remove_stock_fifo, remove_stock_fifo_bulk,
+    reorder_recommendation, requeue_stale_import_jobs, run_import_job, stock_as_of, stock_levels_as_of,
+    upsert_daily_sales,
+)
+
+
+class ProductListQueryCountTests(TestCase):
+    def _create_products(self, count, start=0):
+        for i in range(start, start + count):
+            product = Product.objects.create(sku=f"SKU-{i}", name=f"Product {i}", current_stock=1, minimum_stock_level=5)
+            StockAlert.objects.create(
+                product=product, status=Product.STATUS_LOW,
+                current_stock_at_trigger=1, minimum_stock_level=5,
+            )
+
+    def _list_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()['results']
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self._create_products(2)
+        small_count, data = self._list_query_count()
+        self.assertEqual([p['active_alerts_count'] for p in data], [1, 1])
+
+        self._create_products(20, start=2)
+        large_count, data = self._list_query_count()
+        self.assertEqual(len(data), 22)
+        self.assertEqual(small_count, large_count)
+
+    def test_active_alerts_count_ignores_resolved_alerts(self):
+        self._create_products(1)
+        StockAlert.objects.update(active=False)
+        _, data = self._list_query_count()
+        self.assertEqual(data[0]['active_alerts_count'], 0)
+
+
+class ListConditionalAndPaginationTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="SKU-1", name="Bolt", current_stock=10, minimum_stock_level=2)
+        for quantity in (3, 4, 5):
+            InventoryBatch.objects.create(product=self.product, quantity=quantity)
+
+    def test_unchanged_list_returns_304(self):
+        first = self.client.get('/api/inventory-batches/')
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertEqual(self.client.get('/api/inventory-batches/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        InventoryBatch.objects.filter(quantity=3).update(quantity=1, updated_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(self.client.get('/api/inventory-batches/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deleting_rows_is_never_answered_304(self):
+        first = self.client.get('/api/inventory-batches/')
+        self.assertNotIn('Last-Modified', first)
+        etag = first['ETag']
+        InventoryBatch.objects.filter(quantity=3).delete()
+        self.assertEqual(self.client.get('/api/inventory-batches/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        since = http_date(time.time() + 60)
+        self.assertEqual(self.client.get('/api/inventory-batches/', HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_product_etag_changes_with_alerts(self):
+        etag = self.client.get('/api/products/')['ETag']
+        StockAlert.objects.create(product=self.product, status=Product.STATUS_LOW,
+                                  current_stock_at_trigger=1, minimum_stock_level=2)
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cursor_pagination_and_sparse_fields(self):
+        data = self.client.get('/api/inventory-batches/?page_size=2&fields=id,quantity').json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(set(data['results'][0]), {'id', 'quantity'})
+        rest = self.client.get(data['next']).json()
+        self.assertEqual(len(rest['results']), 1)
+
+    def test_product_etag_changes_with_embedded_names(self):
+        supplier = Supplier.objects.create(name="Acme")
+        InventoryBatch.objects.filter(quantity=3).update(supplier=supplier)
+        ProductStockSnapshot.objects.create(product=self.product, date=date.today(), stock_level=10)
+        etags = {url: self.client.get(url)['ETag'] for url in ('/api/inventory-batches/', '/api/stock-snapshots/')}
+
+        self.product.name = "Hex bolt"
+        self.product.save()
+        for url, etag in etags.items():
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.json()['results'][0]['product_name'], "Hex bolt")
+
+        etag = self.client.get('/api/inventory-batches/')['ETag']
+        supplier.name = "Acme Fasteners"
+        supplier.save()
+        self.assertEqual(self.client.get('/api/inventory-batches/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_product_list_is_paginated_by_default(self):
+        data = self.client.get('/api/products/').json()
+        self.assertEqual([p['sku'] for p in data['results']], ['SKU-1'])
+        self.assertIsNone(data['next'])
+        self.assertEqual(len(self.client.get('/api/products/?page_size=1').json()['results']), 1)
+
+
+class StockRollupTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="ROLL-1", name="Rolled", current_stock=10, minimum_stock_level=1)
+
+    def test_snapshots_maintain_rollups_incrementally(self):
+        create_daily_stock_snapshots(date(2024, 1, 30))
+        Product.objects.filter(pk=self.product.pk).update(current_stock=20)
+        create_daily_stock_snapshots(date(2024, 1, 31))
+        create_daily_stock_snapshots(date(2024, 2, 1))
+
+        monthly = self.client.get('/api/stock-snapshots/monthly/').json()
+        self.assertEqual([(row['month'], row['avg_stock'], row['min_stock'], row['max_stock']) for row in monthly],
+                         [('2024-01-01', 15, 10, 20), ('2024-02-01', 20, 20, 20)])
+        yearly = self.client.get('/api/stock-snapshots/yearly/').json()
+        self.assertEqual([(row['year'], row['min_stock'], row['max_stock']) for row in yearly], [('2024-01-01', 10, 20)])
+        self.assertEqual(len(self.client.get('/api/stock-snapshots/monthly/?start=2024-02-15').json()), 1)
+        self.assertEqual(self.client.get('/api/stock-snapshots/monthly/?end=2024-13-01').status_code, 400)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        create_daily_stock_snapshots(date(2024, 1, 30))
+        ProductStockSnapshot.objects.create(product=self.product, date=date(2023, 12, 31), stock_level=4)
+        incremental = list(ProductStockMonthlyRollup.objects.values_list('period_start', 'total_stock', 'snapshot_count'))
+        self.assertEqual(rebuild_stock_rollups(), {'monthly': 2, 'yearly': 2})
+        rebuilt = list(ProductStockMonthlyRollup.objects.values_list('period_start', 'total_stock', 'snapshot_count'))
+        self.assertEqual(rebuilt, incremental)
+
+    def test_nightly_snapshot_only_touches_new_rows(self):
+        create_daily_stock_snapshots(date(2024, 1, 30))
+        # A rollup the nightly run has no new snapshot for is left as it is, not re-aggregated
+        ProductStockMonthlyRollup.objects.filter(product=self.product).update(total_stock=999)
+        other = Product.objects.create(sku="ROLL-2", name="Also rolled", current_stock=7, minimum_stock_level=1)
+        self.assertEqual(create_daily_stock_snapshots(date(2024, 1, 30))['created'], 1)
+        create_daily_stock_snapshots(date(2024, 1, 31))
+        monthly = ProductStockMonthlyRollup.objects.order_by('product__sku')
+        self.assertEqual(list(monthly.values_list('total_stock', 'snapshot_count', 'min_stock', 'max_stock')),
+                         [(1009, 2, 10, 10), (14, 2, 7, 7)])
+        self.assertEqual(list(ProductStockYearlyRollup.objects.filter(product=other).values_list('total_stock', 'snapshot_count')),
+                         [(14, 2)])
+
+    def test_snapshot_saves_and_deletes_refresh_rollups(self):
+        snapshot = ProductStockSnapshot.objects.create(product=self.product, date=date(2024, 3, 5), stock_level=6)
+        ProductStockSnapshot.objects.create(product=self.product, date=date(2024, 3, 6), stock_level=2)
+        rollups = ProductStockMonthlyRollup.objects.filter(product=self.product)
+        self.assertEqual(list(rollups.values_list('period_start', 'total_stock', 'min_stock')), [(date(2024, 3, 1), 8, 2)])
+
+        snapshot = ProductStockSnapshot.objects.get(pk=snapshot.pk)
+        snapshot.date = date(2024, 4, 1)
+        snapshot.save()
+        self.assertEqual(list(rollups.values_list('period_start', 'total_stock')),
+                         [(date(2024, 3, 1), 2), (date(2024, 4, 1), 6)])
+        snapshot.delete()
+        self.assertEqual(list(rollups.values_list('period_start', 'total_stock')), [(date(2024, 3, 1), 2)])
+        self.assertEqual(list(ProductStockYearlyRollup.objects.values_list('total_stock', 'snapshot_count')), [(2, 1)])
+
+
+class StockRollupMigrationTests(TransactionTestCase):
+    migrate_from = ('inventory', '0013_hot_filter_indexes')
+    migrate_to = ('inventory', '0014_rebuild_stock_rollups')
+
+    def tearDown(self):
+        from django.db.migrations.executor import MigrationExecutor
+        MigrationExecutor(connection).migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_existing_snapshots_are_rolled_up(self):
+        from django.db.migrations.executor import MigrationExecutor
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_from])
+        apps = executor.loader.project_state([self.migrate_from]).apps
+        product = apps.get_model('inventory', 'Product').objects.create(sku="MIG-1", name="Migrated")
+        Snapshot = apps.get_model('inventory', 'ProductStockSnapshot')
+        for day, level in ((date(2024, 1, 30), 10), (date(2024, 1, 31), 20), (date(2024, 2, 1), 5)):
+            Snapshot.objects.create(product=product, date=day, stock_level=level)
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([self.migrate_to])
+        self.assertEqual(
+            list(ProductStockMonthlyRollup.objects.order_by('period_start').values_list('period_start', 'total_stock', 'snapshot_count')),
+            [(date(2024, 1, 1), 30, 2), (date(2024, 2, 1), 5, 1)],
+        )
+        self.assertEqual(list(ProductStockYearlyRollup.objects.values_list('min_stock', 'max_stock')), [(5, 20)])
+
+
+class TimeSeriesStoreTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.products = [
+            Product.objects.create(sku=f"TS-{i}", name=f"Series {i}", current_stock=5, minimum_stock_level=1)
+            for i in range(3)
+        ]
+        self.store = TimeSeriesStore('inventory.ProductDailySales', 'quantity', history_days=30)
+        sales_series.invalidate()
+
+    def test_window_slices_without_requerying(self):
+        product = self.products[0]
+        ProductDailySales.objects.create(product=product, date=self.today, quantity=4)
+        ProductDailySales.objects.create(product=product, date=self.today - timedelta(days=2), quantity=2)
+        self.assertEqual(self.store.window(product.pk, 3).tolist(), [2, 0, 4])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.store.window(product.pk, 2).tolist(), [0, 4])
+            self.assertEqual(self.store.rolling_mean(product.pk, 2, 2).tolist(), [1.0, 2.0])
+
+    def test_lru_eviction_stays_within_budget(self):
+        one = self.store.get(self.products[0].pk).nbytes
+        self.store.max_bytes = one * 2
+        for product in self.products:
+            self.store.get(product.pk)
+        self.assertEqual(len(self.store), 2)
+        self.assertLessEqual(self.store.nbytes, one * 2)
+        with self.assertNumQueries(1):
+            self.store.get(self.products[0].pk)
+
+    def test_writes_invalidate_shared_series(self):
+        product = self.products[0]
+        self.assertEqual(sales_series.window(product.pk, 1).tolist(), [0])
+        ProductDailySales.objects.create(product=product, date=self.today, quantity=7)
+        self.assertEqual(sales_series.window(product.pk, 1).tolist(), [7])
+
+    def test_writes_that_skip_the_hooks_are_seen(self):
+        product = self.products[0]
+        ProductDailySales.objects.create(product=product, date=self.today, quantity=4)
+        self.assertEqual(sales_series.window(product.pk, 2).tolist(), [0, 4])
+        # QuerySet.update runs no save() hooks but bumps the model version
+        ProductDailySales.objects.filter(product=product).update(quantity=7)
+        self.assertEqual(sales_series.window(product.pk, 2).tolist(), [0, 7])
+
+        # Raw SQL bumps nothing: the DB-backed window sees it at once, the store after its TTL
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {ProductDailySales._meta.db_table} (product_id, date, quantity, created_at, updated_at) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [product.pk, str(self.today - timedelta(days=1)), 3, timezone.now().isoformat(), timezone.now().isoformat()],
+            )
+        self.assertEqual(get_daily_sales_window(product, 2), [3, 7])
+        self.assertEqual(sales_series.window(product.pk, 2).tolist(), [0, 7])
+        with override_settings(INVENTORY_TIMESERIES_TTL=0):
+            self.assertEqual(sales_series.window(product.pk, 2).tolist(), [3, 7])
+
+    def test_product_daily_serves_newest_snapshots_first(self):
+        product = self.products[0]
+        for offset, level in ((0, 5), (1, 8), (3, 2)):
+            ProductStockSnapshot.objects.create(product=product, date=self.today - timedelta(days=offset), stock_level=level)
+        with self.assertNumQueries(1):
+            data = self.client.get(f'/api/stock-snapshots/product_daily/?product={product.pk}').json()
+        self.assertEqual(set(data[0]), {'id', 'product', 'product_name', 'date', 'stock_level', 'created_at'})
+        self.assertEqual([(row['date'], row['stock_level']) for row in data], [
+            (str(self.today), 5), (str(self.today - timedelta(days=1)), 8), (str(self.today - timedelta(days=3)), 2),
+        ])
+        self.assertEqual(data[0]['product_name'], "Series 0")
+
+
+class PersistedReorderPointTests(TestCase):
+    def setUp(self):
+        sales_series.invalidate()
+        self.today = date.today()
+        self.product = Product.objects.create(sku="RP-1", name="Reordered", current_stock=40, minimum_stock_level=1)
+        supplier = Supplier.objects.create(name="Lead Time Co")
+        SupplierProduct.objects.create(supplier=supplier, product=self.product, lead_time_days=5)
+
+    def _assert_matches_full_recompute(self):
+        self.product.refresh_from_db()
+        expected = reorder_recommendation(Product.objects.get(pk=self.product.pk))
+        self.assertEqual(self.product.reorder_point, expected['reorder_point'])
+        self.assertEqual(self.product.safety_stock, expected['safety_stock_advanced'])
+        self.assertAlmostEqual(self.product.avg_daily_usage, expected['average_daily_usage'])
+
+    def test_sales_writes_update_persisted_fields(self):
+        for offset, quantity in [(40, 9), (10, 3), (0, 2)]:
+            ProductDailySales.objects.create(product=self.product, date=self.today - timedelta(days=offset), quantity=quantity)
+        self._assert_matches_full_recompute()
+
+        today = ProductDailySales.objects.get(product=self.product, date=self.today)
+        today.quantity = 12
+        today.save()
+        self._assert_matches_full_recompute()
+        ProductDailySales.objects.get(product=self.product, date=self.today - timedelta(days=40)).delete()
+        self._assert_matches_full_recompute()
+
+    def test_sales_writes_fold_in_without_rescanning_the_window(self):
+        upsert_daily_sales([("RP-1", self.today - timedelta(days=offset), 5) for offset in range(60)])
+
+        def window_reads(change):
+            with CaptureQueriesContext(connection) as ctx:
+                change()
+            self._assert_matches_full_recompute()
+            return sum('BETWEEN' in q['sql'] and 'inventory_productdailysales' in q['sql'] for q in ctx.captured_queries)
+
+        def set_quantity(offset, quantity):
+            row = ProductDailySales.objects.get(product=self.product, date=self.today - timedelta(days=offset))
+            row.quantity = quantity
+            return row.save
+
+        self.assertEqual(window_reads(set_quantity(0, 9)), 0)  # raises the peak
+        self.assertEqual(window_reads(set_quantity(45, 6)), 0)  # outside the 30-day usage window
+        self.assertEqual(window_reads(ProductDailySales.objects.get(product=self.product, date=self.today - timedelta(days=3)).delete), 0)
+        # Only lowering the peak itself reads the window again
+        self.assertEqual(window_reads(set_quantity(0, 1)), 1)
+        self.assertEqual(self.product.max_daily_usage, 6)
+
+    def test_reorder_list_uses_persisted_point(self):
+        ProductDailySales.objects.create(product=self.product, date=self.today, quantity=30)
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.reorder_point, self.product.current_stock)
+        Product.objects.create(sku="RP-2", name="Plenty", current_stock=5, minimum_stock_level=1)
+        data = self.client.get('/api/products/reorder/').json()
+        self.assertEqual([row['sku'] for row in data['results']], ["RP-1"])
+
+    def test_writes_from_elsewhere_and_rollbacks_are_not_carried_over(self):
+        ProductDailySales.objects.create(product=self.product, date=self.today, quantity=3)
+        # A queryset write (no per-row hooks), then a rolled-back save
+        ProductDailySales.objects.filter(product=self.product).update(quantity=20)
+        try:
+            with transaction.atomic():
+                ProductDailySales.objects.create(product=self.product, date=self.today - timedelta(days=1), quantity=50)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        ProductDailySales.objects.create(product=self.product, date=self.today - timedelta(days=2), quantity=1)
+        self._assert_matches_full_recompute()
+        self.assertEqual(self.product.avg_daily_usage, 21 / 30)
+
+
+class ReorderFieldsMigrationTests(TransactionTestCase):
+    migrate_from = ('inventory', '0014_rebuild_stock_rollups')
+    migrate_to = ('inventory', '0015_backfill_reorder_fields')
+
+    def tearDown(self):
+        from django.db.migrations.executor import MigrationExecutor
+        MigrationExecutor(connection).migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_existing_products_get_reorder_points(self):
+        from django.db.migrations.executor import MigrationExecutor
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_from])
+        apps = executor.loader.project_state([self.migrate_from]).apps
+        product = apps.get_model('inventory', 'Product').objects.create(sku="MIG-RP", name="Migrated", current_stock=1)
+        supplier = apps.get_model('inventory', 'Supplier').objects.create(name="Lead Time Co")
+        apps.get_model('inventory', 'SupplierProduct').objects.create(supplier=supplier, product=product, lead_time_days=5)
+        Sales = apps.get_model('inventory', 'ProductDailySales')
+        Sales.objects.create(product=product, date=date.today(), quantity=30)
+        Sales.objects.create(product=product, date=date.today() - timedelta(days=45), quantity=60)
+        apps.get_model('inventory', 'Product').objects.create(sku="MIG-IDLE", name="Idle")
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([self.migrate_to])
+        fields = ('sku', 'avg_daily_usage', 'safety_stock', 'reorder_point')
+        migrated = list(Product.objects.order_by('sku').values_list(*fields))
+        self.assertEqual(migrated, [("MIG-IDLE", 0, 0, 0), ("MIG-RP", 1, 295, 300)])
+        # The historical-model backfills agree with the live bulk recompute
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        self.assertEqual(Product.objects.get(sku="MIG-RP").max_daily_usage, 60)
+        refresh_reorder_points()
+        self.assertEqual(list(Product.objects.order_by('sku').values_list(*fields)), migrated)
+        self.assertEqual(self.client.get('/api/products/reorder/').json()['results'][0]['sku'], "MIG-RP")
+
+
+def inventory_rows(*rows):
+    """Import rows keyed by REQUIRED_HEADERS from (sku, name, in_stock, restock) tuples."""
+    return [
+        dict(zip(REQUIRED_HEADERS, [i + 1, name, sku, 0, 0, stock, restock]))
+        for i, (sku, name, stock, restock) in enumerate(rows)
+    ]
+
+
+def write_inventory_csv(rows):
+    handle, path = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(handle, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(REQUIRED_HEADERS)
+        for row in inventory_rows(*rows):
+            writer.writerow([row[h] for h in REQUIRED_HEADERS])
+    return path
+
+
+class ChunkedImportTests(TestCase):
+    def _import_csv(self, rows, **kwargs):
+        path = write_inventory_csv(rows)
+        try:
+            return import_inventory_csv(path, **kwargs)
+        finally:
+            os.remove(path)
+
+    def test_duplicate_skus_within_and_across_chunks(self):
+        Product.objects.create(sku="IMP-OLD", name="Existing", current_stock=1, minimum_stock_level=5)
+        result = self._import_csv([
+            ("IMP-1", "First", 4, ""),
+            ("IMP-1", "First again", 6, ""),   # same chunk
+            ("IMP-2", "Second", 8, ""),
+            ("IMP-OLD", "Existing", 3, ""),
+            ("IMP-2", "Second again", 9, ""),  # next chunk
+        ], chunk_size=2)
+        self.assertEqual((result['created'], result['updated'], result['rows']), (2, 3, 5))
+        self.assertEqual(
+            dict(Product.objects.values_list('sku', 'current_stock')), {"IMP-OLD": 3, "IMP-1": 6, "IMP-2": 9},
+        )
+        self.assertEqual(Product.objects.get(sku="IMP-2").name, "Second again")
+        # The ledger matches the stock left by the last row of each SKU
+        for product in Product.objects.all():
+            self.assertEqual(sum(product.stock_movements.values_list('quantity', flat=True)), product.current_stock)
+
+    def test_replace_all_purges_previous_inventory(self):
+        old = Product.objects.create(sku="IMP-GONE", name="Gone", current_stock=3, minimum_stock_level=1)
+        ProductDailySales.objects.create(product=old, date=date.today(), quantity=2)
+        result = self._import_csv([("IMP-NEW", "New", 5, "")], mode='replace_all', chunk_size=2)
+        self.assertEqual((result['created'], result['updated'], result['mode']), (1, 0, 'replace_all'))
+        self.assertEqual(list(Product.objects.values_list('sku', flat=True)), ["IMP-NEW"])
+        self.assertFalse(ProductDailySales.objects.exists())
+
+    def test_alerts_are_evaluated_for_imported_products(self):
+        self._import_csv([("IMP-LOW", "Low", 2, "NEEDS RESTOCK"), ("IMP-OK", "Fine", 50, "")], chunk_size=1)
+        self.assertEqual(
+            dict(Product.objects.values_list('sku', 'reorder_status')), {"IMP-LOW": "LOW", "IMP-OK": "OK"},
+        )
+        self.assertEqual(list(StockAlert.objects.filter(active=True).values_list('product__sku', flat=True)), ["IMP-LOW"])
+
+    def test_queries_per_chunk_are_fixed(self):
+        def query_count(prefix, count, chunk_size):
+            rows = inventory_rows(*[(f"{prefix}-{i}", f"Row {i}", 10 + i, "") for i in range(count)])
+            with CaptureQueriesContext(connection) as ctx:
+                import_inventory_rows(rows, chunk_size=chunk_size)
+            return len(ctx.captured_queries)
+
+        one_chunk = query_count("Q1", 10, 10)
+        self.assertEqual(query_count("Q2", 50, 50), one_chunk)
+        # BEGIN, product lookup, product/batch/ledger inserts, COMMIT
+        self.assertEqual(query_count("Q3", 30, 10) - query_count("Q4", 20, 10), 6)
+
+
+class ExcelImportTests(TestCase):
+    ROWS = [("XL-1", "Hammer", 12, ""), ("XL-2", "Saw", 3, "NEEDS RESTOCK"), ("XL-1", "Hammer v2", 7, "")]
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(REQUIRED_HEADERS)
+        first, second, third = ([row[h] for h in REQUIRED_HEADERS] for row in inventory_rows(*self.ROWS))
+        for values in (first, second, [None] * len(REQUIRED_HEADERS), third):
+            ws.append(values)
+        # Formatted but empty trailing rows, as spreadsheet apps leave behind
+        for row in range(ws.max_row + 1, ws.max_row + 6):
+            ws.cell(row=row, column=1).number_format = '0.00'
+        wb.save(self.path)
+
+    def _products(self):
+        return sorted(Product.objects.values_list('sku', 'name', 'current_stock', 'minimum_stock_level'))
+
+    def test_rows_stream_from_a_read_only_workbook(self):
+        saved = openpyxl.load_workbook(self.path, read_only=True)
+        self.addCleanup(saved.close)
+        self.assertEqual(saved.active.max_row, 10)
+        with patch('inventory.utils.openpyxl.load_workbook', wraps=openpyxl.load_workbook) as load:
+            rows = iter_excel_rows(self.path)
+            self.assertTrue(load.call_args.kwargs['read_only'])
+            first = next(rows)
+        self.assertEqual((first['PRODUCT ID'], first['PRODUCTS IN STOCK']), ("XL-1", 12))
+        self.assertEqual([row['PRODUCT ID'] for row in rows], ["XL-2", "XL-1"])
+
+    def test_excel_import_matches_csv_import(self):
+        excel = import_inventory_excel(self.path, chunk_size=2)
+        from_excel = self._products()
+        self.assertEqual(from_excel, [("XL-1", "Hammer v2", 7, 5), ("XL-2", "Saw", 3, 15)])
+
+        csv_path = write_inventory_csv(self.ROWS)
+        try:
+            from_csv = import_inventory_csv(csv_path, mode='replace_all', chunk_size=2)
+        finally:
+            os.remove(csv_path)
+        self.assertEqual(self._products(), from_excel)
+        self.assertEqual((excel['created'], excel['updated'], excel['rows']), (2, 1, 3))
+        self.assertEqual((from_csv['created'], from_csv['updated'], from_csv['rows']), (2, 1, 3))
+
+
+class ImportJobTests(TestCase):
+    ROWS = [("JOB-A", "A", 4, ""), ("JOB-A", "A", 6, ""), ("JOB-B", "B", 8, ""), ("JOB-OLD", "Old", 2, ""), ("JOB-B", "B", 9, "")]
+
+    def setUp(self):
+        self.jobs_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.jobs_dir, ignore_errors=True)
+        Product.objects.create(sku="JOB-OLD", name="Old", current_stock=1, minimum_stock_level=1)
+
+    def _upload(self, rows=None, content=None):
+        if content is None:
+            path = write_inventory_csv(rows or self.ROWS)
+            with open(path, 'rb') as fh:
+                content = fh.read()
+            os.remove(path)
+        return self.client.post('/api/uploads/upload_csv/', {'file': SimpleUploadedFile('stock.csv', content)})
+
+    def _queued_job(self):
+        path = write_inventory_csv(self.ROWS)
+        return ImportJob.objects.create(file_path=path, original_name='stock.csv')
+
+    def test_upload_imports_in_the_request_by_default(self):
+        res = self._upload()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['import_result']['created'], 2)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_async_upload_queues_a_job(self):
+        with override_settings(INVENTORY_IMPORTS_ASYNC=True, IMPORT_JOBS_DIR=self.jobs_dir):
+            res = self._upload()
+            self.assertEqual(res.status_code, 202)
+            body = res.json()
+            self.assertEqual(body['job']['status'], 'PENDING')
+            self.assertEqual(body['job']['status_url'], f"/api/uploads/jobs/{body['job_id']}/")
+            self.assertEqual(len(os.listdir(self.jobs_dir)), 1)
+
+            job = claim_next_import_job()
+            self.assertEqual((job.pk, job.status), (body['job_id'], 'RUNNING'))
+            self.assertIsNone(claim_next_import_job())
+            run_import_job(job, chunk_size=2)
+            status = self.client.get(body['job']['status_url']).json()
+            self.assertEqual((status['status'], status['rows_processed'], status['total_rows']), ('DONE', 5, 5))
+            self.assertEqual((status['created_count'], status['updated_count']), (2, 3))
+            self.assertEqual(os.listdir(self.jobs_dir), [])
+
+            bad = self._upload(content=b'sku,qty\nX,1\n')
+            self.assertEqual(bad.status_code, 400)
+            self.assertEqual(os.listdir(self.jobs_dir), [])
+            self.assertEqual(ImportJob.objects.count(), 1)
+
+    def test_failed_job_resumes_after_last_committed_chunk(self):
+        job = self._queued_job()
+        real_chunk = utils._import_inventory_chunk
+        calls = []
+
+        def fail_second_chunk(rows):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError('worker killed')
+            return real_chunk(rows)
+
+        with patch('inventory.utils._import_inventory_chunk', side_effect=fail_second_chunk):
+            run_import_job(job, chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed, job.created_count, job.updated_count), ('FAILED', 2, 1, 1))
+        self.assertIn('worker killed', job.errors[-1]['error'])
+        self.assertFalse(Product.objects.filter(sku="JOB-B").exists())
+
+        job.status = ImportJob.STATUS_PENDING
+        job.save(update_fields=['status', 'updated_at'])
+        run_import_job(claim_next_import_job(), chunk_size=2)
+        job.refresh_from_db()
+        # Same counts and stock as an uninterrupted run; the first chunk is not replayed
+        self.assertEqual((job.status, job.rows_processed, job.created_count, job.updated_count), ('DONE', 5, 2, 3))
+        self.assertEqual(
+            dict(Product.objects.values_list('sku', 'current_stock')), {"JOB-OLD": 2, "JOB-A": 6, "JOB-B": 9},
+        )
+        self.assertEqual(InventoryBatch.objects.filter(product__sku="JOB-A").count(), 2)
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale, busy = self._queued_job(), self._queued_job()
+        self.addCleanup(os.remove, stale.file_path)
+        self.addCleanup(os.remove, busy.file_path)
+        ImportJob.objects.update(status=ImportJob.STATUS_RUNNING)
+        ImportJob.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(requeue_stale_import_jobs(stale_after_seconds=300), 1)
+        self.assertEqual(
+            dict(ImportJob.objects.values_list('pk', 'status')),
+            {stale.pk: ImportJob.STATUS_PENDING, busy.pk: ImportJob.STATUS_RUNNING},
+        )
+
+
+class BulkReorderRecommendationTests(TestCase):
+    def setUp(self):
+        sales_series.invalidate()
+        today = date.today()
+        cheap, dear, slow = (Supplier.objects.create(name=name) for name in ("Cheap", "Dear", "Slow"))
+        catalog = {
+            # sku: (current_stock, [(days ago, quantity)], [(supplier, lead time, cost, preferred)])
+            'MIX-STEADY': (5, [(d, 3) for d in range(30)], [(cheap, 4, '2.00', True), (dear, 10, '1.50', True)]),
+            'MIX-SPIKE': (100, [(60, 40), (1, 2)], [(slow, 21, None, False)]),
+            'MIX-OLD': (7, [(120, 50)], [(cheap, 3, '9.99', False)]),
+            'MIX-NO-SUPPLIER': (0, [(0, 5), (2, 1)], []),
+            'MIX-IDLE': (12, [], []),
+        }
+        for sku, (stock, sales, suppliers) in catalog.items():
+            product = Product.objects.create(sku=sku, name=sku, current_stock=stock, minimum_stock_level=1)
+            for days_ago, quantity in sales:
+                ProductDailySales.objects.create(product=product, date=today - timedelta(days=days_ago), quantity=quantity)
+            for supplier, lead_time, cost, preferred in suppliers:
+                SupplierProduct.objects.create(
+                    supplier=supplier, product=product, lead_time_days=lead_time, cost_price=cost, is_preferred=preferred,
+                )
+
+    def test_bulk_matches_per_product(self):
+        products = list(Product.objects.order_by('name'))
+        expected = [reorder_recommendation(p) for p in products]
+        self.assertEqual(bulk_reorder_recommendations(), expected)
+        self.assertEqual(bulk_reorder_recommendations(products[1:3]), expected[1:3])
+        by_sku = {row['sku']: row for row in expected}
+        self.assertTrue(by_sku['MIX-STEADY']['needs_reorder'])
+        self.assertEqual(by_sku['MIX-STEADY']['preferred_supplier']['supplier_name'], "Dear")
+        self.assertIsNone(by_sku['MIX-IDLE']['preferred_supplier'])
+
+
+class DemandStatsMemoTests(TestCase):
+    def setUp(self):
+        sales_series.invalidate()
+        self.product = Product.objects.create(sku="MEMO-1", name="Memo", current_stock=10, minimum_stock_level=1)
+        ProductDailySales.objects.create(product=self.product, date=date.today(), quantity=30)
+
+    def test_stats_are_memoized_until_sales_change(self):
+        stats = demand_stats_for(self.product)
+        self.assertEqual(stats.average_daily_usage(), 1)
+        self.assertEqual(stats.lead_time_stats, (0, 0))
+        with self.assertNumQueries(0):
+            self.assertIs(demand_stats_for(self.product), stats)
+            self.assertEqual(stats.maximum_daily_sales(), 30)
+            self.assertEqual(lead_time_stats(self.product), (0, 0))
+
+        ProductDailySales.objects.create(product=self.product, date=date.today() - timedelta(days=1), quantity=60)
+        fresh = demand_stats_for(self.product)
+        self.assertIsNot(fresh, stats)
+        self.assertEqual(fresh.average_daily_usage(), 3)
+        self.assertEqual(maximum_daily_sales(self.product), 60)
+
+        supplier = Supplier.objects.create(name="Memo Supply")
+        SupplierProduct.objects.create(supplier=supplier, product=self.product, lead_time_days=6)
+        self.assertEqual(lead_time_stats(self.product), (6, 6))
+
+
+class BulkDailySalesTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="BULK-1", name="Bulk", current_stock=10, minimum_stock_level=1)
+
+    def _post(self, rows):
+        return self.client.post('/api/product-daily-sales/bulk/', rows, content_type='application/json')
+
+    def test_upserts_rows_in_one_request(self):
+        today = date.today()
+        ProductDailySales.objects.create(product=self.product, date=today, quantity=1)
+        res = self._post([
+            {'sku': 'BULK-1', 'date': str(today), 'quantity': 5},
+            {'sku': 'BULK-1', 'date': str(today - timedelta(days=1)), 'quantity': 3},
+        ])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['written'], 2)
+        self.assertEqual(
+            dict(ProductDailySales.objects.values_list('date', 'quantity')),
+            {today: 5, today - timedelta(days=1): 3},
+        )
+        self.product.refresh_from_db()
+        self.assertAlmostEqual(self.product.avg_daily_usage, 8 / 30)
+
+    def test_rejects_whole_batch_on_unknown_sku(self):
+        res = self._post({'rows': [
+            {'sku': 'BULK-1', 'date': '2024-01-01', 'quantity': 5},
+            {'sku': 'NOPE', 'date': '2024-01-01', 'quantity': 5},
+            {'sku': 'BULK-1', 'date': 'yesterday', 'quantity': 5},
+        ]})
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(len(res.json()['errors']), 2)
+        self.assertFalse(ProductDailySales.objects.exists())
+
+
+class ForecastTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="FC-1", name="Forecast", current_stock=10, minimum_stock_level=1)
+        supplier = Supplier.objects.create(name="Forecast Supply")
+        SupplierProduct.objects.create(supplier=supplier, product=self.product, lead_time_days=7)
+
+    def test_constant_demand_has_flat_forecast_and_no_safety_stock(self):
+        end = date.today()
+        upsert_daily_sales([("FC-1", end - timedelta(days=i), 4) for i in range(28)])
+        data = self.client.get(f'/api/products/{self.product.pk}/forecast/?history=28&horizon=7').json()
+        self.assertEqual([round(row['quantity'], 2) for row in data['forecast']], [4.0] * 7)
+        self.assertEqual(data['safety_stock'], 0)
+        self.assertEqual(data['reorder_point'], 28)
+
+    def test_lead_times_are_read_for_the_requested_products_only(self):
+        from .forecasting import load_lead_times
+        other = Product.objects.create(sku="FC-2", name="Other", current_stock=1)
+        SupplierProduct.objects.create(supplier=Supplier.objects.create(name="Other Supply"), product=other, lead_time_days=3)
+        with CaptureQueriesContext(connection) as ctx:
+            mean, std = load_lead_times([self.product.pk])
+        self.assertEqual((mean.tolist(), std.tolist()), ([7.0], [0.0]))
+        self.assertIn(' IN ', ctx.captured_queries[0]['sql'])
+        with patch('inventory.forecasting.ID_FILTER_LIMIT', 0):
+            self.assertEqual(load_lead_times([other.pk, self.product.pk])[0].tolist(), [3.0, 7.0])
+
+    def test_weekday_seasonality_and_service_level(self):
+        end = date.today()
+        rows = [("FC-1", end - timedelta(days=i), 10 if (end - timedelta(days=i)).weekday() == 0 else 2) for i in range(56)]
+        upsert_daily_sales(rows)
+        low = forecast_for_product(self.product, history_days=56, service_level=0.8)
+        high = forecast_for_product(self.product, history_days=56, service_level=0.99)
+        self.assertEqual(max(range(7), key=lambda d: low['weekday_seasonality'][d]), 0)
+        self.assertGreater(high['safety_stock'], low['safety_stock'])
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/forecast/?service_level=2').status_code, 400)
+
+    def test_horizon_is_returned_as_requested(self):
+        end = date.today()
+        upsert_daily_sales([("FC-1", end - timedelta(days=i), 4) for i in range(28)])
+        data = self.client.get(f'/api/products/{self.product.pk}/forecast/?history=28&horizon=3').json()
+        self.assertEqual(len(data['forecast']), 3)
+        # Lead-time demand still covers the 7-day lead time
+        self.assertEqual(data['reorder_point'], 28)
+        for horizon in (0, 366, 'x'):
+            res = self.client.get(f'/api/products/{self.product.pk}/forecast/?horizon={horizon}')
+            self.assertEqual(res.status_code, 400)
+
+    def test_forecast_can_drive_persisted_reorder_points(self):
+        end = date.today()
+        rows = [("FC-1", end - timedelta(days=i), 10 if (end - timedelta(days=i)).weekday() == 0 else 2) for i in range(56)]
+        upsert_daily_sales(rows)
+        self.product.refresh_from_db()
+        default_point = self.product.reorder_point
+        with override_settings(INVENTORY_REORDER_POINT_METHOD='forecast'):
+            refresh_reorder_points()
+            expected = forecast_for_product(self.product)
+            self.product.refresh_from_db()
+            self.assertEqual((self.product.safety_stock, self.product.reorder_point),
+                             (expected['safety_stock'], expected['reorder_point']))
+            self.assertNotEqual(self.product.reorder_point, default_point)
+            # Row saves keep the running usage but leave the forecast-driven point to the bulk path
+            row = ProductDailySales.objects.get(product=self.product, date=end)
+            row.quantity += 3
+            row.save()
+            self.product.refresh_from_db()
+            self.assertEqual(self.product.reorder_point, expected['reorder_point'])
+            self.assertAlmostEqual(self.product.avg_daily_usage, Product.objects.get(pk=self.product.pk).avg_daily_usage)
+            refresh_reorder_points()
+            self.assertAlmostEqual(Product.objects.get(pk=self.product.pk).avg_daily_usage, self.product.avg_daily_usage)
+
+
+class ConcurrentStockConsumptionTests(TransactionTestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="HOT-1", name="Hot", current_stock=60, minimum_stock_level=5)
+        for quantity in (20, 20, 20):
+            InventoryBatch.objects.create(product=self.product, quantity=quantity)
+
+    def test_parallel_picks_never_oversell(self):
+        def pick(_):
+            try:
+                return remove_stock_fifo_bulk([(self.product.pk, 1)])[self.product.pk]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            outcomes = list(pool.map(pick, range(80)))
+
+        self.product.refresh_from_db()
+        self.assertEqual(outcomes.count(True), 60)
+        self.assertEqual(self.product.current_stock, 0)
+        self.assertEqual(sum(InventoryBatch.objects.values_list('quantity', flat=True)), 0)
+
+    def test_insufficient_stock_leaves_everything_untouched(self):
+        self.assertFalse(remove_stock_fifo(self.product, 61))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_stock, 60)
+        self.assertEqual(sorted(InventoryBatch.objects.values_list('quantity', flat=True)), [20, 20, 20])
+
+
+class FifoOrderTests(TestCase):
+    def _product(self, sku, *quantities):
+        product = Product.objects.create(sku=sku, name=sku, current_stock=0, minimum_stock_level=2)
+        for quantity in quantities:
+            receive_stock(product, quantity)
+        return product
+
+    def _order_query_count(self, lines):
+        with CaptureQueriesContext(connection) as ctx:
+            results = remove_stock_fifo_bulk(lines)
+        return results, len(ctx.captured_queries)
+
+    def test_multi_line_order_drains_oldest_batches(self):
+        bolts = self._product("ORD-A", 5, 5, 5)
+        nuts = self._product("ORD-B", 3, 10)
+        washers = self._product("ORD-C", 4)
+        results = remove_stock_fifo_bulk([(bolts, 7), (nuts.pk, 3), (bolts, 2), (washers, 5)])
+
+        self.assertEqual(results, {bolts.pk: True, nuts.pk: True, washers.pk: False})
+        quantities = lambda p: list(InventoryBatch.objects.filter(product=p).order_by('received_at', 'pk').values_list('quantity', flat=True))
+        self.assertEqual(quantities(bolts), [0, 1, 5])
+        self.assertEqual(quantities(nuts), [0, 10])
+        self.assertEqual(quantities(washers), [4])
+        self.assertEqual(
+            dict(Product.objects.values_list('sku', 'current_stock')), {"ORD-A": 6, "ORD-B": 10, "ORD-C": 4},
+        )
+        # The caller's instance sees the new level; the failed line left its product alone
+        self.assertEqual(bolts.current_stock, 6)
+        self.assertEqual(StockMovement.objects.filter(kind='CONSUMPTION').count(), 3)
+
+    def test_query_count_does_not_grow_with_batches(self):
+        few = [self._product(f"FEW-{i}", 10, 10) for i in range(3)]
+        many = [self._product(f"MANY-{i}", *[2] * 10) for i in range(3)]
+        _, few_count = self._order_query_count([(p, 12) for p in few])
+        results, many_count = self._order_query_count([(p, 12) for p in many])
+        self.assertEqual(set(results.values()), {True})
+        self.assertEqual(InventoryBatch.objects.filter(product__in=many, quantity=0).count(), 18)
+        self.assertEqual(few_count, many_count)
+        # One guarded stock UPDATE per product; the rest is fixed per order
+        _, two_products = self._order_query_count([(p, 1) for p in few[:2]])
+        self.assertEqual(few_count - two_products, 1)
+
+    def test_uncovered_line_leaves_the_product_untouched(self):
+        product = self._product("ORD-GAP", 3)
+        # current_stock says 10 but only 3 units sit in batches
+        Product.objects.filter(pk=product.pk).update(current_stock=10)
+        before = Product.objects.values_list('current_stock', 'updated_at').get(pk=product.pk)
+        version = model_versions([Product])
+        self.assertEqual(remove_stock_fifo_bulk([(product, 5)]), {product.pk: False})
+        self.assertEqual(Product.objects.values_list('current_stock', 'updated_at').get(pk=product.pk), before)
+        self.assertEqual(model_versions([Product]), version)
+
+    def test_lock_conflicts_are_recognised_by_code(self):
+        import sqlite3
+        from django.db import OperationalError
+
+        class DriverError(Exception):
+            def __init__(self, message, sqlstate=None):
+                super().__init__(message)
+                self.sqlstate = sqlstate
+
+        def wrapped(cause):
+            exc = OperationalError(str(cause))
+            exc.__cause__ = cause
+            return exc
+
+        self.assertTrue(utils._is_lock_conflict(wrapped(DriverError('deadlock detected', '40P01'))))
+        self.assertTrue(utils._is_lock_conflict(wrapped(DriverError('canceling statement due to lock timeout', '55P03'))))
+        self.assertFalse(utils._is_lock_conflict(wrapped(DriverError('relation is locked?', '42P01'))))
+        self.assertTrue(utils._is_lock_conflict(wrapped(DriverError(1213, None))))
+        self.assertTrue(utils._is_lock_conflict(wrapped(sqlite3.OperationalError('database is locked'))))
+        self.assertFalse(utils._is_lock_conflict(wrapped(sqlite3.OperationalError('no such table: x'))))
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="LED-1", name="Ledger", current_stock=10, minimum_stock_level=1)
+        InventoryBatch.objects.create(product=self.product, quantity=10)
+
+    def _age_movements(self, days):
+        StockMovement.objects.update(created_at=F('created_at') - timedelta(days=days))
+
+    def test_every_stock_change_is_recorded(self):
+        receive_stock(self.product, 5)
+        remove_stock_fifo(self.product, 12)
+        self.product.current_stock = 1
+        self.product.save()
+        self.assertEqual(
+            list(StockMovement.objects.order_by('pk').values_list('kind', 'quantity')),
+            [('OPENING', 10), ('RECEIPT', 5), ('CONSUMPTION', -10), ('CONSUMPTION', -2), ('ADJUSTMENT', -2)],
+        )
+        self.assertEqual(sum(StockMovement.objects.values_list('quantity', flat=True)), 1)
+
+    def test_stock_as_of_uses_checkpoint_plus_delta(self):
+        self._age_movements(3)
+        self.assertEqual(checkpoint_stock_ledger()['checkpoints'], 1)
+        remove_stock_fifo(self.product, 4)
+        self.assertEqual(stock_as_of(self.product, date.today() - timedelta(days=3)), 10)
+        self.assertEqual(stock_as_of(self.product, date.today() - timedelta(days=4)), 0)
+        with self.assertNumQueries(2):
+            self.assertEqual(stock_as_of(self.product, timezone.now()), 6)
+        self.assertEqual(stock_levels_as_of(timezone.now()), {self.product.pk: 6})
+        res = self.client.get(f'/api/products/{self.product.pk}/stock_as_of/?at={date.today()}')
+        self.assertEqual(res.json()['stock'], 6)
+
+    def test_backfill_reads_the_ledger(self):
+        self._age_movements(5)
+        remove_stock_fifo(self.product, 3)
+        StockMovement.objects.filter(kind='CONSUMPTION').update(created_at=F('created_at') - timedelta(days=2))
+        backfill_stock_snapshots(date.today() - timedelta(days=3))
+        levels = list(ProductStockSnapshot.objects.filter(product=self.product).order_by('date').values_list('stock_level', flat=True))
+        self.assertEqual(levels, [10, 7, 7, 7])
+
+
+class DailySnapshotTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(sku="SNP-1", name="Snapshot", current_stock=10, minimum_stock_level=1)
+        Product.objects.create(sku="SNP-2", name="Snapshot 2", current_stock=4, minimum_stock_level=1)
+
+    def _levels(self):
+        return list(
+            ProductStockSnapshot.objects.filter(product=self.product).order_by('date').values_list('date', 'stock_level')
+        )
+
+    def test_rerunning_a_date_creates_no_duplicates(self):
+        day = date.today() - timedelta(days=1)
+        self.assertEqual(create_daily_stock_snapshots(day)['created'], 2)
+        Product.objects.filter(pk=self.product.pk).update(current_stock=3)
+        self.assertEqual(create_daily_stock_snapshots(day)['created'], 0)
+        call_command('snapshot_stock_levels', date=str(day), stdout=StringIO())
+        self.assertEqual(ProductStockSnapshot.objects.filter(date=day).count(), 2)
+        self.assertEqual(self._levels(), [(day, 10)])
+
+    def test_backfill_is_idempotent(self):
+        StockMovement.objects.update(created_at=F('created_at') - timedelta(days=5))
+        start = date.today() - timedelta(days=2)
+        self.assertEqual(backfill_stock_snapshots(start)['created'], 6)
+        self.assertEqual(backfill_stock_snapshots(start)['created'], 0)
+        self.assertEqual([level for _, level in self._levels()], [10, 10, 10])
+
+    def test_backfill_before_the_ledger_requires_reconstruct(self):
+        start = date.today() - timedelta(days=2)
+        with self.assertRaises(ValueError):
+            backfill_stock_snapshots(start)
+        err = StringIO()
+        call_command('snapshot_stock_levels', backfill_from=str(start), stdout=StringIO(), stderr=err)
+        self.assertIn('--reconstruct', err.getvalue())
+        self.assertFalse(ProductStockSnapshot.objects.exists())
+
+        # 10 received today, 4 sold yesterday: rebuilt backwards from current stock
+        InventoryBatch.objects.create(product=self.product, quantity=10)
+        ProductDailySales.objects.create(product=self.product, date=date.today() - timedelta(days=1), quantity=4)
+        backfill_stock_snapshots(start, reconstruct=True)
+        self.assertEqual([level for _, level in self._levels()], [4, 0, 10])
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.reset_metrics()
+        Product.objects.create(sku="MET-1", name="Metered", current_stock=3, minimum_stock_level=1)
+
+    def test_records_per_view_histograms(self):
+        body = self.client.get('/api/products/').content
+        counts, total, count = metrics.DB_QUERIES.snapshot(('product-list', 'GET'))
+        self.assertEqual(count, 1)
+        self.assertGreater(total, 0)
+        self.assertEqual(metrics.RESPONSE_BYTES.snapshot(('product-list', 'GET'))[1], len(body))
+        self.assertGreater(metrics.SERIALIZATION_SECONDS.snapshot(('product-list', 'GET'))[1], 0)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get('/api/products/')
+        self.assertEqual(self.client.get('/api/_metrics/').status_code, 403)
+        self.client.force_login(User.objects.create_user('ops', password='x', is_staff=True))
+        res = self.client.get('/api/_metrics/')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('eisen_db_queries_count{view="product-list",method="GET"} 1', res.content.decode())
+
+    @override_settings(EISEN_SLOW_QUERY_MS=0)
+    def test_slow_queries_are_attributed_to_utils(self):
+        with self.assertLogs('inventory.slow_queries', level='WARNING') as logs:
+            self.client.post('/api/stock-alerts/evaluate/')
+        self.assertTrue(any('inventory.utils.evaluate_alerts_bulk:' in line for line in logs.output))
+        self.assertIn('origin="inventory.utils.evaluate_alerts_bulk:', metrics.render_metrics())
+
+
+@override_settings(INVENTORY_CACHE_ENABLED=True)
+class BenchmarkHarnessTests(TestCase):
+    def test_synthetic_catalog_is_consistent(self):
+        written = generate_synthetic_catalog(products=12, suppliers=3, days=40, seed=7)
+        self.assertEqual(written['products'], 12)
+        self.assertEqual(written['stock_snapshots'], 12 * 40)
+        self.assertEqual(ProductDailySales.objects.count(), written['daily_sales'])
+        for product in Product.objects.all():
+            batches = InventoryBatch.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            self.assertEqual(batches, product.current_stock)
+            self.assertEqual(ProductStockSnapshot.objects.get(product=product, date=date.today()).stock_level, product.current_stock)
+        self.assertTrue(ProductStockMonthlyRollup.objects.exists())
+        self.assertTrue(Product.objects.filter(reorder_point__gt=0).exists())
+
+    def test_run_benchmarks_reports_every_case(self):
+        generate_synthetic_catalog(products=10, suppliers=2, days=30)
+        report = run_benchmarks(repeat=2, orders=5, import_rows=20)
+        self.assertEqual(set(report['results']), set(BENCHMARK_CASES))
+        fifo = report['results']['fifo_removal']
+        self.assertEqual(fifo['runs'], 2)
+        self.assertLessEqual(fifo['min'], fifo['median'])
+        self.assertGreater(fifo['queries'], 0)
+        products = report['results']['list_endpoints']['products']
+        self.assertEqual(products['url'], '/api/products/')
+        # Cold runs build the payload; warm ones only fingerprint the list for its ETag
+        self.assertLess(products['warm']['queries'], products['cold']['queries'])
+        self.assertEqual(report['catalog']['products'], Product.objects.count())
+        json.dumps(report)
+
+    def test_command_writes_json(self):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        try:
+            call_command(
+                'benchmark_inventory', products=5, days=20, repeat=1, cases=['evaluate_all_alerts'],
+                output=path, stderr=StringIO(),
+            )
+            with open(path, encoding='utf-8') as fh:
+                report = json.load(fh)
+        finally:
+            os.remove(path)
+        self.assertEqual(list(report['results']), ['evaluate_all_alerts'])
+        self.assertEqual(report['generated']['products'], 5)
+
+
+class SQLitePragmaTests(TestCase):
+    def test_new_connections_are_tuned(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.EISEN_SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(INVENTORY_CACHE_ENABLED=True)
+class VersionedCacheTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.product = Product.objects.create(sku="CCH-1", name="Cached", current_stock=10, minimum_stock_level=2)
+
+    def test_list_is_served_from_cache_until_a_write(self):
+        first = self.client.get('/api/products/').json()
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get('/api/stock-alerts/')
+        with CaptureQueriesContext(connection) as warm:
+            self.assertEqual(self.client.get('/api/products/').json(), first)
+            self.client.get('/api/stock-alerts/')
+        # Only the ETag fingerprint queries remain for products; alerts need none
+        self.assertEqual(len(warm.captured_queries), 2)
+        self.assertGreater(len(cold.captured_queries), 0)
+
+        self.product.name = "Renamed"
+        self.product.save()
+        self.assertEqual(self.client.get('/api/products/').json()['results'][0]['name'], "Renamed")
+        Product.objects.filter(pk=self.product.pk).update(name="Bulk renamed")
+        self.assertEqual(self.client.get('/api/products/').json()['results'][0]['name'], "Bulk renamed")
+
+    def test_etag_and_body_come_from_the_same_rows(self):
+        first = self.client.get('/api/products/')
+        # Another process's write: this process's cache versions are not bumped
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE inventory_product SET current_stock = 1, updated_at = %s WHERE id = %s',
+                [timezone.now() + timedelta(seconds=1), self.product.pk],
+            )
+        second = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['results'][0]['current_stock'], 1)
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=second['ETag']).status_code, 304)
+
+    def test_alerts_and_rollups_follow_bulk_writes(self):
+        self.assertEqual(self.client.get('/api/stock-alerts/').json(), [])
+        Product.objects.filter(pk=self.product.pk).update(current_stock=1)
+        evaluate_all_alerts()
+        self.assertEqual(len(self.client.get('/api/stock-alerts/').json()), 1)
+
+        self.assertEqual(self.client.get('/api/stock-snapshots/monthly/').json(), [])
+        create_daily_stock_snapshots()
+        self.assertEqual(self.client.get('/api/stock-snapshots/monthly/').json()[0]['max_stock'], 1)
+
+
+class HotQueryPlanTests(TestCase):
+    """EXPLAIN the queries issued by the hot paths and fail on any full table scan."""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plans are checked on SQLite')
+        supplier = Supplier.objects.create(name="Plan Supplier")
+        self.product = Product.objects.create(sku="PLAN-1", name="Planned", current_stock=0, minimum_stock_level=5)
+        for _ in range(3):
+            receive_stock(self.product, 4, supplier=supplier, unit_cost=2)
+        SupplierProduct.objects.filter(product=self.product).update(is_preferred=True, lead_time_days=3)
+
+    def _plans(self, func, table, where=''):
+        """Query plans of the SELECTs on ``table`` (containing ``where``) that ``func`` issues."""
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if sql.startswith('SELECT') and f'FROM "{table}"' in sql and where in sql:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plans.append(' | '.join(row[-1] for row in cursor.fetchall()))
+        self.assertTrue(plans, f'no SELECT on {table} was issued')
+        return plans
+
+    def assertUsesIndex(self, plans, table, index):
+        for plan in plans:
+            self.assertNotRegex(plan, rf'SCAN {table}(?! USING)', plan)
+            self.assertIn(index, plan)
+
+    def test_fifo_batches(self):
+        table = 'inventory_inventorybatch'
+        plans = self._plans(lambda: remove_stock_fifo(self.product, 5), table)
+        self.assertUsesIndex(plans, table, 'batch_fifo_open_idx')
+
+    def test_active_alert_lookup(self):
+        table = 'inventory_stockalert'
+        Product.objects.filter(pk=self.product.pk).update(current_stock=1)
+        self.product.refresh_from_db()
+        plans = self._plans(lambda: evaluate_product_alert(self.product), table)
+        self.assertUsesIndex(plans, table, 'alert_active_product_idx')
+
+    def test_preferred_supplier_lookups(self):
+        table = 'inventory_supplierproduct'
+        plans = self._plans(lambda: reorder_recommendation(self.product), table, where='"is_preferred"')
+        self.assertUsesIndex(plans, table, 'supplierproduct_preferred_idx')
+        plans = self._plans(bulk_reorder_recommendations, table, where='"is_preferred"')
+        self.assertUsesIndex(plans, table, 'supplierproduct_pref_cost_idx')
+
+
+class SchedulerTests(TestCase):
+    def test_due_jobs_run_once_at_a_time(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        job = ScheduledJob('slow', slow, interval=10)
+        scheduler = Scheduler([job, ScheduledJob('fast', lambda: 'done', interval=10)], workers=2)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(job.run_claimed) if job.claim() else None
+            started.wait(5)
+            job.next_run = 0
+            with self.assertLogs('inventory.scheduler', level='WARNING'):
+                futures = scheduler.submit_due(pool, now=100)
+            release.set()
+            first.result()
+            for future in futures:
+                future.result()
+        # 'slow' was still running, so only 'fast' was submitted
+        self.assertEqual(len(futures), 1)
+        stats = scheduler.stats()
+        self.assertEqual(stats['slow']['skipped'], 1)
+        self.assertEqual(stats['slow']['runs'], 1)
+        self.assertEqual(stats['fast']['last_result'], 'done')
+        self.assertEqual(job.next_run, 110)
+        self.assertEqual(scheduler.due(105), [])
+
+    def test_failures_are_recorded(self):
+        def broken():
+            raise RuntimeError('boom')
+
+        job = ScheduledJob('broken', broken, interval=1)
+        with self.assertLogs('inventory.scheduler', level='ERROR'):
+            self.assertTrue(job.run())
+        self.assertEqual(job.stats.failures, 1)
+        self.assertIn('boom', job.stats.last_error)
+        self.assertFalse(job.running)
+
+    def test_default_jobs_run_in_process(self):
+        Product.objects.create(sku="SCH-1", name="Scheduled", current_stock=1, minimum_stock_level=5)
+        scheduler = Scheduler.from_settings(intervals={'stock_alerts': 60})
+        self.assertEqual(scheduler.jobs['stock_alerts'].interval, 60)
+        for job in scheduler.jobs.values():
+            job.run()
+        stats = scheduler.stats()
+        self.assertEqual({s['failures'] for s in stats.values()}, {0})
+        self.assertEqual(stats['stock_alerts']['last_result'], {'evaluated': 1})
+        self.assertEqual(ProductStockSnapshot.objects.count(), 1)
+
+    def test_daily_job_comes_due_at_its_time_of_day(self):
+        job = ScheduledJob('nightly', lambda: None, at='00:05')
+        self.assertEqual(job.next_run, 0)
+        evening = timezone.make_aware(datetime(2024, 3, 10, 23, 0))
+        with patch('inventory.scheduler.timezone.localtime', return_value=evening):
+            self.assertEqual(job.following(100), 100 + 65 * 60)
+        with patch('inventory.scheduler.timezone.localtime', return_value=evening.replace(hour=0, minute=5)):
+            self.assertEqual(job.following(100), 100 + 24 * 3600)
+        with self.assertRaises(ValueError):
+            ScheduledJob('bad', lambda: None, at='25:00')
+        scheduler = Scheduler.from_settings()
+        self.assertEqual(scheduler.jobs['stock_snapshots'].schedule, 'daily at 00:05')
+        self.assertEqual(Scheduler.from_settings(intervals={'stock_snapshots': 60}).jobs['stock_snapshots'].interval, 60)
+
+    def test_snapshot_job_records_yesterdays_closing_levels(self):
+        product = Product.objects.create(sku="SCH-2", name="Closing", current_stock=10, minimum_stock_level=1)
+        InventoryBatch.objects.create(product=product, quantity=10)
+        StockMovement.objects.update(created_at=F('created_at') - timedelta(days=3))
+        remove_stock_fifo(product, 4)
+        Scheduler.from_settings(only=['stock_snapshots']).jobs['stock_snapshots'].run()
+        self.assertEqual(
+            list(ProductStockSnapshot.objects.values_list('date', 'stock_level')),
+            [(date.today() - timedelta(days=1), 10)],
+        )
+
+    def test_jobs_writing_reorder_status_take_turns(self):
+        scheduler = Scheduler.from_settings(only=['stock_alerts', 'reorder_points'])
+        alerts, points = scheduler.jobs['stock_alerts'], scheduler.jobs['reorder_points']
+        self.assertIs(alerts.lock, points.lock)
+        running, overlaps = [], []
+        entered = threading.Event()
+        release = threading.Event()
+
+        def job(name, wait):
+            def run():
+                if running:
+                    overlaps.append(name)
+                running.append(name)
+                if wait:
+                    entered.set()
+                    release.wait(5)
+                running.remove(name)
+            return run
+
+        alerts.func, points.func = job('alerts', True), job('points', False)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.assertTrue(alerts.claim())
+            first = pool.submit(alerts.run_claimed)
+            entered.wait(5)
+            self.assertTrue(points.claim())
+            second = pool.submit(points.run_claimed)
+            time.sleep(0.05)
+            self.assertEqual(points.stats.runs, 0)
+            release.set()
+            first.result()
+            second.result()
+        self.assertEqual(overlaps, [])
+        self.assertEqual((alerts.stats.runs, points.stats.runs), (1, 1))
+
+
+class BulkAlertEvaluationTests(TestCase):
+    class Rollback(Exception):
+        pass
+
+    def setUp(self):
+        # sku: (current_stock, minimum, reorder_point, stored status, active alert statuses)
+        catalog = {
+            'ALR-OK': (100, 10, 0, 'OK', []),
+            'ALR-NEAR': (11, 10, 0, 'OK', []),
+            'ALR-LOW': (4, 10, 0, 'OK', []),
+            'ALR-RECOVERED': (50, 10, 0, 'LOW', ['LOW', 'APPROACHING']),
+            'ALR-WORSENED': (2, 10, 0, 'APPROACHING', ['APPROACHING']),
+            'ALR-ALREADY-LOW': (1, 10, 0, 'LOW', ['LOW']),
+            'ALR-POINT': (14, 5, 15, 'OK', []),
+            'ALR-ZERO': (0, 0, 0, 'OK', []),
+            'ALR-ZERO-STOCKED': (3, 0, 0, 'LOW', ['LOW']),
+        }
+        for sku, (stock, minimum, point, status, alerts) in catalog.items():
+            product = Product.objects.create(sku=sku, name=sku, current_stock=stock, minimum_stock_level=minimum)
+            Product.objects.filter(pk=product.pk).update(reorder_point=point, reorder_status=status)
+            for alert_status in alerts:
+                StockAlert.objects.create(product=product, status=alert_status, current_stock_at_trigger=stock,
+                                          minimum_stock_level=minimum, message='earlier')
+
+    def _evaluated(self, evaluate):
+        """Statuses and alerts after ``evaluate()``, rolled back so both paths start from the same data."""
+        try:
+            with transaction.atomic():
+                evaluate()
+                outcome = (
+                    dict(Product.objects.values_list('sku', 'reorder_status')),
+                    sorted(StockAlert.objects.filter(active=True).values_list(
+                        'product__sku', 'status', 'current_stock_at_trigger', 'minimum_stock_level',
+                        'threshold_at_trigger', 'message',
+                    )),
+                    sorted(StockAlert.objects.filter(active=False, resolved_at__isnull=False)
+                           .values_list('product__sku', 'status')),
+                )
+                raise self.Rollback
+        except self.Rollback:
+            return outcome
+
+    def test_bulk_matches_per_product(self):
+        def per_product():
+            for product in Product.objects.all():
+                evaluate_product_alert(product, save=True)
+
+        expected = self._evaluated(per_product)
+        self.assertEqual(self._evaluated(evaluate_all_alerts), expected)
+        statuses, active, resolved = expected
+        self.assertEqual(
+            (statuses['ALR-NEAR'], statuses['ALR-LOW'], statuses['ALR-POINT'], statuses['ALR-ZERO-STOCKED']),
+            ('APPROACHING', 'LOW', 'LOW', 'OK'),
+        )
+        self.assertEqual(resolved, [('ALR-RECOVERED', 'APPROACHING'), ('ALR-RECOVERED', 'LOW'), ('ALR-ZERO-STOCKED', 'LOW')])
+        self.assertEqual(sum(1 for row in active if row[0] == 'ALR-ALREADY-LOW'), 1)
+
+    def test_alerts_record_the_reorder_threshold(self):
+        evaluate_all_alerts()
+        # Reorder point 15 above a minimum of 5: LOW at 14 because of the reorder point
+        point = StockAlert.objects.get(product__sku='ALR-POINT', active=True)
+        self.assertEqual((point.minimum_stock_level, point.threshold_at_trigger), (5, 15))
+        self.assertEqual(point.get_status_display(), 'At or Below Reorder Threshold')
+        self.assertEqual(Product.objects.get(sku='ALR-POINT').get_reorder_status_display(), 'At or Below Reorder Threshold')
+        near = StockAlert.objects.get(product__sku='ALR-NEAR', active=True)
+        self.assertEqual((near.minimum_stock_level, near.threshold_at_trigger), (10, 10))
+        self.assertEqual(near.get_status_display(), 'Approaching Reorder Threshold')
+        self.assertIn('reorder point', point.message)
+
+
+class ReorderStatusTests(TestCase):
+    def setUp(self):
+        # (current_stock, minimum, reorder_point): expected status with a 20% buffer
+        self.cases = {
+            'below-reorder-point': (8, 2, 10, 'LOW'),
+            'within-buffer': (11, 2, 10, 'APPROACHING'),
+            'below-minimum': (3, 5, 0, 'LOW'),
+            'healthy': (50, 5, 10, 'OK'),
+        }
+        for sku, (stock, minimum, point, _) in self.cases.items():
+            Product.objects.create(sku=sku, name=sku, current_stock=stock, minimum_stock_level=minimum)
+            Product.objects.filter(sku=sku).update(reorder_point=point, reorder_status='OK')
+
+    def test_bulk_classifier_uses_reorder_point(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result = evaluate_reorder_statuses()
+        # One SELECT and one bulk UPDATE regardless of catalog size
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(result['evaluated'], 4)
+        self.assertEqual(result['changed'], 3)
+        self.assertEqual(result['statuses'], {'OK': 1, 'APPROACHING': 1, 'LOW': 2})
+        for sku, (*_, expected) in self.cases.items():
+            product = Product.objects.get(sku=sku)
+            self.assertEqual(product.reorder_status, expected, sku)
+            self.assertEqual(evaluate_product_alert(product, save=False), expected, sku)
+        self.assertEqual(evaluate_reorder_statuses()['changed'], 0)
+
+    def test_command_reports_changes(self):
+        out = StringIO()
+        call_command('evaluate_reorder_statuses', stdout=out)
+        self.assertIn('Evaluated 4 products', out.getvalue())
+        self.assertIn('3 status changes', out.getvalue())
+
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        self.widget = Product.objects.create(sku="EXP-W", name="Widget", current_stock=0, minimum_stock_level=1)
+        gadget = Product.objects.create(sku="EXP-G", name="Gadget", current_stock=0, minimum_stock_level=1)
+        for product, quantity in ((self.widget, 3), (self.widget, 4), (gadget, 5), (self.widget, 6)):
+            receive_stock(product, quantity)
+        upsert_daily_sales([{'sku': 'EXP-W', 'date': date.today() - timedelta(days=i), 'quantity': i + 1} for i in range(3)])
+
+    def test_csv_export_streams_filtered_rows(self):
+        with patch('inventory.api_views.EXPORT_CHUNK_SIZE', 2):
+            res = self.client.get('/api/inventory-batches/export.csv?search=EXP-W')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        self.assertIn('attachment; filename="inventorybatch.csv"', res['Content-Disposition'])
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'product', 'sku'])
+        self.assertEqual([line.split(',')[6] for line in lines[1:]], ['3', '4', '6'])
+        self.assertEqual(self.client.get('/api/inventory-batches/export.csv/').status_code, 200)
+
+    def test_ndjson_export(self):
+        res = self.client.get('/api/product-daily-sales/export.ndjson', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(res.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(res.streaming_content).decode().splitlines()]
+        self.assertEqual(sorted(r['quantity'] for r in rows), [1, 2, 3])
+        self.assertEqual({r['sku'] for r in rows}, {'EXP-W'})
+        self.assertEqual(
+            {r['quantity']: r['date'] for r in rows},
+            {i + 1: (date.today() - timedelta(days=i)).isoformat() for i in range(3)},
+        )
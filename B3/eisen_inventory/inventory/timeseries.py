@@ -0,0 +1,191 @@
+"""Process-local columnar cache of per-product daily series.
+
+Each product's history is held as one dense NumPy array indexed by day offset from
+``start``, so windows and rolling statistics are slices instead of ORM queries.
+Series load lazily, are evicted least-recently-used once the byte budget is
+exceeded and are dropped by the model write hooks.
+
+The cache is per process, so each read also checks the model's version in the shared
+inventory cache (inventory.cache), which every ORM write bumps, and drops the whole
+store when it moved. That covers writes from other workers as far as the cache backend
+is shared; a series older than INVENTORY_TIMESERIES_TTL seconds is reloaded regardless,
+bounding staleness from writers that bypass both (raw SQL, other hosts). Persisted
+figures such as Product.reorder_point are computed from the database, not from here.
+"""
+from collections import OrderedDict
+from datetime import date, timedelta
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+class DailySeries:
+    """Dense daily values for one product: ``values[i]`` is the value on ``start + i`` days."""
+
+    __slots__ = ('start', 'values', 'present', 'loaded_at')
+
+    def __init__(self, start: date, values, present):
+        self.start = start
+        self.values = values
+        self.present = present
+        self.loaded_at = time.monotonic()
+
+    @property
+    def end(self):
+        return self.start + timedelta(days=len(self.values) - 1)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.present.nbytes
+
+    def _slice(self, array, start: date, end: date, fill):
+        """Return ``array`` for [start, end], padding days outside the loaded range with ``fill``."""
+        days = (end - start).days + 1
+        if days <= 0:
+            return array[:0]
+        out = np.full(days, fill, dtype=array.dtype)
+        lo = (start - self.start).days
+        hi = lo + days
+        src_lo, src_hi = max(lo, 0), min(hi, len(array))
+        if src_lo < src_hi:
+            out[src_lo - lo:src_hi - lo] = array[src_lo:src_hi]
+        return out
+
+    def window(self, start: date, end: date):
+        return self._slice(self.values, start, end, 0)
+
+    def mask(self, start: date, end: date):
+        return self._slice(self.present, start, end, False)
+
+
+class TimeSeriesStore:
+    """LRU cache of DailySeries for one (model, value field) pair, keyed by product id."""
+
+    def __init__(self, model_label: str, value_field: str, history_days: int = 400, max_bytes: int = None,
+                 ttl: float = None):
+        self.model_label = model_label
+        self.value_field = value_field
+        self.history_days = history_days
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._series = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        from django.apps import apps
+        return apps.get_model(self.model_label)
+
+    @property
+    def budget(self):
+        if self.max_bytes is not None:
+            return self.max_bytes
+        return getattr(settings, 'INVENTORY_TIMESERIES_CACHE_BYTES', 16 * 1024 * 1024)
+
+    @property
+    def max_age(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'INVENTORY_TIMESERIES_TTL', 60)
+
+    def _check_version(self):
+        """Drop every series if the model was written since they were loaded (see inventory.cache)."""
+        from .cache import model_versions
+        [(_, version)] = model_versions([self.model_label.lower()])
+        with self._lock:
+            if version != self._version:
+                self._series.clear()
+                self._bytes = 0
+                self._version = version
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._series)
+
+    def _load(self, product_id, start: date, end: date):
+        rows = (
+            self.model.objects.filter(product_id=product_id, date__range=(start, end))
+            .order_by().values_list('date', self.value_field)
+        )
+        days = (end - start).days + 1
+        values = np.zeros(days, dtype=np.int64)
+        present = np.zeros(days, dtype=bool)
+        for day, value in rows:
+            offset = (day - start).days
+            values[offset] = value
+            present[offset] = True
+        return DailySeries(start, values, present)
+
+    def get(self, product_id, since: date = None):
+        """Return the cached series for a product, loading it if missing or too short."""
+        today = date.today()
+        since = since or today - timedelta(days=self.history_days - 1)
+        self._check_version()
+        with self._lock:
+            series = self._series.get(product_id)
+            if (series is not None and series.start <= since and series.end >= today
+                    and time.monotonic() - series.loaded_at < self.max_age):
+                self._series.move_to_end(product_id)
+                return series
+        series = self._load(product_id, min(since, today - timedelta(days=self.history_days - 1)), today)
+        with self._lock:
+            old = self._series.pop(product_id, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._series[product_id] = series
+            self._bytes += series.nbytes
+            while self._bytes > self.budget and len(self._series) > 1:
+                _, evicted = self._series.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return series
+
+    def invalidate(self, product_id=None):
+        """Drop one product's series, or everything when ``product_id`` is None."""
+        with self._lock:
+            if product_id is None:
+                self._series.clear()
+                self._bytes = 0
+                return
+            series = self._series.pop(product_id, None)
+            if series is not None:
+                self._bytes -= series.nbytes
+
+    def window(self, product_id, days: int, end: date = None):
+        """Return the last ``days`` values ending at ``end`` (default today); missing days are 0."""
+        end = end or date.today()
+        start = end - timedelta(days=days - 1)
+        return self.get(product_id, since=start).window(start, end)
+
+    def observed(self, product_id, days: int, end: date = None):
+        """Return (dates, values) for days in the window that actually have a row."""
+        end = end or date.today()
+        start = end - timedelta(days=days - 1)
+        series = self.get(product_id, since=start)
+        mask = series.mask(start, end)
+        offsets = np.flatnonzero(mask)
+        dates = [start + timedelta(days=int(i)) for i in offsets]
+        return dates, series.window(start, end)[mask]
+
+    def rolling_mean(self, product_id, window: int, days: int, end: date = None):
+        """Trailing ``window``-day mean for each of the last ``days`` days (zeros for missing days)."""
+        end = end or date.today()
+        values = self.window(product_id, days + window - 1, end).astype(float)
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        return (sums[window:] - sums[:-window]) / window
+
+
+sales_series = TimeSeriesStore('inventory.ProductDailySales', 'quantity')
+stock_series = TimeSeriesStore('inventory.ProductStockSnapshot', 'stock_level')
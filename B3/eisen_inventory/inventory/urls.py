@@ -11,6 +11,7 @@ from .api_views import (
     UploadViewSet,
     upload_excel_view,
     upload_csv_view,
+    import_job_view,
     list_users,
 )
 from .auth_views import login_view, logout_view, current_user_view, register_view
@@ -25,11 +26,26 @@ router.register(r'stock-alerts', StockAlertViewSet, basename='stock-alert')
 router.register(r'stock-snapshots', ProductStockSnapshotViewSet, basename='stock-snapshot')
 router.register(r'uploads', UploadViewSet, basename='uploads')
 
-urlpatterns = [
+# Streaming exports, also reachable without the router's trailing slash
+# (e.g. /api/inventory-batches/export.csv)
+export_urlpatterns = [
+    path(f'{prefix}/export.{fmt}', viewset.as_view(
+        {'get': f'export_{fmt}'}, basename=basename, detail=False, **getattr(viewset, f'export_{fmt}').kwargs,
+    ))
+    for prefix, viewset, basename in (
+        ('inventory-batches', InventoryBatchViewSet, 'inventorybatch'),
+        ('product-daily-sales', ProductDailySalesViewSet, 'productdailysales'),
+        ('stock-snapshots', ProductStockSnapshotViewSet, 'stock-snapshot'),
+    )
+    for fmt in ('csv', 'ndjson')
+]
+
+urlpatterns = export_urlpatterns + [
     path('', include(router.urls)),
     # Explicit upload endpoints (CSRF-exempt function views)
     path('uploads/upload_excel/', upload_excel_view, name='upload-excel'),
     path('uploads/upload_csv/', upload_csv_view, name='upload-csv'),
+    path('uploads/jobs/<int:job_id>/', import_job_view, name='upload-job'),
     # Authentication endpoints
     path('auth/login/', login_view, name='api-login'),
     path('auth/logout/', logout_view, name='api-logout'),
@@ -1,9 +1,22 @@
-from datetime import date, timedelta
-from statistics import mean
-from django.db.models import Sum, Max
+from datetime import date, datetime, time as dt_time, timedelta
+from functools import cached_property
+from math import ceil
+from statistics import mean, pstdev
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import Sum, Max, Min, Count, Case, When, Value, F, Q, CharField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, TruncDate, TruncMonth, TruncYear
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual, LessThanOrEqual
 from django.utils import timezone
-from .models import InventoryBatch, Product, ProductDailySales, SupplierProduct, StockAlert, ProductStockSnapshot
+from .models import (
+    InventoryBatch, Product, ProductDailySales, SupplierProduct, StockAlert, ProductStockSnapshot, ImportJob,
+    ProductStockMonthlyRollup, ProductStockYearlyRollup, StockMovement, StockCheckpoint,
+)
+from .timeseries import sales_series, stock_series
 import csv
+import random
+import time
+from itertools import islice
 from pathlib import Path
 
 try:
@@ -13,36 +26,297 @@ except ImportError:  # pragma: no cover
     openpyxl = None
     OPENPYXL_AVAILABLE = False
 
+try:
+    import numpy as np  # for vectorized reorder math
+    NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    np = None
+    NUMPY_AVAILABLE = False
+
+class StockConflict(Exception):
+    """A batch changed between being read and written; the whole consumption is retried."""
+
+
+# Conflicting writers are retried until this many seconds have passed
+STOCK_RETRY_TIMEOUT = 5.0
+STOCK_RETRY_BACKOFF = 0.005
+STOCK_RETRY_BACKOFF_MAX = 0.2
+
+
 def remove_stock_fifo(product, quantity):
     """
     Removes stock from batches for the given product using FIFO logic.
     Returns True if enough stock was available and removed, False otherwise.
     """
-    batches = InventoryBatch.objects.filter(product=product, quantity__gt=0).order_by('received_at')
-    remaining = quantity
-    for batch in batches:
-        if batch.quantity >= remaining:
-            batch.quantity -= remaining
-            batch.save()
-            remaining = 0
-            break
-        else:
-            remaining -= batch.quantity
-            batch.quantity = 0
-            batch.save()
-    if remaining == 0:
-        product.current_stock -= quantity
-        product.save()
+    results = remove_stock_fifo_bulk([(product, quantity)])
+    # False means not enough stock!
+    return results[product.pk]
+
+
+# SQLSTATEs (PostgreSQL and others) and MySQL error numbers for "another writer holds the lock"
+LOCK_CONFLICT_SQLSTATES = {
+    '40001',  # serialization_failure
+    '40P01',  # deadlock_detected
+    '55P03',  # lock_not_available (lock_timeout, NOWAIT)
+}
+LOCK_CONFLICT_MYSQL_ERRORS = {1205, 1213}  # lock wait timeout, deadlock
+SQLITE_BUSY, SQLITE_LOCKED = 5, 6
+
+
+def _is_lock_conflict(exc):
+    """True if a DB error means the transaction lost a lock race and can simply be retried."""
+    cause = exc.__cause__ or exc
+    sqlstate = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)
+    if sqlstate:
+        return sqlstate in LOCK_CONFLICT_SQLSTATES
+    sqlite_code = getattr(cause, 'sqlite_errorcode', None)
+    if sqlite_code is not None:
+        # Extended result codes (e.g. SQLITE_BUSY_SNAPSHOT) keep the primary code in the low byte
+        return sqlite_code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    if cause.args and cause.args[0] in LOCK_CONFLICT_MYSQL_ERRORS:
         return True
-    else:
-        # Not enough stock!
-        return False
+    # sqlite3 before Python 3.11 only says "database is locked" / "database table is locked"
+    return 'locked' in str(exc).lower()
+
+
+def remove_stock_fifo_bulk(lines, timeout: float = STOCK_RETRY_TIMEOUT):
+    """Consume stock for a whole order of (product, quantity) lines, safe under concurrency.
+
+    Lines for the same product are merged. Each product is first decremented with a guarded
+    ``current_stock = current_stock - qty WHERE current_stock >= qty AND <open batches> >= qty``
+    update, which takes the row lock (SQLite: the write lock) before anything is read, so
+    stock can never go negative. Batches are then read with ``select_for_update``, drained
+    oldest-first and written back in one UPDATE that also checks each batch's ``version``; if
+    another writer slipped in, the transaction is rolled back and retried with backoff (so are
+    lock timeouts and deadlocks). A product whose stock or batches cannot cover its quantity
+    is left untouched, updated_at included. Alerts of the consumed products are
+    evaluated after commit in one set-based pass (evaluate_alerts_bulk).
+
+    Returns: {product_id: bool} telling whether each product's quantity was removed.
+    """
+    wanted = {}
+    instances = {}
+    for product, quantity in lines:
+        if isinstance(product, Product):
+            instances[product.pk] = product
+            product_id = product.pk
+        else:
+            product_id = int(product)
+        wanted[product_id] = wanted.get(product_id, 0) + int(quantity)
+    if not wanted:
+        return {}
+
+    # Retrying only makes sense when we own the transaction
+    retry = not transaction.get_connection().in_atomic_block
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        try:
+            results, consumed = _consume_stock_once(wanted)
+            break
+        except (StockConflict, OperationalError) as exc:
+            if not retry or time.monotonic() >= deadline or (isinstance(exc, OperationalError) and not _is_lock_conflict(exc)):
+                raise
+            # Jittered exponential backoff so colliding workers spread out
+            time.sleep(random.uniform(0, min(STOCK_RETRY_BACKOFF * (2 ** attempt), STOCK_RETRY_BACKOFF_MAX)))
+            attempt += 1
+
+    if not consumed:
+        return results
+    # One set-based alert pass for the whole order, not one per product
+    try:
+        evaluated = evaluate_alerts_bulk(Product.objects.filter(pk__in=consumed))
+    except Exception:
+        return results
+    # Keep caller-held instances in sync so they see the new stock level and status
+    for row in evaluated:
+        if row['product_id'] in instances:
+            instances[row['product_id']].current_stock = row['current_stock']
+            instances[row['product_id']].reorder_status = row['status']
+    return results
+
+
+def _consume_stock_once(wanted):
+    results = {}
+    with transaction.atomic():
+        now = timezone.now()
+        reserved = {}
+        for product_id in sorted(wanted):
+            quantity = wanted[product_id]
+            if quantity <= 0:
+                results[product_id] = True
+                continue
+            # Batches are checked in the same statement, so a product they can't cover is never written
+            open_batches = Subquery(
+                InventoryBatch.objects.filter(product_id=OuterRef('pk'), quantity__gt=0)
+                .order_by().values('product_id').annotate(total=Sum('quantity')).values('total')
+            )
+            taken = Product.objects.filter(
+                GreaterThanOrEqual(Coalesce(open_batches, 0), quantity), pk=product_id, current_stock__gte=quantity,
+            ).update(current_stock=F('current_stock') - quantity, updated_at=now)
+            if taken:
+                reserved[product_id] = quantity
+            else:
+                results[product_id] = False
+        if not reserved:
+            return results, []
+
+        batches_by_product = {product_id: [] for product_id in reserved}
+        batches = (
+            InventoryBatch.objects.select_for_update()
+            .filter(product_id__in=reserved.keys(), quantity__gt=0)
+            .order_by('product_id', 'received_at', 'pk')
+            .only('pk', 'product_id', 'quantity', 'version')
+        )
+        for batch in batches:
+            batches_by_product[batch.product_id].append(batch)
+
+        drained = {}
+        movements = []
+        for product_id, quantity in reserved.items():
+            available = sum(b.quantity for b in batches_by_product[product_id])
+            if available < quantity:
+                # Batches changed since the guarded update checked them; start over
+                raise StockConflict(f'batches of product {product_id} changed concurrently')
+            remaining = quantity
+            for batch in batches_by_product[product_id]:
+                take = min(batch.quantity, remaining)
+                drained[batch.pk] = (batch.version, batch.quantity - take)
+                movements.append(StockMovement(
+                    product_id=product_id, batch_id=batch.pk, kind=StockMovement.KIND_CONSUMPTION,
+                    quantity=-take, created_at=now,
+                ))
+                remaining -= take
+                if remaining == 0:
+                    break
+            results[product_id] = True
+
+        if drained:
+            # One UPDATE for all batches, matching only rows whose version we read
+            expected = Q()
+            for pk, (version, _) in drained.items():
+                expected |= Q(pk=pk, version=version)
+            written = InventoryBatch.objects.filter(expected).update(
+                quantity=Case(*[When(pk=pk, then=Value(qty)) for pk, (_, qty) in drained.items()]),
+                version=F('version') + 1,
+                updated_at=now,
+            )
+            if written != len(drained):
+                raise StockConflict(f'{len(drained) - written} batch(es) changed concurrently')
+            StockMovement.objects.bulk_create(movements)
+
+    consumed = [product_id for product_id, ok in results.items() if ok and product_id in reserved]
+    return results, consumed
+
+
+def receive_stock(product: Product, quantity: int, supplier=None, unit_cost=None):
+    """Record an incoming batch and raise current_stock by ``quantity`` atomically."""
+    if quantity <= 0:
+        raise ValueError('quantity must be positive')
+    with transaction.atomic():
+        Product.objects.filter(pk=product.pk).update(
+            current_stock=F('current_stock') + quantity, updated_at=timezone.now(),
+        )
+        product.current_stock = Product.objects.values_list('current_stock', flat=True).get(pk=product.pk)
+        # InventoryBatch.save links the supplier and re-evaluates the alert
+        batch = InventoryBatch.objects.create(product=product, quantity=quantity, supplier=supplier, unit_cost=unit_cost)
+        StockMovement.objects.create(product=product, batch=batch, kind=StockMovement.KIND_RECEIPT, quantity=quantity)
+    return batch
+
+
+# --- Stock ledger: checkpoints and point-in-time balances ---
+
+CHECKPOINT_LAG_SECONDS = 60
+
+
+def _end_of_day(day):
+    """Last instant of ``day`` in the current timezone; datetimes pass through."""
+    if isinstance(day, datetime):
+        return day
+    return timezone.make_aware(datetime.combine(day, dt_time.max))
+
+
+def checkpoint_stock_ledger(lag_seconds: int = CHECKPOINT_LAG_SECONDS):
+    """Fold new StockMovement rows into StockCheckpoint balances for the products they touch.
+
+    Only ids up to the newest movement older than ``lag_seconds`` are folded, so rows from
+    transactions still in flight are not skipped. Each checkpoint's ``as_of`` is the newest
+    timestamp it includes. Products without new movements keep their previous checkpoint.
+    """
+    cutoff = timezone.now() - timedelta(seconds=lag_seconds)
+    last = StockCheckpoint.objects.aggregate(last=Max('movement_id'))['last'] or 0
+    high = StockMovement.objects.filter(pk__gt=last, created_at__lte=cutoff).aggregate(high=Max('pk'))['high']
+    if high is None:
+        return {'checkpoints': 0, 'movement_id': last}
+    previous = (
+        StockCheckpoint.objects.filter(product_id=OuterRef('product_id'))
+        .order_by('-movement_id').values('balance')[:1]
+    )
+    rows = (
+        StockMovement.objects.filter(pk__gt=last, pk__lte=high)
+        .order_by().values('product_id')
+        .annotate(change=Sum('quantity'), newest=Max('created_at'), previous=Subquery(previous))
+        .values_list('product_id', 'change', 'newest', 'previous')
+    )
+    checkpoints = [
+        StockCheckpoint(product_id=product_id, movement_id=high, as_of=newest, balance=(prior or 0) + change)
+        for product_id, change, newest, prior in rows.iterator()
+    ]
+    StockCheckpoint.objects.bulk_create(checkpoints, batch_size=SNAPSHOT_BATCH_SIZE)
+    return {'checkpoints': len(checkpoints), 'movement_id': high}
+
+
+def _checkpoint_before(when):
+    return (
+        StockCheckpoint.objects.filter(product_id=OuterRef('product_id'), as_of__lte=when)
+        .order_by('-movement_id')
+    )
+
+
+def stock_as_of(product, when):
+    """Stock level of one product at ``when`` (a datetime, or a date meaning end of that day).
+
+    Reads the nearest checkpoint at or before ``when`` and sums the few movements after it.
+    """
+    when = _end_of_day(when)
+    product_id = getattr(product, 'pk', product)
+    checkpoint = (
+        StockCheckpoint.objects.filter(product_id=product_id, as_of__lte=when)
+        .order_by('-movement_id').values_list('movement_id', 'balance').first()
+    )
+    movements = StockMovement.objects.filter(product_id=product_id, created_at__lte=when)
+    balance = 0
+    if checkpoint:
+        movements = movements.filter(pk__gt=checkpoint[0])
+        balance = checkpoint[1]
+    return balance + (movements.aggregate(change=Sum('quantity'))['change'] or 0)
+
+
+def stock_levels_as_of(when, product_ids=None):
+    """{product_id: stock level} at ``when`` for every product with ledger history, in two queries."""
+    when = _end_of_day(when)
+    checkpoints = StockCheckpoint.objects.filter(pk=Subquery(_checkpoint_before(when).values('pk')[:1]))
+    movements = StockMovement.objects.filter(created_at__lte=when).alias(
+        folded=Coalesce(Subquery(_checkpoint_before(when).values('movement_id')[:1]), Value(0)),
+    ).filter(pk__gt=F('folded'))
+    if product_ids is not None:
+        checkpoints = checkpoints.filter(product_id__in=product_ids)
+        movements = movements.filter(product_id__in=product_ids)
+    levels = dict(checkpoints.values_list('product_id', 'balance'))
+    grouped = movements.order_by().values('product_id').annotate(change=Sum('quantity')).values_list('product_id', 'change')
+    for product_id, change in grouped.iterator():
+        levels[product_id] = levels.get(product_id, 0) + change
+    return levels
 
 
 # --- Reorder & Safety Stock Calculations ---
 
 def get_daily_sales_window(product: Product, days: int = 90):
-    """Return list of last N days sales quantities (0 for missing days)."""
+    """Return list of last N days sales quantities (0 for missing days).
+
+    Always read from the database: the figures feed the persisted reorder fields, which
+    must not depend on this process's sales_series copy being current.
+    """
     end = date.today()
     start = end - timedelta(days=days - 1)
     qs = ProductDailySales.objects.filter(product=product, date__range=(start, end))
@@ -56,34 +330,95 @@ def get_daily_sales_window(product: Product, days: int = 90):
     return quantities
 
 
+# Bumped whenever a product's sales or supplier rows change; memoized stats
+# compare against it to know when they must be rebuilt.
+_demand_generation = {}
+
+
+def invalidate_demand_stats(product_id):
+    """Mark cached ProductDemandStats for the product as stale."""
+    _demand_generation[product_id] = _demand_generation.get(product_id, 0) + 1
+
+
+class ProductDemandStats:
+    """Sales and lead-time figures for one product, fetched once and memoized.
+
+    The 90-day sales window and SupplierProduct lead times are each loaded with a single
+    query on first use; shorter windows are slices of the long one.
+    """
+
+    window_days = 90
+
+    def __init__(self, product: Product):
+        self.product = product
+        self.generation = _demand_generation.get(product.pk, 0)
+        self.day = date.today()
+
+    @property
+    def is_stale(self):
+        return self.generation != _demand_generation.get(self.product.pk, 0) or self.day != date.today()
+
+    @cached_property
+    def sales_window(self):
+        return get_daily_sales_window(self.product, self.window_days)
+
+    def window(self, days: int):
+        if days > self.window_days:
+            return get_daily_sales_window(self.product, days)
+        return self.sales_window[-days:] if days > 0 else []
+
+    def average_daily_usage(self, days: int = 30):
+        data = self.window(days)
+        if not data:
+            return 0
+        return sum(data) / len(data)
+
+    def maximum_daily_sales(self, days: int = 90):
+        data = self.window(days)
+        return max(data) if data else 0
+
+    def stddev_daily_sales(self, days: int = 90):
+        data = self.window(days)
+        return pstdev(data) if len(data) > 1 else 0
+
+    @cached_property
+    def lead_time_stats(self):
+        qs = SupplierProduct.objects.filter(product=self.product, lead_time_days__isnull=False)
+        times = list(qs.values_list('lead_time_days', flat=True))
+        if not times:
+            return (0, 0)
+        return (sum(times) / len(times), max(times))
+
+
+def demand_stats_for(product: Product):
+    """Return the memoized ProductDemandStats for this product instance, rebuilding it if stale."""
+    stats = product.__dict__.get('_demand_stats')
+    if stats is None or stats.is_stale:
+        stats = ProductDemandStats(product)
+        product.__dict__['_demand_stats'] = stats
+    return stats
+
+
 def average_daily_usage(product: Product, days: int = 30):
-    data = get_daily_sales_window(product, days)
-    if not data:
-        return 0
-    return sum(data) / len(data)
+    return demand_stats_for(product).average_daily_usage(days)
 
 
 def maximum_daily_sales(product: Product, days: int = 90):
-    data = get_daily_sales_window(product, days)
-    return max(data) if data else 0
+    return demand_stats_for(product).maximum_daily_sales(days)
 
 
 def lead_time_stats(product: Product):
     """Return (average_lead_time, maximum_lead_time) in days from SupplierProduct entries."""
-    qs = SupplierProduct.objects.filter(product=product, lead_time_days__isnull=False)
-    times = list(qs.values_list('lead_time_days', flat=True))
-    if not times:
-        return (0, 0)
-    avg = sum(times) / len(times)
-    return (avg, max(times))
+    return demand_stats_for(product).lead_time_stats
 
 
 def safety_stock_basic(product: Product):
     """Basic safety stock: use difference of variability; fallback simple rule."""
     # We'll approximate with (max daily - avg daily) * average lead time
-    avg_usage = average_daily_usage(product)
-    max_usage = maximum_daily_sales(product)
-    avg_lt, _ = lead_time_stats(product)
+    stats = demand_stats_for(product)
+    avg_usage = stats.average_daily_usage()
+    max_usage = stats.maximum_daily_sales()
+    avg_lt, _ = stats.lead_time_stats
     return max(0, (max_usage - avg_usage) * avg_lt)
 
 
@@ -91,34 +426,32 @@ def safety_stock_advanced(product: Product):
     """Advanced formula user provided:
     Safety Stock = (Maximum Daily Sales × Maximum Lead Time) - (Average Daily Sales × Average Lead Time)
     """
-    avg_usage = average_daily_usage(product)
-    max_usage = maximum_daily_sales(product)
-    avg_lt, max_lt = lead_time_stats(product)
+    stats = demand_stats_for(product)
+    avg_usage = stats.average_daily_usage()
+    max_usage = stats.maximum_daily_sales()
+    avg_lt, max_lt = stats.lead_time_stats
     return max(0, (max_usage * max_lt) - (avg_usage * avg_lt))
 
 
 def reorder_point(product: Product, use_advanced: bool = True):
-    avg_usage = average_daily_usage(product)
-    avg_lt, _ = lead_time_stats(product)
+    stats = demand_stats_for(product)
+    avg_usage = stats.average_daily_usage()
+    avg_lt, _ = stats.lead_time_stats
     safety = safety_stock_advanced(product) if use_advanced else safety_stock_basic(product)
     return int(round((avg_usage * avg_lt) + safety))
 
 
 def reorder_recommendation(product: Product):
+    stats = demand_stats_for(product)
     point = reorder_point(product)
     current = product.current_stock
     delta = point - current
     needs_reorder = delta > 0
-    preferred_supplier = SupplierProduct.objects.filter(product=product, is_preferred=True).order_by('cost_price').first()
-    supplier_info = None
-    if preferred_supplier:
-        supplier_info = {
-            'supplier_id': preferred_supplier.supplier_id,
-            'supplier_name': preferred_supplier.supplier.name,
-            'lead_time_days': preferred_supplier.lead_time_days,
-            'cost_price': float(preferred_supplier.cost_price) if preferred_supplier.cost_price is not None else None,
-            'min_order_quantity': preferred_supplier.min_order_quantity,
-        }
+    preferred_supplier = (
+        SupplierProduct.objects.select_related('supplier')
+        .filter(product=product, is_preferred=True).order_by('cost_price').first()
+    )
+    supplier_info = _preferred_supplier_info(preferred_supplier)
     return {
         'product_id': product.id,
         'product_name': product.name,
@@ -128,36 +461,386 @@ def reorder_recommendation(product: Product):
         'recommended_order_quantity': max(delta, 0),
         'safety_stock_basic': int(round(safety_stock_basic(product))),
         'safety_stock_advanced': int(round(safety_stock_advanced(product))),
-        'average_daily_usage': average_daily_usage(product),
-        'maximum_daily_sales': maximum_daily_sales(product),
+        'average_daily_usage': stats.average_daily_usage(),
+        'maximum_daily_sales': stats.maximum_daily_sales(),
         'needs_reorder': needs_reorder,
         'preferred_supplier': supplier_info,
     }
 
 
+def _preferred_supplier_info(preferred_supplier):
+    if not preferred_supplier:
+        return None
+    return {
+        'supplier_id': preferred_supplier.supplier_id,
+        'supplier_name': preferred_supplier.supplier.name,
+        'lead_time_days': preferred_supplier.lead_time_days,
+        'cost_price': float(preferred_supplier.cost_price) if preferred_supplier.cost_price is not None else None,
+        'min_order_quantity': preferred_supplier.min_order_quantity,
+    }
+
+
+def bulk_reorder_recommendations(products=None, use_advanced: bool = True):
+    """Reorder recommendations for many products from a handful of grouped queries.
+
+    Loads the 90-day ProductDailySales window, SupplierProduct lead times and preferred
+    suppliers once, then computes usage, safety stock and reorder point for all products
+    as NumPy arrays (one row per product). Returns the same dicts as reorder_recommendation,
+    in the order of ``products`` (defaults to all products by name).
+    """
+    filter_ids = products is not None
+    if products is None:
+        products = Product.objects.all().order_by('name')
+    products = list(products)
+    if not products:
+        return []
+    if np is None:
+        return [reorder_recommendation(p) for p in products]
+
+    index = {p.pk: i for i, p in enumerate(products)}
+    n = len(products)
+    usage_days, sales_days = 30, 90
+    end = date.today()
+    start = end - timedelta(days=sales_days - 1)
+
+    # Daily sales matrix: rows are products, columns are days from start to today
+    sales_qs = ProductDailySales.objects.filter(date__range=(start, end))
+    lead_qs = SupplierProduct.objects.filter(lead_time_days__isnull=False)
+    preferred_qs = SupplierProduct.objects.filter(is_preferred=True)
+    if filter_ids:
+        sales_qs = sales_qs.filter(product_id__in=index.keys())
+        lead_qs = lead_qs.filter(product_id__in=index.keys())
+        preferred_qs = preferred_qs.filter(product_id__in=index.keys())
+
+    sales = np.zeros((n, sales_days), dtype=np.int64)
+    for product_id, day, quantity in sales_qs.values_list('product_id', 'date', 'quantity').iterator():
+        row = index.get(product_id)
+        if row is not None:
+            sales[row, (day - start).days] = quantity
+
+    lead_sum = np.zeros(n)
+    lead_count = np.zeros(n)
+    lead_max = np.zeros(n)
+    for product_id, lead_time in lead_qs.values_list('product_id', 'lead_time_days'):
+        row = index.get(product_id)
+        if row is not None:
+            lead_sum[row] += lead_time
+            lead_count[row] += 1
+            lead_max[row] = max(lead_max[row], lead_time)
+
+    avg_usage = sales[:, -usage_days:].sum(axis=1) / usage_days
+    max_usage = sales.max(axis=1)
+    avg_lt = np.divide(lead_sum, lead_count, out=np.zeros(n), where=lead_count > 0)
+    safety_basic = np.maximum(0, (max_usage - avg_usage) * avg_lt)
+    safety_advanced = np.maximum(0, (max_usage * lead_max) - (avg_usage * avg_lt))
+    points = (avg_usage * avg_lt) + (safety_advanced if use_advanced else safety_basic)
+
+    preferred = {}
+    for sp in preferred_qs.select_related('supplier').order_by('cost_price', 'pk'):
+        preferred.setdefault(sp.product_id, sp)
+
+    results = []
+    for i, product in enumerate(products):
+        point = int(round(float(points[i])))
+        current = product.current_stock
+        delta = point - current
+        results.append({
+            'product_id': product.id,
+            'product_name': product.name,
+            'sku': product.sku,
+            'current_stock': current,
+            'reorder_point': point,
+            'recommended_order_quantity': max(delta, 0),
+            'safety_stock_basic': int(round(float(safety_basic[i]))),
+            'safety_stock_advanced': int(round(float(safety_advanced[i]))),
+            'average_daily_usage': float(avg_usage[i]),
+            'maximum_daily_sales': int(max_usage[i]),
+            'needs_reorder': delta > 0,
+            'preferred_supplier': _preferred_supplier_info(preferred.get(product.pk)),
+        })
+    return results
+
+
 def all_reorder_recommendations():
-    return [reorder_recommendation(p) for p in Product.objects.all().order_by('name')]
+    return bulk_reorder_recommendations()
+
+
+# --- Persisted reorder fields ---
+
+USAGE_WINDOW_DAYS = 30
+MAX_SALES_WINDOW_DAYS = 90
+REORDER_FIELDS = ['avg_daily_usage', 'max_daily_usage', 'safety_stock', 'reorder_point', 'updated_at']
+
+
+def demand_reorder_fields(avg_usage, max_usage, lead_times):
+    """Persisted Product figures from the 30-day average and 90-day maximum daily sales and the
+    (average, maximum) lead time; same formulas as reorder_point(use_advanced=True)."""
+    avg_lt, max_lt = lead_times
+    safety = max(0, (max_usage * max_lt) - (avg_usage * avg_lt))
+    return {
+        'avg_daily_usage': avg_usage,
+        'max_daily_usage': max_usage,
+        'safety_stock': int(round(safety)),
+        'reorder_point': int(round((avg_usage * avg_lt) + safety)),
+    }
+
+
+def forecast_reorder_points_enabled():
+    """True when INVENTORY_REORDER_POINT_METHOD is 'forecast' (see inventory.forecasting)."""
+    return getattr(settings, 'INVENTORY_REORDER_POINT_METHOD', 'max_lead_time') == 'forecast'
+
+
+def forecast_reorder_fields(product_ids):
+    """Persisted safety_stock / reorder_point from the σ-based forecast, aligned with ``product_ids``."""
+    from .forecasting import forecast_products
+    result = forecast_products(product_ids)
+    return [
+        {'safety_stock': ceil(safety), 'reorder_point': ceil(point)}
+        for safety, point in zip(result['safety_stock'].tolist(), result['reorder_point'].tolist())
+    ]
+
+
+def forget_product_caches(product_id):
+    """Drop every per-process cache entry held for a product id."""
+    invalidate_demand_stats(product_id)
+    sales_series.invalidate(product_id)
+    stock_series.invalidate(product_id)
+
+
+def _locked_demand_state(product_id):
+    """(avg_daily_usage, max_daily_usage) of the product, row-locked; None if it is gone."""
+    return Product.objects.select_for_update().filter(pk=product_id).values_list(
+        'avg_daily_usage', 'max_daily_usage',
+    ).first()
+
+
+def _max_daily_sales(product_id):
+    end = date.today()
+    return ProductDailySales.objects.filter(
+        product_id=product_id, date__range=(end - timedelta(days=MAX_SALES_WINDOW_DAYS - 1), end),
+    ).aggregate(peak=Max('quantity'))['peak'] or 0
+
+
+def refresh_reorder_fields(product_id):
+    """Recompute one product's safety stock and reorder point from its lead times.
+
+    Runs from the SupplierProduct write hooks. Usage comes from the persisted running figures
+    (see apply_daily_sales_change), so only the product's lead times are read. The product
+    row is locked first, so concurrent writers to one product take turns, and the update
+    rolls back with the write that caused it.
+    """
+    with transaction.atomic():
+        state = _locked_demand_state(product_id)
+        if state is None:
+            return
+        fields = demand_reorder_fields(*state, ProductDemandStats(Product(pk=product_id)).lead_time_stats)
+        if forecast_reorder_points_enabled():
+            fields.update(forecast_reorder_fields([product_id])[0])
+        Product.objects.filter(pk=product_id).update(**fields, updated_at=timezone.now())
+
+
+def apply_daily_sales_change(product_id, day, old_quantity, new_quantity):
+    """Fold one ProductDailySales change (``old_quantity`` -> ``new_quantity`` on ``day``) into
+    the product's persisted reorder fields.
+
+    avg_daily_usage is kept as a running 30-day sum / 30 and max_daily_usage as the running
+    90-day peak. A higher day raises the peak in place; only lowering the peak itself reads
+    the window again (one indexed MAX). A row write therefore costs a locked read, the
+    lead-time lookup and one UPDATE, whatever the history. Days outside the windows change
+    nothing. The windows are where the last refresh_reorder_points left them, and that job
+    moves them with the calendar. With INVENTORY_REORDER_POINT_METHOD = 'forecast' only
+    the usage figures are updated; safety stock and reorder point come from
+    refresh_reorder_points (upsert_daily_sales and the scheduled job) instead of a per-row
+    forecast.
+    """
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    age = (date.today() - day).days
+    if old_quantity == new_quantity or not 0 <= age < MAX_SALES_WINDOW_DAYS:
+        return
+    with transaction.atomic():
+        state = _locked_demand_state(product_id)
+        if state is None:
+            return
+        avg_usage, peak = state
+        if age < USAGE_WINDOW_DAYS:
+            avg_usage = (round(avg_usage * USAGE_WINDOW_DAYS) + new_quantity - old_quantity) / USAGE_WINDOW_DAYS
+        if new_quantity >= peak:
+            peak = new_quantity
+        elif old_quantity >= peak:
+            peak = _max_daily_sales(product_id)
+        if forecast_reorder_points_enabled():
+            fields = {'avg_daily_usage': avg_usage, 'max_daily_usage': peak}
+        else:
+            fields = demand_reorder_fields(avg_usage, peak, ProductDemandStats(Product(pk=product_id)).lead_time_stats)
+        Product.objects.filter(pk=product_id).update(**fields, updated_at=timezone.now())
+
+
+def refresh_reorder_points(product_ids=None, batch_size: int = 1000):
+    """Full recompute of the persisted reorder fields with the vectorized bulk path.
+
+    Used after bulk sales writes that bypass model hooks and as a daily job, since usage
+    windows move with the calendar even when no sales arrive. With
+    INVENTORY_REORDER_POINT_METHOD = 'forecast', safety stock and reorder point come from
+    the σ-based demand forecast instead of the maximum-sales formula.
+    """
+    products = Product.objects.order_by('pk').only('pk', 'name', 'sku', 'current_stock')
+    if product_ids is not None:
+        products = products.filter(pk__in=list(product_ids))
+    updated = 0
+    rows = products.iterator(chunk_size=batch_size)
+    now = timezone.now()
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        recommendations = bulk_reorder_recommendations(chunk)
+        if forecast_reorder_points_enabled():
+            for rec, forecast in zip(recommendations, forecast_reorder_fields([p.pk for p in chunk])):
+                rec['safety_stock_advanced'] = forecast['safety_stock']
+                rec['reorder_point'] = forecast['reorder_point']
+        for product, rec in zip(chunk, recommendations):
+            product.avg_daily_usage = rec['average_daily_usage']
+            product.max_daily_usage = rec['maximum_daily_sales']
+            product.safety_stock = rec['safety_stock_advanced']
+            product.reorder_point = rec['reorder_point']
+            product.updated_at = now
+        Product.objects.bulk_update(chunk, REORDER_FIELDS)
+        updated += len(chunk)
+    return {'updated': updated}
+
+
+# --- Daily sales ingestion ---
+
+SALES_BATCH_SIZE = 2000
+
+
+def _parse_sales_row(row):
+    """Return (sku, date, quantity) from a dict or 3-tuple row; raises ValueError."""
+    if isinstance(row, dict):
+        sku, day, quantity = row.get('sku'), row.get('date'), row.get('quantity', row.get('qty'))
+    else:
+        sku, day, quantity = row
+    sku = str(sku or '').strip()
+    if not sku:
+        raise ValueError('sku is required')
+    if isinstance(day, str):
+        day = date.fromisoformat(day.strip())
+    if not isinstance(day, date):
+        raise ValueError('date must be YYYY-MM-DD')
+    if isinstance(quantity, bool) or quantity is None:
+        raise ValueError('quantity is required')
+    quantity = int(quantity)
+    if quantity < 0:
+        raise ValueError('quantity must be >= 0')
+    return sku, day, quantity
+
+
+def upsert_daily_sales(rows, overwrite: bool = True, batch_size: int = SALES_BATCH_SIZE):
+    """Write many (sku, date, quantity) rows to ProductDailySales in one transaction.
+
+    SKUs are resolved with a single query and rows are upserted against the (product, date)
+    unique constraint via bulk_create(update_conflicts=True); with ``overwrite=False`` existing
+    rows are kept instead. Later duplicates of the same (sku, date) win. Nothing is written if
+    any row is invalid or names an unknown SKU; the problems are returned in ``errors``.
+    """
+    parsed = {}
+    errors = []
+    received = 0
+    for index, row in enumerate(rows):
+        received += 1
+        try:
+            sku, day, quantity = _parse_sales_row(row)
+        except (TypeError, ValueError) as exc:
+            errors.append({'row': index, 'error': str(exc)})
+            continue
+        parsed[(sku, day)] = quantity
+
+    skus = {sku for sku, _ in parsed}
+    product_ids = dict(Product.objects.filter(sku__in=skus).values_list('sku', 'pk')) if skus else {}
+    unknown = sorted(skus - product_ids.keys())
+    if unknown:
+        errors.append({'error': 'unknown sku', 'skus': unknown})
+    if errors:
+        return {'received': received, 'written': 0, 'errors': errors}
+
+    objs = [
+        ProductDailySales(product_id=product_ids[sku], date=day, quantity=quantity)
+        for (sku, day), quantity in parsed.items()
+    ]
+    conflict_options = (
+        {'update_conflicts': True, 'unique_fields': ['product', 'date'], 'update_fields': ['quantity', 'updated_at']}
+        if overwrite else {'ignore_conflicts': True}
+    )
+    with transaction.atomic():
+        ProductDailySales.objects.bulk_create(objs, batch_size=batch_size, **conflict_options)
+
+    touched = set(product_ids.values())
+    for product_id in touched:
+        invalidate_demand_stats(product_id)
+        sales_series.invalidate(product_id)
+    if touched:
+        refresh_reorder_points(touched)
+    return {'received': received, 'written': len(objs), 'products': len(touched), 'errors': []}
 
 
 # --- Simple Alert Evaluation (minimum stock + buffer) ---
 
+def _alert_message(status, current, minimum, buffer_pct, reorder_point=0):
+    if reorder_point > minimum:
+        return (
+            f"Stock {'below' if status == Product.STATUS_LOW else 'approaching'} reorder point. "
+            f"Current={current}, Reorder point={reorder_point}, Minimum={minimum} (Buffer {buffer_pct}%)."
+        )
+    return (
+        f"Stock {'below' if status == Product.STATUS_LOW else 'approaching'} minimum. "
+        f"Current={current}, Minimum={minimum} (Buffer {buffer_pct}%)."
+    )
+
+
+def reorder_threshold(product: Product):
+    """Stock level at or below which a product is LOW: its minimum or its reorder point, whichever is higher."""
+    return max(product.minimum_stock_level, product.reorder_point, 0)
+
+
+def alert_status_expression():
+    """SQL CASE computing the same status as evaluate_product_alert for each product row.
+
+    The threshold is Greatest(minimum_stock_level, reorder_point), as in reorder_threshold().
+    APPROACHING compares current_stock * 100 <= threshold * (100 + buffer_pct), which is the
+    integer form of current_stock <= threshold * (1 + buffer_pct / 100).
+    """
+    threshold = Greatest(F('minimum_stock_level'), F('reorder_point'))
+    return Case(
+        When(LessThanOrEqual(F('current_stock'), threshold), then=Value(Product.STATUS_LOW)),
+        When(
+            LessThanOrEqual(F('current_stock') * 100, threshold * (100 + F('reorder_warning_buffer_pct')))
+            & GreaterThan(threshold, 0),
+            then=Value(Product.STATUS_APPROACHING),
+        ),
+        default=Value(Product.STATUS_OK),
+        output_field=CharField(),
+    )
+
+
 def evaluate_product_alert(product: Product, save: bool = True):
     """Evaluate product's reorder_status & manage StockAlert records.
 
-    Status logic:
-        LOW: current_stock <= minimum_stock_level
-        APPROACHING: current_stock <= minimum_stock_level * (1 + buffer_pct/100) but > minimum
+    Status logic, with threshold = max(minimum_stock_level, reorder_point):
+        LOW: current_stock <= threshold
+        APPROACHING: current_stock <= threshold * (1 + buffer_pct/100) but > threshold
         OK: else
     Creates a StockAlert when entering APPROACHING or LOW, resolves active alerts when status returns to OK.
     """
     minimum = max(product.minimum_stock_level, 0)
-    buffer_multiplier = 1 + (product.reorder_warning_buffer_pct / 100.0)
-    approaching_threshold = int(minimum * buffer_multiplier)
+    threshold = reorder_threshold(product)
+    # Integer arithmetic so this agrees exactly with the SQL used by evaluate_alerts_bulk
+    approaching_threshold = threshold * (100 + product.reorder_warning_buffer_pct) // 100
 
     current = product.current_stock
-    if current <= minimum:
+    if current <= threshold:
         new_status = Product.STATUS_LOW
-    elif current <= approaching_threshold and minimum > 0:
+    elif current <= approaching_threshold and threshold > 0:
         new_status = Product.STATUS_APPROACHING
     else:
         new_status = Product.STATUS_OK
@@ -167,7 +850,7 @@ def evaluate_product_alert(product: Product, save: bool = True):
         product.reorder_status = new_status
         product.reorder_status_changed_at = timezone.now()
         if save:
-            product.save(update_fields=['reorder_status', 'reorder_status_changed_at'])
+            product.save(update_fields=['reorder_status', 'reorder_status_changed_at', 'updated_at'])
 
     # Resolve active alerts if OK
     if new_status == Product.STATUS_OK:
@@ -177,87 +860,396 @@ def evaluate_product_alert(product: Product, save: bool = True):
     # If APPROACHING or LOW ensure an active alert exists (one per status at a time)
     existing = StockAlert.objects.filter(product=product, status=new_status, active=True).first()
     if not existing:
-        message = (
-            f"Stock {'below' if new_status == Product.STATUS_LOW else 'approaching'} minimum. "
-            f"Current={current}, Minimum={minimum} (Buffer {product.reorder_warning_buffer_pct}%)."
-        )
         StockAlert.objects.create(
             product=product,
             status=new_status,
             current_stock_at_trigger=current,
             minimum_stock_level=minimum,
-            message=message,
+            threshold_at_trigger=threshold,
+            message=_alert_message(new_status, current, minimum, product.reorder_warning_buffer_pct, product.reorder_point),
         )
     return new_status
 
 
+STATUS_FIELDS = ['reorder_status', 'reorder_status_changed_at', 'updated_at']
+
+
+def _classified_products(qs):
+    """``qs`` annotated with ``computed_status``, loading only what classification and alerts need."""
+    return (
+        qs.annotate(computed_status=alert_status_expression())
+        .only('id', 'sku', 'current_stock', 'minimum_stock_level', 'reorder_point', 'reorder_warning_buffer_pct',
+              'reorder_status', 'reorder_status_changed_at', 'updated_at')
+        .order_by()
+    )
+
+
+def _apply_computed_statuses(rows, now):
+    """Copy computed_status onto each row; return the rows whose status changed."""
+    changed = []
+    for p in rows:
+        if p.computed_status != p.reorder_status:
+            p.reorder_status = p.computed_status
+            p.reorder_status_changed_at = now
+            p.updated_at = now
+            changed.append(p)
+    return changed
+
+
+def evaluate_reorder_statuses(products=None, batch_size: int = 1000):
+    """Reclassify reorder_status for many products in one pass, without touching alerts.
+
+    Statuses are computed in SQL by alert_status_expression() (against the higher of the
+    minimum and the persisted reorder point), streamed in chunks of ``batch_size`` and only
+    changed rows are written back with bulk_update.
+
+    Returns: {'evaluated', 'changed', 'statuses': {status: count}, 'seconds'}
+    """
+    started = time.monotonic()
+    qs = products if products is not None else Product.objects.all()
+    now = timezone.now()
+    evaluated = 0
+    changed = 0
+    statuses = {status: 0 for status, _ in Product.REORDER_STATUS_CHOICES}
+    rows = _classified_products(qs).iterator(chunk_size=batch_size)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        evaluated += len(chunk)
+        for p in chunk:
+            statuses[p.computed_status] += 1
+        updates = _apply_computed_statuses(chunk, now)
+        Product.objects.bulk_update(updates, STATUS_FIELDS, batch_size=batch_size)
+        changed += len(updates)
+    return {
+        'evaluated': evaluated,
+        'changed': changed,
+        'statuses': statuses,
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+
+def evaluate_alerts_bulk(products=None):
+    """Set-based version of evaluate_product_alert for many products at once.
+
+    Statuses are classified in the database with alert_status_expression() in one query.
+    Changed statuses are written with bulk_update, alerts of products back to OK are
+    resolved with one UPDATE, and missing active alerts are added with bulk_create.
+
+    Returns a list of {'product_id', 'sku', 'status', 'current_stock'} dicts.
+    """
+    qs = products if products is not None else Product.objects.all()
+    rows = list(_classified_products(qs))
+    now = timezone.now()
+    changed = _apply_computed_statuses(rows, now)
+    with transaction.atomic():
+        Product.objects.bulk_update(changed, STATUS_FIELDS, batch_size=1000)
+
+        product_ids = qs.values('pk')
+        StockAlert.objects.filter(
+            active=True, product__in=product_ids, product__reorder_status=Product.STATUS_OK,
+        ).update(active=False, resolved_at=now)
+
+        existing = set(
+            StockAlert.objects.filter(active=True, product__in=product_ids)
+            .order_by().values_list('product_id', 'status')
+        )
+        StockAlert.objects.bulk_create([
+            StockAlert(
+                product_id=p.pk,
+                status=p.reorder_status,
+                current_stock_at_trigger=p.current_stock,
+                minimum_stock_level=max(p.minimum_stock_level, 0),
+                threshold_at_trigger=reorder_threshold(p),
+                message=_alert_message(p.reorder_status, p.current_stock, max(p.minimum_stock_level, 0),
+                                       p.reorder_warning_buffer_pct, p.reorder_point),
+            )
+            for p in rows
+            if p.reorder_status != Product.STATUS_OK and (p.pk, p.reorder_status) not in existing
+        ], batch_size=1000)
+
+    return [
+        {'product_id': p.id, 'sku': p.sku, 'status': p.reorder_status, 'current_stock': p.current_stock}
+        for p in rows
+    ]
+
+
 def evaluate_all_alerts():
-    results = []
-    for p in Product.objects.all():
-        status = evaluate_product_alert(p, save=True)
-        results.append({'product_id': p.id, 'sku': p.sku, 'status': status, 'current_stock': p.current_stock})
-    return results
+    return evaluate_alerts_bulk()
+
+
+def evaluate_alerts_for_products(product_ids, chunk_size: int = 1000):
+    """Evaluate alerts for the given product ids in set-based chunks."""
+    product_ids = list(product_ids)
+    for i in range(0, len(product_ids), chunk_size):
+        evaluate_alerts_bulk(Product.objects.filter(pk__in=product_ids[i:i + chunk_size]))
+
+
+SNAPSHOT_BATCH_SIZE = 5000
+
 
+def create_daily_stock_snapshots(date=None, batch_size: int = SNAPSHOT_BATCH_SIZE):
+    """Create (or skip existing) stock snapshots for all products for a given date.
 
-def create_daily_stock_snapshots(date=None):
-    """Create (or skip existing) stock snapshots for all products for a given date."""
+    Rows are written with bulk_create(ignore_conflicts=True) against the (product, date)
+    unique constraint, streaming products in batches; re-running for a date is a no-op.
+    """
     from datetime import date as date_cls
     if date is None:
         date = date_cls.today()
+    rows = Product.objects.order_by().values_list('pk', 'current_stock').iterator(chunk_size=batch_size)
+    created = _insert_snapshots(((pk, date, stock) for pk, stock in rows), date, date, batch_size)
+    if created:
+        stock_series.invalidate()
+    return {'date': str(date), 'created': created}
+
+
+def backfill_stock_snapshots(start, end=None, batch_size: int = SNAPSHOT_BATCH_SIZE, reconstruct: bool = False):
+    """Fill missing snapshots for every product and day in [start, end] in one pass.
+
+    End-of-day levels come from the StockMovement ledger (checkpoint lookup plus one grouped
+    scan of the movements in range), which must reach back to ``start``; otherwise a
+    ValueError is raised. With ``reconstruct=True`` older ranges are instead rebuilt
+    backwards from current_stock: each later day adds back that day's ProductDailySales and
+    subtracts InventoryBatch quantities received that day. Batches don't keep their received
+    quantity, so a partly or fully consumed batch counts only what is left of it and the
+    reconstructed levels are estimates. Existing snapshots are left untouched.
+    """
+    today = date.today()
+    end = min(end or today, today)
+    if start > end:
+        return {'start': str(start), 'end': str(end), 'created': 0}
+
+    first_movement = StockMovement.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    if first_movement is not None and timezone.localtime(first_movement).date() < start:
+        levels = _ledger_daily_levels(start, end, batch_size)
+    elif reconstruct:
+        levels = _reconstructed_daily_levels(start, end, batch_size)
+    else:
+        raise ValueError(
+            f'The stock movement ledger does not reach back to {start}; '
+            'reconstructing older levels from current stock is approximate and must be requested explicitly'
+        )
+
+    created = _insert_snapshots(levels, start, end, batch_size)
+    if created:
+        stock_series.invalidate()
+    return {'start': str(start), 'end': str(end), 'created': created}
+
+
+def _insert_snapshots(rows, start, end, batch_size):
+    """Create snapshots from (product_id, day, level) rows dated within [start, end], skipping
+    any that already exist, and fold the new ones into their rollups. Returns how many were created."""
     created = 0
-    for p in Product.objects.all():
-        obj, was_created = ProductStockSnapshot.objects.get_or_create(
-            product=p,
-            date=date,
-            defaults={'stock_level': p.current_stock}
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return created
+        with transaction.atomic():
+            existing = set(
+                ProductStockSnapshot.objects.filter(
+                    product_id__in={product_id for product_id, _, _ in chunk}, date__range=(start, end),
+                ).values_list('product_id', 'date')
+            )
+            new = [(product_id, day, max(level, 0)) for product_id, day, level in chunk if (product_id, day) not in existing]
+            ProductStockSnapshot.objects.bulk_create(
+                [ProductStockSnapshot(product_id=product_id, date=day, stock_level=level) for product_id, day, level in new],
+                ignore_conflicts=True,
+            )
+            fold_into_stock_rollups(new)
+        created += len(new)
+
+
+def _ledger_daily_levels(start, end, batch_size):
+    """Yield (product_id, day, end-of-day level) for [start, end] from the movement ledger."""
+    opening = stock_levels_as_of(start - timedelta(days=1))
+    net = {}
+    movements = (
+        StockMovement.objects.filter(created_at__gt=_end_of_day(start - timedelta(days=1)), created_at__lte=_end_of_day(end))
+        .annotate(day=TruncDate('created_at'))
+        .order_by().values('product_id', 'day').annotate(change=Sum('quantity'))
+        .values_list('product_id', 'day', 'change')
+    )
+    for product_id, day, change in movements.iterator(chunk_size=batch_size):
+        net.setdefault(product_id, {})[day] = change
+    for product_id in Product.objects.order_by().values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        level = opening.get(product_id, 0)
+        deltas = net.get(product_id, {})
+        day = start
+        while day <= end:
+            level += deltas.get(day, 0)
+            yield product_id, day, level
+            day += timedelta(days=1)
+
+
+def _reconstructed_daily_levels(start, end, batch_size):
+    """Yield (product_id, day, level) rebuilt backwards from current_stock (pre-ledger history).
+
+    Receipts are counted at each batch's current quantity, so history before a consumed
+    batch arrived is understated by what has since been drawn from it.
+    """
+    today = date.today()
+    # Net stock change per product per day after `start` (receipts minus sales)
+    net = {}
+    sales = (
+        ProductDailySales.objects.filter(date__gt=start, date__lte=today)
+        .order_by().values_list('product_id', 'date', 'quantity')
+    )
+    for product_id, day, quantity in sales.iterator(chunk_size=batch_size):
+        deltas = net.setdefault(product_id, {})
+        deltas[day] = deltas.get(day, 0) - quantity
+    receipts = (
+        InventoryBatch.objects.filter(received_at__date__gt=start)
+        .annotate(day=TruncDate('received_at'))
+        .order_by().values('product_id', 'day').annotate(received=Sum('quantity'))
+        .values_list('product_id', 'day', 'received')
+    )
+    for product_id, day, quantity in receipts:
+        deltas = net.setdefault(product_id, {})
+        deltas[day] = deltas.get(day, 0) + quantity
+
+    for product_id, level in Product.objects.order_by().values_list('pk', 'current_stock').iterator(chunk_size=batch_size):
+        deltas = net.get(product_id, {})
+        day = today
+        while day >= start:
+            if day <= end:
+                yield product_id, day, level
+            level -= deltas.get(day, 0)
+            day -= timedelta(days=1)
+
+
+# --- Snapshot rollups (monthly / yearly) ---
+
+ROLLUP_FIELDS = ['total_stock', 'snapshot_count', 'min_stock', 'max_stock', 'updated_at']
+
+
+def _upsert_rollups(model, rows, batch_size: int = SNAPSHOT_BATCH_SIZE):
+    """Insert or overwrite rollup rows given as (product_id, period_start, total, count, min, max)."""
+    created = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return created
+        model.objects.bulk_create(
+            [
+                model(product_id=product_id, period_start=period_start, total_stock=total,
+                      snapshot_count=count, min_stock=low, max_stock=high)
+                for product_id, period_start, total, count, low, high in chunk
+            ],
+            update_conflicts=True,
+            unique_fields=['product', 'period_start'],
+            update_fields=ROLLUP_FIELDS,
         )
-        if was_created:
-            created += 1
-    return {'date': str(date), 'created': created}
+        created += len(chunk)
 
 
-# --- Importers: Excel -> CSV -> DB ---
+def fold_into_stock_rollups(snapshots):
+    """Add newly created snapshots, given as (product_id, day, level), to their monthly and yearly rollups.
 
-REQUIRED_HEADERS = [
-    'SR NO.', 'PRODUCT NAME', 'PRODUCT ID', 'PRODUCTS ORDERED',
-    'PRODUCTS USED', 'PRODUCTS IN STOCK', 'RESTOCK'
-]
+    Only the (product, period) rollups they fall in are read and rewritten, so a nightly snapshot
+    costs one read and one upsert per product rather than a re-aggregation of its month and year.
+    Changed or deleted snapshots go through refresh_stock_rollups instead.
+    """
+    for model, period_of in (
+        (ProductStockMonthlyRollup, lambda day: day.replace(day=1)),
+        (ProductStockYearlyRollup, lambda day: day.replace(month=1, day=1)),
+    ):
+        added = {}
+        for product_id, day, level in snapshots:
+            key = (product_id, period_of(day))
+            total, count, low, high = added.get(key, (0, 0, level, level))
+            added[key] = (total + level, count + 1, min(low, level), max(high, level))
+        if not added:
+            return
+        current = {
+            (product_id, period): rest
+            for product_id, period, *rest in model.objects.filter(
+                product_id__in={product_id for product_id, _ in added}, period_start__in={period for _, period in added},
+            ).values_list('product_id', 'period_start', 'total_stock', 'snapshot_count', 'min_stock', 'max_stock')
+        }
+        rows = []
+        for key, (total, count, low, high) in added.items():
+            if key in current:
+                old_total, old_count, old_low, old_high = current[key]
+                total, count, low, high = total + old_total, count + old_count, min(low, old_low), max(high, old_high)
+            rows.append((*key, total, count, low, high))
+        _upsert_rollups(model, rows)
 
 
-def convert_excel_to_csv(input_path, output_csv_path=None):
-    """Convert first worksheet of an Excel file to CSV matching REQUIRED_HEADERS.
+def refresh_stock_rollups(days, product_ids=None):
+    """Recompute the monthly rollups for the months containing ``days``, then their years.
 
-    Returns path to generated CSV. Raises ValueError if headers missing.
+    Each month is one GROUP BY over that month's snapshots; years are re-derived from their
+    (at most twelve) monthly rows per product, so the cost never depends on history length.
     """
-    if openpyxl is None:
-        raise RuntimeError("openpyxl not installed. Please install openpyxl.")
+    months = sorted({d.replace(day=1) for d in days})
+    for month in months:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        snapshots = ProductStockSnapshot.objects.filter(date__gte=month, date__lt=next_month)
+        if product_ids is not None:
+            snapshots = snapshots.filter(product_id__in=product_ids)
+        rows = (
+            snapshots.order_by().values('product_id')
+            .annotate(total=Sum('stock_level'), count=Count('pk'), low=Min('stock_level'), high=Max('stock_level'))
+            .values_list('product_id', 'total', 'count', 'low', 'high')
+        )
+        _upsert_rollups(ProductStockMonthlyRollup, (
+            (product_id, month, total, count, low, high) for product_id, total, count, low, high in rows.iterator()
+        ))
+        stale = ProductStockMonthlyRollup.objects.filter(period_start=month)
+        if product_ids is not None:
+            stale = stale.filter(product_id__in=product_ids)
+        stale.exclude(product_id__in=snapshots.values('product_id')).delete()
 
-    input_path = Path(input_path)
-    wb = openpyxl.load_workbook(filename=str(input_path), data_only=True)
-    ws = wb.active
+    for year in sorted({m.replace(month=1) for m in months}):
+        monthly = ProductStockMonthlyRollup.objects.filter(period_start__year=year.year)
+        if product_ids is not None:
+            monthly = monthly.filter(product_id__in=product_ids)
+        rows = (
+            monthly.order_by().values('product_id')
+            .annotate(total=Sum('total_stock'), count=Sum('snapshot_count'), low=Min('min_stock'), high=Max('max_stock'))
+            .values_list('product_id', 'total', 'count', 'low', 'high')
+        )
+        _upsert_rollups(ProductStockYearlyRollup, (
+            (product_id, year, total, count, low, high) for product_id, total, count, low, high in rows.iterator()
+        ))
+        stale = ProductStockYearlyRollup.objects.filter(period_start=year)
+        if product_ids is not None:
+            stale = stale.filter(product_id__in=product_ids)
+        stale.exclude(product_id__in=monthly.values('product_id')).delete()
 
-    # Read header row
-    headers = [str(c.value).strip() if c.value is not None else '' for c in next(ws.iter_rows(min_row=1, max_row=1))]
-    # Basic normalization: upper-case compare
-    normalized = [h.upper() for h in headers]
-    required_upper = [h.upper() for h in REQUIRED_HEADERS]
-    if normalized[:len(required_upper)] != required_upper:
-        raise ValueError(f"Excel headers do not match required format. Found: {headers}")
 
-    # Prepare CSV path
-    if output_csv_path is None:
-        output_csv_path = input_path.with_suffix('.csv')
-    output_csv_path = Path(output_csv_path)
+def rebuild_stock_rollups(batch_size: int = SNAPSHOT_BATCH_SIZE):
+    """Drop and rebuild every monthly and yearly rollup from ProductStockSnapshot."""
+    with transaction.atomic():
+        ProductStockMonthlyRollup.objects.all().delete()
+        ProductStockYearlyRollup.objects.all().delete()
+        monthly = (
+            ProductStockSnapshot.objects.annotate(month=TruncMonth('date'))
+            .order_by().values('product_id', 'month')
+            .annotate(total=Sum('stock_level'), count=Count('pk'), low=Min('stock_level'), high=Max('stock_level'))
+            .values_list('product_id', 'month', 'total', 'count', 'low', 'high')
+        )
+        months = _upsert_rollups(ProductStockMonthlyRollup, monthly.iterator(chunk_size=batch_size), batch_size)
+        yearly = (
+            ProductStockMonthlyRollup.objects.annotate(year=TruncYear('period_start'))
+            .order_by().values('product_id', 'year')
+            .annotate(total=Sum('total_stock'), count=Sum('snapshot_count'), low=Min('min_stock'), high=Max('max_stock'))
+            .values_list('product_id', 'year', 'total', 'count', 'low', 'high')
+        )
+        years = _upsert_rollups(ProductStockYearlyRollup, yearly.iterator(chunk_size=batch_size), batch_size)
+    return {'monthly': months, 'yearly': years}
+
 
-    with output_csv_path.open('w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(REQUIRED_HEADERS)
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if all(cell is None for cell in row):
-                continue
-            writer.writerow(list(row[:len(REQUIRED_HEADERS)]))
+# --- Importers: CSV / Excel rows -> DB ---
 
-    return str(output_csv_path)
+REQUIRED_HEADERS = [
+    'SR NO.', 'PRODUCT NAME', 'PRODUCT ID', 'PRODUCTS ORDERED',
+    'PRODUCTS USED', 'PRODUCTS IN STOCK', 'RESTOCK'
+]
 
 
 def purge_all_inventory_data():
@@ -269,78 +1261,367 @@ def purge_all_inventory_data():
     ProductDailySales.objects.all().delete()
     StockAlert.objects.all().delete()
     ProductStockSnapshot.objects.all().delete()
+    ProductStockMonthlyRollup.objects.all().delete()
+    ProductStockYearlyRollup.objects.all().delete()
+    StockCheckpoint.objects.all().delete()
+    StockMovement.objects.all().delete()
+    sales_series.invalidate()
+    stock_series.invalidate()
     InventoryBatch.objects.all().delete()
     # Finally delete products (cascades to SupplierProduct via FK)
     Product.objects.all().delete()
 
 
-def import_inventory_csv(csv_path, mode: str = 'append'):
-    """Import inventory from a CSV file.
+IMPORT_CHUNK_SIZE = 1000
 
-    mode:
-      - 'append' (default): upsert products and create batches; keeps existing data.
-      - 'replace_all': Purge all products/history, then import fresh.
 
-    Returns: {'created': int, 'updated': int, 'mode': str}
+def _parse_inventory_row(row):
+    """Return (sku, name, current_stock, minimum_stock_level) for one import row."""
+    sku = str(row['PRODUCT ID']).strip()
+    name = str(row['PRODUCT NAME']).strip()
+    try:
+        current_stock = int(float(row['PRODUCTS IN STOCK']))
+    except Exception:
+        current_stock = 0
+    restock_text = str(row.get('RESTOCK', '')).upper()
+    min_stock = 15 if 'NEEDS' in restock_text else 5
+    return sku, name, max(current_stock, 0), max(min_stock, 0)
+
+
+def _import_inventory_chunk(rows):
+    """Upsert products and create batches for one chunk of rows inside a single transaction.
+
+    A SKU counts as created the first time it is seen and as updated afterwards. Products
+    created by earlier chunks are already committed and found by the lookup, so the counts
+    only depend on the rows, not on in-memory state; a resumed import counts the same way.
+    Returns (created, updated, product_ids).
+    """
+    parsed = {}
+    batch_rows = []
+    for row in rows:
+        sku, name, current_stock, min_stock = _parse_inventory_row(row)
+        parsed[sku] = (name, min_stock, current_stock)
+        if current_stock > 0:
+            batch_rows.append((sku, current_stock))
+
+    created = updated = 0
+    now = timezone.now()
+    # import_inventory_rows already holds a transaction per chunk; don't add a savepoint to it
+    with transaction.atomic(savepoint=False):
+        products = Product.objects.select_for_update().in_bulk(list(parsed), field_name='sku')
+        previous_stock = {sku: p.current_stock for sku, p in products.items()}
+        seen_skus = set(products)
+        for row in rows:
+            sku = str(row['PRODUCT ID']).strip()
+            if sku in seen_skus:
+                updated += 1
+            else:
+                created += 1
+                seen_skus.add(sku)
+
+        to_create = []
+        to_update = []
+        for sku, (name, min_stock, current_stock) in parsed.items():
+            product = products.get(sku)
+            if product is None:
+                to_create.append(Product(
+                    sku=sku,
+                    name=name,
+                    minimum_stock_level=min_stock,
+                    current_stock=current_stock,
+                    reorder_status_changed_at=now,
+                ))
+            else:
+                product.name = name
+                product.minimum_stock_level = min_stock
+                product.current_stock = current_stock
+                product.updated_at = now
+                to_update.append(product)
+        Product.objects.bulk_update(to_update, ['name', 'minimum_stock_level', 'current_stock', 'updated_at'])
+        Product.objects.bulk_create(to_create)
+        if any(p.pk is None for p in to_create):
+            # Backends that don't return ids from bulk_create need a re-read
+            products.update(Product.objects.in_bulk([p.sku for p in to_create], field_name='sku'))
+        else:
+            products.update({p.sku: p for p in to_create})
+
+        InventoryBatch.objects.bulk_create([
+            InventoryBatch(product=products[sku], quantity=quantity, received_at=now)
+            for sku, quantity in batch_rows
+        ])
+        StockMovement.objects.bulk_create([
+            StockMovement(product=products[sku], kind=StockMovement.KIND_IMPORT, quantity=delta, created_at=now)
+            for sku, delta in (
+                (sku, current_stock - previous_stock.get(sku, 0))
+                for sku, (_, _, current_stock) in parsed.items()
+            )
+            if delta
+        ])
+    return created, updated, [p.pk for p in products.values()]
+
+
+def _row_dict(values):
+    values = list(values[:len(REQUIRED_HEADERS)])
+    values += [None] * (len(REQUIRED_HEADERS) - len(values))
+    return dict(zip(REQUIRED_HEADERS, values))
+
+
+def _check_csv_headers(values):
+    found_headers = [h.strip() for h in values]
+    if found_headers != REQUIRED_HEADERS:
+        raise ValueError(f"CSV headers do not match required format. Found: {found_headers}, Expected: {REQUIRED_HEADERS}")
+
+
+def _check_excel_headers(values):
+    headers = [str(v).strip() if v is not None else '' for v in values]
+    # Basic normalization: upper-case compare
+    normalized = [h.upper() for h in headers]
+    required_upper = [h.upper() for h in REQUIRED_HEADERS]
+    if normalized[:len(required_upper)] != required_upper:
+        raise ValueError(f"Excel headers do not match required format. Found: {headers}")
+
+
+def iter_csv_rows(csv_path):
+    """Validate a CSV's header and return an iterator of row dicts keyed by REQUIRED_HEADERS.
+
+    The header is checked eagerly so a bad file fails before any data is touched;
+    the rows themselves are read lazily.
     """
     csv_path = Path(csv_path)
     if not csv_path.exists():
         raise FileNotFoundError(csv_path)
+    f = csv_path.open('r', newline='', encoding='utf-8')
+    reader = csv.reader(f)
+    try:
+        _check_csv_headers(next(reader, []))
+    except ValueError:
+        f.close()
+        raise
+
+    def rows():
+        with f:
+            for values in reader:
+                yield _row_dict(values)
+    return rows()
+
+
+def iter_excel_rows(input_path):
+    """Validate the first worksheet's header and return an iterator of row dicts.
+
+    The workbook is opened in openpyxl read-only mode, so rows stream from the file
+    and memory use does not grow with workbook size. Empty rows are skipped and empty
+    cells become ''.
+    """
+    if openpyxl is None:
+        raise RuntimeError("openpyxl not installed. Please install openpyxl.")
+
+    wb = openpyxl.load_workbook(filename=str(input_path), read_only=True, data_only=True)
+    ws = wb.active
+    row_iter = ws.iter_rows(values_only=True)
+    try:
+        _check_excel_headers(next(row_iter, ()))
+    except ValueError:
+        wb.close()
+        raise
+
+    def rows():
+        try:
+            for values in row_iter:
+                if all(cell is None for cell in values):
+                    continue
+                yield _row_dict(['' if cell is None else cell for cell in values])
+        finally:
+            wb.close()
+    return rows()
+
+
+def _is_excel_path(path):
+    return str(path).lower().endswith(('.xlsx', '.xlsm'))
+
+
+def iter_inventory_rows(path):
+    """Row iterator for a CSV or Excel (.xlsx) file, chosen by extension."""
+    if _is_excel_path(path):
+        return iter_excel_rows(path)
+    return iter_csv_rows(path)
+
+
+def check_inventory_headers(path):
+    """Raise ValueError unless a CSV or Excel file has the REQUIRED_HEADERS; reads only the header row."""
+    if _is_excel_path(path):
+        if openpyxl is None:
+            raise RuntimeError("openpyxl not installed. Please install openpyxl.")
+        wb = openpyxl.load_workbook(filename=str(path), read_only=True, data_only=True)
+        try:
+            _check_excel_headers(next(wb.active.iter_rows(max_row=1, values_only=True), ()))
+        finally:
+            wb.close()
+        return
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        _check_csv_headers(next(csv.reader(f), []))
+
 
+def import_inventory_rows(rows, mode: str = 'append', chunk_size: int = IMPORT_CHUNK_SIZE, start_row: int = 0, progress=None):
+    """Import inventory from an iterable of row dicts keyed by REQUIRED_HEADERS.
+
+    mode:
+      - 'append' (default): upsert products and create batches; keeps existing data.
+      - 'replace_all': Purge all products/history, then import fresh.
+
+    Rows are consumed in chunks of ``chunk_size``; each chunk looks up existing products
+    by SKU in one query and is written with bulk_create/bulk_update in its own transaction.
+    Alerts are evaluated once for all touched products after the last chunk.
+
+    ``start_row`` skips rows already imported by an earlier, interrupted run (no purge is
+    done when resuming). ``progress(rows_done, created, updated)`` is called inside each
+    chunk's transaction, so recorded progress always matches committed data.
+
+    Returns: {'created': int, 'updated': int, 'mode': str, 'rows': int, 'seconds': float, 'rows_per_sec': float}
+    """
+    started = time.monotonic()
     created = 0
     updated = 0
-    if mode == 'replace_all':
+    count = 0
+    touched = set()
+    if mode == 'replace_all' and not start_row:
         purge_all_inventory_data()
-    with csv_path.open('r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        # Header check
-        found_headers = [h.strip() for h in reader.fieldnames]
-        print(f"DEBUG: Found headers: {found_headers}")
-        print(f"DEBUG: Required headers: {REQUIRED_HEADERS}")
-        
-        if found_headers != REQUIRED_HEADERS:
-            raise ValueError(f"CSV headers do not match required format. Found: {found_headers}, Expected: {REQUIRED_HEADERS}")
-
-        for row in reader:
-            sku = str(row['PRODUCT ID']).strip()
-            name = str(row['PRODUCT NAME']).strip()
-            print(f"DEBUG: Processing SKU: {sku}, Name: {name}")
-            try:
-                current_stock = int(float(row['PRODUCTS IN STOCK']))
-            except Exception:
-                current_stock = 0
-            restock_text = str(row.get('RESTOCK', '')).upper()
-            min_stock = 15 if 'NEEDS' in restock_text else 5
-
-            product, was_created = Product.objects.update_or_create(
-                sku=sku,
-                defaults={
-                    'name': name,
-                    'minimum_stock_level': max(min_stock, 0),
-                    'current_stock': max(current_stock, 0),
-                }
-            )
-            print(f"DEBUG: Product {sku} - Created: {was_created}")
 
-            print(f"DEBUG: Product {sku} - Created: {was_created}")
+    rows = iter(rows)
+    if start_row:
+        next(islice(rows, start_row, start_row), None)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        with transaction.atomic():
+            c, u, product_ids = _import_inventory_chunk(chunk)
+            created += c
+            updated += u
+            count += len(chunk)
+            if progress is not None:
+                progress(start_row + count, created, updated)
+        touched.update(product_ids)
 
-            if was_created:
-                created += 1
-            else:
-                updated += 1
+    # Evaluate alerts once for every product touched by the import
+    evaluate_alerts_for_products(touched)
+
+    seconds = time.monotonic() - started
+    return {
+        'created': created,
+        'updated': updated,
+        'mode': mode,
+        'rows': count,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(count / seconds, 1) if seconds > 0 else float(count),
+    }
+
+
+def import_inventory_csv(csv_path, mode: str = 'append', chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Import inventory from a CSV file. See import_inventory_rows for modes and result."""
+    return import_inventory_rows(iter_csv_rows(csv_path), mode=mode, chunk_size=chunk_size)
+
+
+def import_inventory_excel(input_path, mode: str = 'append', chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Import inventory straight from an Excel workbook, without an intermediate CSV."""
+    return import_inventory_rows(iter_excel_rows(input_path), mode=mode, chunk_size=chunk_size)
+
+
+def import_inventory_file(path, mode: str = 'append', chunk_size: int = IMPORT_CHUNK_SIZE, **kwargs):
+    """Import a CSV or Excel file, picking the reader by extension."""
+    return import_inventory_rows(iter_inventory_rows(path), mode=mode, chunk_size=chunk_size, **kwargs)
+
+
+def count_inventory_rows(path):
+    """Cheap estimate of data rows in a CSV or Excel file (for progress/ETA), or None."""
+    if _is_excel_path(path):
+        if openpyxl is None:
+            return None
+        wb = openpyxl.load_workbook(filename=str(path), read_only=True)
+        try:
+            max_row = wb.active.max_row
+        finally:
+            wb.close()
+        return max(max_row - 1, 0) if max_row else None
+    with open(path, 'rb') as f:
+        lines = sum(1 for _ in f)
+    return max(lines - 1, 0)
+
+
+# --- Import jobs (processed by the run_import_worker command) ---
+
+def claim_next_import_job():
+    """Atomically move the oldest pending ImportJob to RUNNING and return it (or None)."""
+    pending = ImportJob.objects.filter(status=ImportJob.STATUS_PENDING).order_by('created_at')
+    for job_id in pending.values_list('pk', flat=True)[:10]:
+        claimed = ImportJob.objects.filter(pk=job_id, status=ImportJob.STATUS_PENDING).update(
+            status=ImportJob.STATUS_RUNNING, started_at=timezone.now(),
+        )
+        if claimed:
+            return ImportJob.objects.get(pk=job_id)
+    return None
+
+
+def requeue_stale_import_jobs(stale_after_seconds: int = 300):
+    """Put RUNNING jobs whose worker stopped reporting progress back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=stale_after_seconds)
+    return ImportJob.objects.filter(status=ImportJob.STATUS_RUNNING, updated_at__lt=cutoff).update(
+        status=ImportJob.STATUS_PENDING,
+    )
+
+
+def run_import_job(job: ImportJob, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Process one ImportJob, resuming after its last committed chunk.
+
+    Progress (rows, counts, rows/sec) is written in the same transaction as each chunk.
+    On success the uploaded file is removed; on failure the error is recorded and the
+    job can be set back to PENDING to resume.
+    """
+    resumed_from = job.rows_processed
+    base_created = job.created_count
+    base_updated = job.updated_count
+    if job.total_rows is None:
+        try:
+            job.total_rows = count_inventory_rows(job.file_path)
+        except Exception:
+            job.total_rows = None
+        ImportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows)
+    started = time.monotonic()
+
+    def progress(rows_done, created, updated):
+        elapsed = time.monotonic() - started
+        job.rows_processed = rows_done
+        job.created_count = base_created + created
+        job.updated_count = base_updated + updated
+        job.rows_per_sec = round((rows_done - resumed_from) / elapsed, 1) if elapsed > 0 else None
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=job.rows_processed,
+            created_count=job.created_count,
+            updated_count=job.updated_count,
+            rows_per_sec=job.rows_per_sec,
+            updated_at=timezone.now(),
+        )
+
+    try:
+        import_inventory_file(
+            job.file_path, mode=job.mode, chunk_size=chunk_size,
+            start_row=resumed_from, progress=progress,
+        )
+        if resumed_from:
+            # Products from chunks committed before the interruption were never evaluated
+            evaluate_all_alerts()
+    except Exception as e:
+        job.status = ImportJob.STATUS_FAILED
+        job.errors = list(job.errors) + [{'row': job.rows_processed, 'error': str(e)}]
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'errors', 'finished_at', 'updated_at'])
+        return job
+
+    job.status = ImportJob.STATUS_DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    try:
+        Path(job.file_path).unlink()
+    except OSError:
+        pass
+    return job
 
-            if current_stock > 0:
-                InventoryBatch.objects.create(
-                    product=product,
-                    quantity=current_stock,
-                    received_at=timezone.now()
-                )
-
-            # Evaluate alerts per product post-import
-            try:
-                evaluate_product_alert(product, save=True)
-            except Exception:
-                pass
-
-    print(f"DEBUG: Final counts - Created: {created}, Updated: {updated}")
-    return {'created': created, 'updated': updated, 'mode': mode}
\ No newline at end of file
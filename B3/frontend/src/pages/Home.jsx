@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
-import axios from '../utils/axios'
+import axios, { getAllPages } from '../utils/axios'
 import SplitText from '../components/SplitText.jsx'
 
 export default function Home() {
@@ -15,12 +15,12 @@ export default function Home() {
 
   useEffect(() => {
     Promise.all([
-      axios.get('/api/products/'),
+      getAllPages('/api/products/'),
       axios.get('/api/stock-alerts/'),
       axios.get('/api/suppliers/')
     ])
       .then(([productsRes, alertsRes, suppliersRes]) => {
-        const products = productsRes.data
+        const products = productsRes
         const alerts = alertsRes.data
         const lowStock = products.filter(p => 
           p.reorder_status === 'LOW' || p.reorder_status === 'APPROACHING'
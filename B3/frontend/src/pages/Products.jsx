@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { useSearchParams } from 'react-router-dom'
-import axios from '../utils/axios'
+import axios, { getAllPages } from '../utils/axios'
 
 export default function Products() {
   const [searchParams, setSearchParams] = useSearchParams()
@@ -32,8 +32,7 @@ export default function Products() {
     setLoading(true)
     setError('')
     try {
-      const res = await axios.get('/api/products/')
-      setProducts(res.data)
+      setProducts(await getAllPages('/api/products/'))
     } catch (e) {
       setError(e?.message || 'Failed to load products')
     } finally {
@@ -1,12 +1,33 @@
 import { useState } from 'react'
 import axios from '../utils/axios'
 
+const JOB_POLL_MS = 1000
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
 export default function Upload() {
   const [file, setFile] = useState(null)
   const [mode, setMode] = useState('append')
   const [uploading, setUploading] = useState(false)
   const [result, setResult] = useState(null)
   const [error, setError] = useState('')
+  const [job, setJob] = useState(null)
+
+  // Queued imports (202) are processed by the import worker; follow the job until it finishes
+  const waitForJob = async (statusUrl) => {
+    while (true) {
+      const res = await axios.get(statusUrl)
+      setJob(res.data)
+      if (res.data.status === 'DONE') {
+        return { created: res.data.created_count, updated: res.data.updated_count, mode: res.data.mode }
+      }
+      if (res.data.status === 'FAILED') {
+        const last = res.data.errors?.[res.data.errors.length - 1]
+        throw new Error(last?.error || 'Import failed')
+      }
+      await sleep(JOB_POLL_MS)
+    }
+  }
 
   const handleFileChange = (e) => {
     const selected = e.target.files[0]
@@ -29,6 +50,7 @@ export default function Upload() {
     setUploading(true)
     setError('')
     setResult(null)
+    setJob(null)
 
     const formData = new FormData()
     formData.append('file', file)
@@ -42,8 +64,11 @@ export default function Upload() {
         headers: { 'Content-Type': 'multipart/form-data' }
       })
       
-      // Backend returns {import_result: {created, updated, mode}} 
-      const resultData = res.data.import_result || res.data
+      // Imported in the request: {import_result: {created, updated, mode}};
+      // queued: 202 {job_id, job: {..., status_url}}
+      const resultData = res.status === 202
+        ? await waitForJob(res.data.job.status_url)
+        : res.data.import_result || res.data
       setResult(resultData)
       console.log('Upload result:', resultData)
       setFile(null)
@@ -165,9 +190,20 @@ export default function Upload() {
             cursor: !file || uploading ? 'not-allowed' : 'pointer'
           }}
         >
-          {uploading ? '⏳ Uploading...' : '🚀 Upload & Import'}
+          {uploading ? (job ? '⏳ Importing...' : '⏳ Uploading...') : '🚀 Upload & Import'}
         </button>
 
+        {/* Queued import progress */}
+        {uploading && job && (
+          <div style={{ marginTop: 16, opacity: 0.8, fontSize: '0.9rem' }}>
+            {job.status === 'PENDING'
+              ? 'Queued, waiting for the import worker...'
+              : `${job.rows_processed}${job.total_rows != null ? ` / ${job.total_rows}` : ''} rows imported` +
+                (job.rows_per_sec ? ` (${job.rows_per_sec} rows/sec)` : '') +
+                (job.eta_seconds != null ? `, about ${Math.ceil(job.eta_seconds)}s left` : '')}
+          </div>
+        )}
+
         {/* Error */}
         {error && (
           <div style={{ 
@@ -229,7 +265,7 @@ export default function Upload() {
           <li><code>RESTOCK</code> - Use "NEEDS RESTOCK" to set minimum stock to 15, otherwise defaults to 5</li>
         </ul>
         <p style={{ marginTop: 16, opacity: 0.6, fontSize: '0.9rem' }}>
-          💡 Tip: Excel files (.xlsx or .xls) will be automatically converted to CSV format
+          💡 Tip: Excel workbooks (.xlsx) are read directly from their first worksheet; blank rows are skipped
         </p>
       </div>
     </div>
@@ -48,4 +48,15 @@ axios.interceptors.request.use(
   }
 )
 
+// Load every row of a cursor-paginated list endpoint by following `next`
+export async function getAllPages(url, params = {}) {
+  const rows = []
+  let res = await axios.get(url, { params: { page_size: 1000, ...params } })
+  for (;;) {
+    rows.push(...res.data.results)
+    if (!res.data.next) return rows
+    res = await axios.get(res.data.next)
+  }
+}
+
 export default axios